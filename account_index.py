@@ -0,0 +1,162 @@
+"""Index مترتب للحسابات (في الذاكرة، بيتحدث مع كل كتابة زي index البحث)
+
+لكل status ليستة مترتبة بمفاتيح الـ IDs (ACC-0042 → (42, 'ACC-0042')) + ليستة لكل الحسابات،
+والصف الصغير بتاع كل حساب (status، اللفل، فاتحه، الرانك) جنبها. الصفحة بتبدأ من
+الـ cursor بـ bisect وبتمشي لحد ما تكمل، فتكلفتها على قد الصفحة مش على قد المخزون
+(مع فلاتر نادرة بتمشي أكتر على قد ما الفلتر بيستبعد).
+
+الـ cursor نص مقفول (base64) فيه الاتجاه وآخر مفتاح، بيترجع زي ما هو للصفحة الجاية.
+
+كمان ليستة مترتبة بـ (اللفل، المفتاح) لكل status ولكل الحسابات لأسئلة "مين بين
+لفل 12 و14": bisect للطرفين وبعدين k صف، يعني O(log n + k) حتى مع فلتر الـ status.
+"""
+import base64
+import bisect
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+PAGE_SIZE = 10
+
+Key = Tuple[int, str]
+
+def _key(account_id) -> Key:
+    """(الرقم زي database.id_number، الـ ID كله) — ACC-0007 → (7, 'ACC-0007')
+    
+    الـ ID كله بيفرق بين IDs من غير رقم (كلها 0) أو بنفس الرقم وprefix مختلف.
+    """
+    account_id = str(account_id)
+    try:
+        return int(account_id.rsplit('-', 1)[-1]), account_id
+    except ValueError:
+        return 0, account_id
+
+def encode_cursor(direction: str, key: Key) -> str:
+    return base64.urlsafe_b64encode(f"{direction}:{key[0]}:{key[1]}".encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, Key]:
+    """→ (after|before، المفتاح)؛ ValueError لو الـ cursor بايظ"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, number, account_id = raw.split(':', 2)
+        if direction not in ('after', 'before'):
+            raise ValueError(direction)
+        return direction, (int(number), account_id)
+    except Exception as e:
+        raise ValueError(f"Bad cursor: {cursor!r}") from e
+
+class AccountIndex:
+    def __init__(self):
+        # مفتاح → الصف: {id, status, current_level, opened_by, rank, version}
+        self._rows: Dict[Key, dict] = {}
+        self._all: List[Key] = []
+        self._by_status: Dict[str, List[Key]] = {}
+        # (اللفل، المفتاح) للحسابات اللي لفلها رقم: None = كل الحسابات، وليستة لكل status
+        self._by_level: Dict[Optional[str], List[Tuple[int, Key]]] = {None: []}
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def put(self, kind: str, record: dict):
+        if kind != 'account':
+            return
+        key = _key(record.get('id'))
+        old = self._rows.get(key)
+        if old is not None and record.get('version', 0) < old['version']:
+            return
+        if old is not None:
+            self._unlink(key, old)
+        row = {
+            'id': record.get('id'),
+            'status': record.get('status', 'not_finished'),
+            'current_level': record.get('current_level'),
+            'opened_by': record.get('opened_by', ''),
+            'rank': record.get('rank', ''),
+            'version': record.get('version', 0)
+        }
+        self._rows[key] = row
+        bisect.insort(self._all, key)
+        bisect.insort(self._by_status.setdefault(row['status'], []), key)
+        if isinstance(row['current_level'], int):
+            entry = (row['current_level'], key)
+            bisect.insort(self._by_level[None], entry)
+            bisect.insort(self._by_level.setdefault(row['status'], []), entry)
+    
+    def remove(self, kind: str, record_id: str):
+        if kind != 'account':
+            return
+        key = _key(record_id)
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._unlink(key, row)
+    
+    def counts(self) -> Dict[str, int]:
+        """{'total': العدد، status: العدد} من أطوال الليستات"""
+        return {'total': len(self._all), **{status: len(keys) for status, keys in self._by_status.items()}}
+    
+    def _unlink(self, key: Key, row: dict):
+        del self._all[bisect.bisect_left(self._all, key)]
+        keys = self._by_status[row['status']]
+        del keys[bisect.bisect_left(keys, key)]
+        if isinstance(row['current_level'], int):
+            entry = (row['current_level'], key)
+            for levels in (self._by_level[None], self._by_level[row['status']]):
+                del levels[bisect.bisect_left(levels, entry)]
+    
+    @staticmethod
+    def _matches(row: dict, min_level, max_level, rank, opened_by) -> bool:
+        level = row['current_level'] if isinstance(row['current_level'], int) else None
+        if min_level is not None and (level is None or level < min_level):
+            return False
+        if max_level is not None and (level is None or level > max_level):
+            return False
+        if rank and str(row['rank']).casefold() != rank.casefold():
+            return False
+        if opened_by and str(row['opened_by']).casefold() != opened_by.casefold():
+            return False
+        return True
+    
+    def page(self, status: str = None, min_level: int = None, max_level: int = None,
+             rank: str = None, opened_by: str = None, cursor: str = None,
+             limit: int = PAGE_SIZE) -> Tuple[List[dict], Optional[str], Optional[str]]:
+        """→ (صفوف الصفحة من الأقدم للأحدث، cursor الصفحة الجاية، cursor اللي قبلها)"""
+        keys = self._by_status.get(status, []) if status else self._all
+        direction, key = decode_cursor(cursor) if cursor else ('after', None)
+        
+        found = []
+        if direction == 'after':
+            i = bisect.bisect_right(keys, key) if key is not None else 0
+            while i < len(keys) and len(found) <= limit:
+                if self._matches(self._rows[keys[i]], min_level, max_level, rank, opened_by):
+                    found.append(keys[i])
+                i += 1
+            more = len(found) > limit
+            found = found[:limit]
+            earlier = cursor is not None
+            later = more
+        else:
+            i = bisect.bisect_left(keys, key) - 1
+            while i >= 0 and len(found) <= limit:
+                if self._matches(self._rows[keys[i]], min_level, max_level, rank, opened_by):
+                    found.append(keys[i])
+                i -= 1
+            earlier = len(found) > limit
+            found = found[:limit][::-1]
+            later = True
+        
+        rows = [{key: value for key, value in self._rows[n].items() if key != 'version'} for n in found]
+        next_cursor = encode_cursor('after', found[-1]) if found and later else None
+        prev_cursor = encode_cursor('before', found[0]) if found and earlier else None
+        return rows, next_cursor, prev_cursor
+    
+    def level_range(self, min_level: int, max_level: int, status: str = None,
+                    limit: int = None) -> Tuple[int, List[dict]]:
+        """الحسابات من min_level لـ max_level (الأعلى لفل الأول) → (العدد، أول limit صف)"""
+        levels = self._by_level.get(status, []) if status else self._by_level[None]
+        # (لفل,) أصغر من أي (لفل، مفتاح) بنفس اللفل
+        start = bisect.bisect_left(levels, (min_level,))
+        end = bisect.bisect_left(levels, (max_level + 1,))
+        # العدد من الـ bisect والصفوف أول limit بس
+        found = (self._rows[levels[i][1]] for i in range(end - 1, start - 1, -1))
+        rows = [{key: value for key, value in row.items() if key != 'version'}
+                for row in itertools.islice(found, limit)]
+        return max(0, end - start), rows
@@ -0,0 +1,534 @@
+"""قياسات أداء طبقة التخزين
+
+python benchmark.py latency [--writers 8] [--seconds 5]
+python benchmark.py group-commit [--writes 2000] [--concurrency 50]
+python benchmark.py formats [--accounts 10000] [--sales 100000]
+python benchmark.py stress [--ops 500]
+python benchmark.py memory [--accounts 20000] [--text 2000]
+python benchmark.py import [--rows 1000]
+python benchmark.py search [--records 50000]
+python benchmark.py list-accounts [--accounts 50000]
+python benchmark.py stats-embed [--accounts 20000] [--sales 100000]
+python benchmark.py stats-range [--sales 100000]
+
+كل القياسات بتشتغل في مجلد مؤقت، مش بتلمس data/ الحقيقي.
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import json
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def _fresh_db():
+    """Database جديدة في مجلد مؤقت (من غير logger.setup اللوج مبيطبعش غير الأخطاء)"""
+    os.chdir(tempfile.mkdtemp(prefix="marvel-bench-"))
+    sys.path.insert(0, REPO_DIR)
+    from database import db
+    return db
+
+async def bench_latency(writers: int, seconds: float):
+    """زمن استجابة "interaction" (قراءة حساب) أثناء كتابات متزامنة"""
+    db = _fresh_db()
+    account_id = await db.add_account({'current_level': 5, 'account_info': 'x' * 200})
+    stop = time.perf_counter() + seconds
+    writes = 0
+    
+    async def writer(n):
+        nonlocal writes
+        while time.perf_counter() < stop:
+            if n % 2:
+                await db.add_sale({'price': 100, 'seller': f"seller{n}", 'rank': 'Gold 1'})
+            else:
+                await db.add_account({'current_level': 3, 'account_info': 'y' * 200})
+            writes += 1
+            # زي الـ interactions الحقيقية: كل handler بيدي فرصة للباقي
+            await asyncio.sleep(0)
+    
+    latencies = []
+    
+    async def probe():
+        # الزمن من اللحظة اللي المفروض الـ interaction تبدأ فيها لحد ما تخلص
+        # (بيشمل أي وقت الـ event loop كان واقف فيه على القرص)
+        while time.perf_counter() < stop:
+            due = time.perf_counter() + 0.005
+            await asyncio.sleep(0.005)
+            await db.get_account(account_id)
+            latencies.append(time.perf_counter() - due)
+    
+    await asyncio.gather(probe(), *(writer(n) for n in range(writers)))
+    
+    print(f"writers={writers} seconds={seconds} writes={writes} probes={len(latencies)}")
+    print(f"interaction latency p50={_percentile(latencies, 50) * 1000:.2f}ms "
+          f"p99={_percentile(latencies, 99) * 1000:.2f}ms "
+          f"max={max(latencies) * 1000:.2f}ms")
+
+async def bench_group_commit(writes: int, concurrency: int):
+    """throughput الـ add_sale مع وبدون group commit"""
+    db = _fresh_db()
+    import database
+    
+    for window in (0, database.GROUP_COMMIT_MS or 2):
+        database.GROUP_COMMIT_MS = window
+        before = db.batches_committed
+        start = time.perf_counter()
+        for offset in range(0, writes, concurrency):
+            burst = min(concurrency, writes - offset)
+            await asyncio.gather(*(
+                db.add_sale({'price': 100, 'seller': f"seller{i % 5}", 'rank': 'Gold 1'})
+                for i in range(burst)
+            ))
+        elapsed = time.perf_counter() - start
+        
+        batches = db.batches_committed - before
+        label = f"group commit {window:g}ms" if window else "no group commit"
+        print(f"{label:>22}: {writes / elapsed:8.0f} writes/s, "
+              f"{batches or writes} fsyncs, {elapsed * 1000 / writes:.3f}ms/write")
+    
+    stats = await db.get_stats()
+    print(f"total_sales={stats['total_sales']} (expected {writes * 2})")
+
+async def bench_stress(ops: int):
+    """مئات الكتابات المتزامنة + read-modify-write على نفس الحساب → مفيش ولا عدّة تضيع"""
+    db = _fresh_db()
+    target = await db.add_account({'current_level': 0})
+    other = await db.add_account({'current_level': 0})
+    ticket = await db.create_ticket({'user_id': 1, 'channel_id': 1})
+    
+    def level_up(account):
+        return {'current_level': account['current_level'] + 1}
+    
+    async def raw_level_up(account_id):
+        # من غير entity lock: نفس الـ CAS بتاع modify_account مع retry لحد ما ينجح
+        while True:
+            account = await db.get_account(account_id)
+            if await db.update_account(account_id, level_up(account), expected_version=account['version']):
+                return
+    
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(db.add_sale({'price': 10, 'seller': f"seller{i % 7}", 'rank': 'Gold 1'}) for i in range(ops)),
+        *(db.add_account({'current_level': i % 15}) for i in range(ops)),
+        *(db.modify_account(target, level_up) for _ in range(ops)),
+        *(raw_level_up(other) for _ in range(ops // 5)),
+        *(db.modify_ticket(ticket, lambda t: {'notes': t.get('notes', 0) + 1}) for _ in range(ops // 5)),
+    )
+    elapsed = time.perf_counter() - start
+    
+    stats = await db.get_stats()
+    accounts = await db.get_all_accounts()
+    new_ids = results[ops:ops * 2]
+    checks = {
+        'total_sales': (stats['total_sales'], ops),
+        'total_revenue': (stats['total_revenue'], ops * 10),
+        'accounts': (len(accounts), ops + 2),
+        'unique account ids': (len(set(new_ids) - {"ERROR"}), ops),
+        'modify_account level': ((await db.get_account(target))['current_level'], ops),
+        'CAS retry level': ((await db.get_account(other))['current_level'], ops // 5),
+        'modify_ticket notes': ((await db.get_ticket(ticket))['notes'], ops // 5),
+    }
+    total = ops * 3 + 2 * (ops // 5)
+    print(f"backend={type(db).__name__} operations={total} elapsed={elapsed:.2f}s "
+          f"({total / elapsed:.0f} ops/s) version_conflicts={db.version_conflicts}")
+    failed = False
+    for name, (got, expected) in checks.items():
+        ok = got == expected
+        failed |= not ok
+        print(f"{'OK ' if ok else 'LOST'} {name}: {got} (expected {expected})")
+    assert not failed, "lost updates"
+
+async def bench_import(rows: int):
+    """/import_accounts: add_account لكل صف مقابل add_accounts في transaction واحدة"""
+    db = _fresh_db()
+    from importer import parse_accounts
+    
+    csv_text = "account_info,current_level,opened_by,notes\n" + "".join(
+        f"user{i}@mail.com / pass{i},{i % 20},opener{i % 7},imported\n" for i in range(rows)
+    )
+    start = time.perf_counter()
+    accounts, errors = parse_accounts("accounts.csv", csv_text.encode('utf-8'))
+    parse = time.perf_counter() - start
+    assert not errors, errors
+    
+    start = time.perf_counter()
+    for account in accounts:
+        await db.add_account(dict(account))
+    one_by_one = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    account_ids = await db.add_accounts([dict(account) for account in accounts])
+    bulk = time.perf_counter() - start
+    assert len(account_ids) == rows
+    
+    print(f"{'parse + validate':>18}: {parse * 1000:8.1f}ms")
+    print(f"{'add_account x' + str(rows):>18}: {one_by_one * 1000:8.1f}ms")
+    print(f"{'add_accounts':>18}: {bulk * 1000:8.1f}ms ({one_by_one / bulk:.1f}x faster)")
+    print(f"accounts={len(await db.get_all_accounts(full=False))} (expected {rows * 2})")
+
+def bench_search(records: int):
+    """زمن الاستعلام على index البحث بحجم records (حسابات وتذاكر)"""
+    sys.path.insert(0, REPO_DIR)
+    from search import SearchIndex
+    
+    rng = random.Random(7)
+    names = ["ahmed", "mohamed", "mostafa", "karim", "youssef", "omar", "sara", "nour", "hany", "ali"]
+    index = SearchIndex()
+    start = time.perf_counter()
+    for i in range(records):
+        first, last = rng.choice(names), rng.choice(names)
+        if i % 5:
+            index.put('account', {
+                'id': f"ACC-{i:05d}", 'account_info': f"{first}.{last}{i}@gmail.com\npass{rng.randrange(10**6)}",
+                'opened_by': rng.choice(names), 'notes': rng.choice(["", "vip", "banned once", "needs rank up"])
+            })
+        else:
+            index.put('ticket', {
+                'id': f"TKT-{i:05d}", 'user_name': f"{first}{i % 300}", 'buyer': f"{last} {first}",
+                'rank': f"Gold {rng.randint(1, 3)}", 'account_info': f"{first}{i}@yahoo.com", 'notes': ""
+            })
+    print(f"built {len(index)} records in {time.perf_counter() - start:.2f}s")
+    
+    queries = {
+        "email fragment": ("ahmed.karim12", True),
+        "rare prefix": ("mostafa.hany4", True),
+        "buyer name": ("hany sara", False),
+        "common word": ("vip", False),
+        "short prefix": ("mo", False),
+    }
+    print(f"{'query':<16} {'results':>8} {'p50':>9} {'p99':>9} {'next page':>9}")
+    for label, (query, sensitive) in queries.items():
+        timings, pages = [], []
+        for _ in range(200):
+            # put بيفضي الكاش: كل لفة بحث من الأول، وبعدها صفحة تانية من نفس البحث
+            index.put('account', {'id': "ACC-00000", 'opened_by': "bench"})
+            started = time.perf_counter()
+            total, _ = index.search(query, sensitive=sensitive)
+            timings.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            index.search(query, sensitive=sensitive, offset=5, limit=5)
+            pages.append((time.perf_counter() - started) * 1000)
+        print(f"{label:<16} {total:>8} {_percentile(timings, 50):>7.3f}ms {_percentile(timings, 99):>7.3f}ms "
+              f"{_percentile(pages, 50):>7.3f}ms")
+
+async def bench_list_accounts(accounts: int):
+    """صفحة /list_accounts من الـ index مقابل get_all_accounts وقص أول 10"""
+    db = _fresh_db()
+    rng = random.Random(3)
+    await db.add_accounts([
+        {'account_info': f"user{i}@mail.com", 'current_level': rng.randint(1, 20), 'opened_by': f"op{i % 9}",
+         'notes': "", 'status': 'finished' if i % 4 == 0 else 'not_finished'}
+        for i in range(accounts)
+    ])
+    await db.list_accounts()  # بناء الـ index مرة واحدة
+    
+    def timed(runs, func):
+        async def run():
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                await func()
+                timings.append((time.perf_counter() - started) * 1000)
+            return _percentile(timings, 50)
+        return run()
+    
+    async def full_scan():
+        rows = await db.get_all_accounts(full=False)
+        return [a for a in rows if a.get('status') == 'finished'][:10]
+    
+    async def walk(**filters):
+        page = await db.list_accounts(**filters)
+        for _ in range(20):
+            if not page['next']:
+                break
+            page = await db.list_accounts(**filters, cursor=page['next'])
+    
+    print(f"{'get_all_accounts + filter + [:10]':<36} {await timed(10, full_scan):8.3f}ms")
+    print(f"{'list_accounts first page':<36} {await timed(200, db.list_accounts):8.3f}ms")
+    print(f"{'list_accounts status=finished':<36} {await timed(200, lambda: db.list_accounts(status='finished')):8.3f}ms")
+    print(f"{'list_accounts level 15-16':<36} {await timed(200, lambda: db.list_accounts(min_level=15, max_level=16)):8.3f}ms")
+    print(f"{'20 pages via cursors':<36} {await timed(20, walk):8.3f}ms")
+    print(f"{'accounts_in_levels(12, 14) top 24':<36} {await timed(200, lambda: db.accounts_in_levels(12, 14, limit=24)):8.3f}ms")
+
+async def bench_stats_embed(accounts: int, sales: int):
+    """أرقام embed الإحصائيات: snapshot + عد + ترتيب (زي الأول) مقابل stats_summary() (عد الـ status بس)"""
+    db = _fresh_db()
+    rng = random.Random(5)
+    await db.add_accounts([
+        {'account_info': f"user{i}@mail.com", 'current_level': rng.randint(1, 20), 'opened_by': "op",
+         'notes': "", 'status': 'finished' if i % 4 == 0 else 'not_finished'}
+        for i in range(accounts)
+    ])
+    history = [{'price': rng.randint(50, 500), 'seller': f"seller{rng.randint(1, 500)}",
+                'rank': f"Rank {rng.randint(1, 30)}", 'date': f"2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}T12:00:00"}
+               for _ in range(sales)]
+    stats = {'total_sales': 0, 'total_revenue': 0, 'daily_stats': {}, 'seller_stats': {}, 'rank_stats': {}}
+    for sale in history:
+        stats['total_sales'] += 1
+        stats['total_revenue'] += sale['price']
+        for group, key in (('daily_stats', sale['date'][:10]), ('seller_stats', sale['seller']), ('rank_stats', sale['rank'])):
+            entry = stats[group].setdefault(key, {'sales': 0, 'revenue': 0})
+            entry['sales'] += 1
+            entry['revenue'] += sale['price']
+    await db.save_json(db.stats_file, {**stats, 'accounts_sold': history, 'purchases': []})
+    await db.add_sale({'price': 100, 'seller': "seller1", 'rank': "Rank 1"})
+    await db.stats_summary()  # أول قراءة بتملى الكاش
+    
+    async def before():
+        snapshot = await db.snapshot('stats', 'accounts')
+        stats, rows = snapshot['stats'], snapshot['accounts'].values()
+        finished = len([a for a in rows if a.get('status') == 'finished'])
+        top = sorted(stats['seller_stats'].items(), key=lambda x: x[1]['sales'], reverse=True)[:5]
+        ranks = sorted(stats['rank_stats'].items(), key=lambda x: x[1]['sales'], reverse=True)[:5]
+        return finished, top, ranks
+    
+    async def after():
+        return await db.stats_summary()
+    
+    old, new = await before(), await after()
+    assert old[0] == new['accounts']['finished']
+    assert [s['sales'] for _, s in old[1]] == [s['sales'] for _, s in new['top_sellers']]
+    
+    print(f"accounts={accounts} sales={sales} sellers={len(stats['seller_stats'])}")
+    for name, func, runs in (("snapshot + count + sort", before, 10), ("stats_summary", after, 200)):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            await func()
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<26} p50={_percentile(timings, 50):8.3f}ms")
+    
+    timings = []
+    for i in range(200):
+        started = time.perf_counter()
+        await db.add_sale({'price': 100, 'seller': f"seller{i % 500}", 'rank': "Rank 1"})
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{'add_sale':<26} p50={_percentile(timings, 50):8.3f}ms")
+
+async def bench_stats_range(sales: int):
+    """إجمالي فترة من الـ rollups مقابل get_sales للفترة وجمعها"""
+    db = _fresh_db()
+    rng = random.Random(9)
+    start = datetime(2025, 1, 1)
+    history = sorted(({'price': rng.randint(50, 500), 'seller': "seller", 'rank': "Gold",
+                       'date': (start + timedelta(minutes=rng.randint(0, 60 * 24 * 600))).isoformat()}
+                      for _ in range(sales)), key=lambda sale: sale['date'])
+    await db.save_json(db.stats_file, {'accounts_sold': history, 'purchases': []})
+    
+    started = time.perf_counter()
+    await db.stats_range(start, start + timedelta(days=7))
+    print(f"sales={sales} build rollups {(time.perf_counter() - started) * 1000:.1f}ms")
+    
+    windows = [(start + timedelta(days=rng.randint(0, 500)), timedelta(days=days)) for days in (1, 7, 30, 90)]
+    for window_start, length in windows:
+        timings = {'get_sales + sum': [], 'stats_range': []}
+        for _ in range(5):
+            began = time.perf_counter()
+            rows = await db.get_sales(window_start, window_start + length)
+            expected = sum(sale['price'] for sale in rows)
+            timings['get_sales + sum'].append((time.perf_counter() - began) * 1000)
+            began = time.perf_counter()
+            report = await db.stats_range(window_start, window_start + length)
+            timings['stats_range'].append((time.perf_counter() - began) * 1000)
+        assert report['total']['revenue'] == expected
+        print(f"{length.days:>3} days: " + "  ".join(f"{name} p50={_percentile(values, 50):8.3f}ms"
+                                                    for name, values in timings.items()))
+
+def bench_memory(accounts: int, text: int):
+    """أقصى RSS للبوت على نفس البيانات، بالشكل العادي وبـ DB_LOW_MEMORY=1 (كل واحد في process لوحده)"""
+    rng = random.Random(7)
+    base = tempfile.mkdtemp(prefix="marvel-bench-")
+    os.makedirs(f"{base}/data")
+    doc = {
+        'accounts': {
+            f"ACC-{i:05d}": {
+                'id': f"ACC-{i:05d}", 'current_level': rng.randint(1, 100),
+                'status': rng.choice(['finished', 'not_finished']), 'rank': 'Gold 1', 'version': 1,
+                'account_info': f"email: player{i}@mail.com | " + "بيانات الحساب " * (text // 14),
+                'notes': "ملاحظات " * (text // 16)
+            }
+            for i in range(1, accounts + 1)
+        },
+        'sequences': {'ACC': accounts}
+    }
+    with open(f"{base}/data/accounts.json", 'w', encoding='utf-8') as f:
+        json.dump(doc, f, ensure_ascii=False)
+    size = os.path.getsize(f"{base}/data/accounts.json")
+    del doc
+    print(f"accounts={accounts} accounts.json={size / 1024 / 1024:.1f}MB")
+    
+    for label, env in (("default", {}), ("low-memory", {'DB_LOW_MEMORY': '1'})):
+        workdir = f"{base}/{label}"
+        shutil.copytree(f"{base}/data", f"{workdir}/data")
+        probe = [sys.executable, os.path.abspath(__file__), "memory-probe", workdir]
+        run_env = {**os.environ, **env}
+        if env:
+            # أول تشغيل بيرحّل النصوص لملف النصوص؛ القياس على التشغيل العادي اللي بعده
+            subprocess.run(probe, env=run_env, check=True, capture_output=True)
+        result = subprocess.run(probe, env=run_env, check=True, capture_output=True, text=True)
+        print(f"{label:>11}: peak RSS {int(result.stdout.split()[-1]) / 1024:.1f}MB")
+    shutil.rmtree(base)
+
+def memory_probe(workdir: str):
+    """شغل البوت المعتاد على البيانات: embed الإحصائيات، قايمة الحسابات، فتح/تعديل حسابات"""
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    from database import db
+    
+    async def workload():
+        snapshot = await db.snapshot('stats', 'accounts')
+        ids = list(snapshot['accounts'])
+        await db.get_all_accounts(full=False)
+        for account_id in random.Random(1).sample(ids, min(200, len(ids))):
+            account = await db.get_account(account_id)
+            await db.update_account(account_id, {'current_level': account['current_level'] + 1})
+    
+    asyncio.run(workload())
+    # VmHWM بيتصفر مع exec؛ ru_maxrss بيورث أقصى RSS من الـ process الأب
+    with open('/proc/self/status') as f:
+        peak = next((line.split()[1] for line in f if line.startswith('VmHWM:')), None)
+    print(peak or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def _dataset(accounts: int, sales: int):
+    """بيانات شبه الحقيقية: حسابات بمعلومات دخول وملاحظات، ومبيعات بتواريخ على سنتين"""
+    rng = random.Random(42)
+    ranks = ['Recruit', 'Agent', 'Captain', 'Major', 'Colonel', 'Gold 1', 'Infinite']
+    sellers = [f"seller_{i}" for i in range(12)]
+    accounts_doc = {
+        'accounts': {
+            f"ACC-{i:04d}": {
+                'id': f"ACC-{i:04d}",
+                'current_level': rng.randint(1, 100),
+                'account_info': f"email: player{i}@mail.com | pass: {rng.getrandbits(48):x} | رانك {rng.choice(ranks)}",
+                'notes': "حساب نضيف، فيه كروت سيريز 5" if i % 3 else "",
+                'opened_by': rng.choice(sellers),
+                'status': rng.choice(['finished', 'not_finished']),
+                'created_at': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00"
+            }
+            for i in range(1, accounts + 1)
+        },
+        'sequences': {'ACC': accounts}
+    }
+    sales_doc = {
+        'accounts_sold': [
+            {
+                'price': rng.choice([150, 200, 250, 300, 500]),
+                'seller': rng.choice(sellers),
+                'rank': rng.choice(ranks),
+                'buyer': f"buyer_{rng.randint(1, 5000)}",
+                'date': f"202{rng.randint(5, 6)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00"
+            }
+            for _ in range(sales)
+        ]
+    }
+    return {'accounts': accounts_doc, 'sales': sales_doc}
+
+def _best_of(func, runs: int = 3) -> float:
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_formats(accounts: int, sales: int):
+    """الحجم وزمن encode/decode لكل صيغة في serializers"""
+    sys.path.insert(0, REPO_DIR)
+    import serializers
+    
+    docs = _dataset(accounts, sales)
+    formats = serializers.available_formats()
+    print(f"accounts={accounts} sales={sales} formats={formats}")
+    print(f"{'doc':<9} {'format':<18} {'size':>10} {'encode':>10} {'decode':>10}")
+    for name, doc in docs.items():
+        for fmt in formats:
+            raw = serializers.dumps(doc, fmt)
+            encode = _best_of(lambda: serializers.dumps(doc, fmt))
+            decode = _best_of(lambda: serializers.loads(raw))
+            assert serializers.loads(raw) == doc
+            label = f"{fmt} (old)" if fmt == 'json-pretty' else fmt
+            print(f"{name:<9} {label:<18} {len(raw) / 1024 / 1024:>8.2f}MB "
+                  f"{encode * 1000:>8.1f}ms {decode * 1000:>8.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    latency = sub.add_parser("latency", help="p99 latency of reads under concurrent writes")
+    latency.add_argument("--writers", type=int, default=8)
+    latency.add_argument("--seconds", type=float, default=5)
+    
+    group = sub.add_parser("group-commit", help="write throughput with and without group commit")
+    group.add_argument("--writes", type=int, default=2000)
+    group.add_argument("--concurrency", type=int, default=50)
+    
+    formats = sub.add_parser("formats", help="size and encode/decode time per serializer")
+    formats.add_argument("--accounts", type=int, default=10000)
+    formats.add_argument("--sales", type=int, default=100000)
+    
+    stress = sub.add_parser("stress", help="concurrent add_sale/add_account/modify_* and count checks")
+    stress.add_argument("--ops", type=int, default=500)
+    
+    memory = sub.add_parser("memory", help="peak RSS with and without DB_LOW_MEMORY on a synthetic dataset")
+    memory.add_argument("--accounts", type=int, default=20000)
+    memory.add_argument("--text", type=int, default=2000, help="approx. bytes of account_info + notes per account")
+    
+    bulk = sub.add_parser("import", help="bulk account import vs one add_account per row")
+    bulk.add_argument("--rows", type=int, default=1000)
+    
+    search = sub.add_parser("search", help="search index query latency")
+    search.add_argument("--records", type=int, default=50000)
+    
+    listing = sub.add_parser("list-accounts", help="cursor pages and level ranges vs loading every account")
+    listing.add_argument("--accounts", type=int, default=50000)
+    
+    embed = sub.add_parser("stats-embed", help="stats embed numbers: full snapshot scan vs write-time aggregates")
+    embed.add_argument("--accounts", type=int, default=20000)
+    embed.add_argument("--sales", type=int, default=100000)
+    
+    ranges = sub.add_parser("stats-range", help="date-range totals from hourly prefix sums vs reading the sales log")
+    ranges.add_argument("--sales", type=int, default=100000)
+    
+    probe = sub.add_parser("memory-probe", help="(internal) one measured run for the memory benchmark")
+    probe.add_argument("workdir")
+    
+    args = parser.parse_args()
+    if args.command == "latency":
+        asyncio.run(bench_latency(args.writers, args.seconds))
+    elif args.command == "group-commit":
+        asyncio.run(bench_group_commit(args.writes, args.concurrency))
+    elif args.command == "formats":
+        bench_formats(args.accounts, args.sales)
+    elif args.command == "stress":
+        asyncio.run(bench_stress(args.ops))
+    elif args.command == "memory":
+        bench_memory(args.accounts, args.text)
+    elif args.command == "import":
+        asyncio.run(bench_import(args.rows))
+    elif args.command == "search":
+        bench_search(args.records)
+    elif args.command == "list-accounts":
+        asyncio.run(bench_list_accounts(args.accounts))
+    elif args.command == "stats-embed":
+        asyncio.run(bench_stats_embed(args.accounts, args.sales))
+    elif args.command == "stats-range":
+        asyncio.run(bench_stats_range(args.sales))
+    elif args.command == "memory-probe":
+        memory_probe(args.workdir)
+
+if __name__ == "__main__":
+    main()
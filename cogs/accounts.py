@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+from typing import Optional
 from database import db
 
 class AccountsCog(commands.Cog):
@@ -50,16 +51,22 @@ class AccountsCog(commands.Cog):
         await interaction.response.send_modal(AccountInfoModal())
     
     @app_commands.command(name="list_accounts", description="عرض الحسابات")
-    async def list_accounts(self, interaction: discord.Interaction):
-        accounts = await db.get_all_accounts()
-        if not accounts:
+    @app_commands.choices(status=[
+        app_commands.Choice(name="finished", value="finished"),
+        app_commands.Choice(name="not_finished", value="not_finished")
+    ])
+    async def list_accounts(self, interaction: discord.Interaction, status: Optional[app_commands.Choice[str]] = None,
+                            min_level: Optional[int] = None, max_level: Optional[int] = None,
+                            rank: Optional[str] = None, opened_by: Optional[str] = None):
+        from views.account_views import AccountListView
+        filters = {'status': status.value if status else None, 'min_level': min_level,
+                   'max_level': max_level, 'rank': rank, 'opened_by': opened_by}
+        view = AccountListView(filters)
+        page = await db.list_accounts(**filters)
+        if not page['accounts']:
             await interaction.response.send_message("📭 No accounts!", ephemeral=True)
             return
-        
-        e = discord.Embed(title=f"📋 Accounts ({len(accounts)})", color=0x00BFFF)
-        for a in accounts[:10]:
-            e.add_field(name=a['id'], value=f"Level: {a.get('current_level', '?')}", inline=True)
-        await interaction.response.send_message(embed=e, ephemeral=True)
+        await interaction.response.send_message(embed=view.load(page), view=view, ephemeral=True)
 
 async def setup(bot):
     await bot.add_cog(AccountsCog(bot))
\ No newline at end of file
@@ -11,13 +11,12 @@ class StatsCog(commands.Cog):
         self.stats_message_id = None
     
     async def create_stats_embed(self):
-        stats = await db.get_stats()
-        accounts = await db.get_all_accounts()
+        stats = await db.stats_summary()
         
         e = discord.Embed(title="📊 الإحصائيات", color=0x9B59B6, timestamp=discord.utils.utcnow())
         e.add_field(name="💰 المبيعات", value=f"{stats.get('total_sales', 0)}", inline=True)
         e.add_field(name="💵 الأرباح", value=f"{stats.get('total_revenue', 0):,.0f} ج", inline=True)
-        e.add_field(name="🎮 الحسابات", value=f"{len(accounts)}", inline=True)
+        e.add_field(name="🎮 الحسابات", value=f"{stats['accounts']['total']}", inline=True)
         return e
     
     @app_commands.command(name="setup_stats", description="إعداد الإحصائيات")
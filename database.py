@@ -1,44 +1,779 @@
+import abc
+import asyncio
+import copy
+import functools
+import gzip
+import hashlib
 import json
 import os
-from datetime import datetime
-from typing import Optional, List
+import re
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import Dict, Optional, List, Tuple
 import threading
+import time
+import weakref
+
+import serializers
+from search import SearchIndex
+from account_index import AccountIndex, PAGE_SIZE
+from rollups import Rollups, METRICS, pick_unit
+from logger import get_logger, lazy, elapsed_ms, fields
+
+log = get_logger('database')
 
 DATA_DIR = "data"
 
-def ensure_data_dir():
+# عدد السجلات في الـ journal قبل ما نعمل compaction في الخلفية
+COMPACT_EVERY = int(os.getenv('DB_COMPACT_EVERY', 500))
+# عدد الـ threads اللي بتعمل I/O بدل الـ event loop
+IO_WORKERS = int(os.getenv('DB_IO_WORKERS', 2))
+# Group commit: الكتابات اللي بتيجي خلال النافذة دي بتتجمع في fsync واحد (0 = مقفول)
+GROUP_COMMIT_MS = float(os.getenv('DB_GROUP_COMMIT_MS', 2))
+# النسخ الاحتياطية للحسابات اللي اتحذفت/اتباعت بتتشال بعد المدة دي (0 = للأبد)
+BACKUP_RETENTION_DAYS = int(os.getenv('BACKUP_RETENTION_DAYS', 365))
+# عدد آخر المشتريات اللي بتفضل في مستند العدادات (للـ embed)
+RECENT_PURCHASES = 5
+# عدد أفضل البائعين/الرانكات اللي بيتحفظوا مترتبين مع كل بيعة (للـ embed)
+TOP_STATS = 5
+# عدد المحاولات لـ modify_account / modify_ticket لو السجل اتغير في النص
+MODIFY_RETRIES = 5
+# Low-memory (Discloud RAM=100): الحقول النصية الكبيرة بتتخزن بره accounts.json في
+# accounts-N.text، والسجل في الذاكرة فيه بس offset كل حقل (text_refs) وبيتقرا عند الطلب
+LOW_MEMORY = os.getenv('DB_LOW_MEMORY', '0') == '1'
+BULKY_FIELDS = ('account_info', 'notes')
+# ملف النصوص بيتكتب من جديد (عند التشغيل) لو الجزء الميت فيه أكبر من الحي ومن الحد ده
+TEXT_COMPACT_MIN = 1024 * 1024
+
+def ensure_data_dir(data_dir: str = DATA_DIR):
     """التأكد من وجود مجلد البيانات"""
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-        print(f"✅ Created directory: {DATA_DIR}/")
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+        log.info("✅ Created directory: %s/", data_dir)
+
+def id_number(record_id) -> int:
+    """الرقم اللي في آخر الـ ID (ACC-0007 → 7)، أو 0 لو مش بالشكل ده"""
+    try:
+        return int(str(record_id).rsplit('-', 1)[-1])
+    except ValueError:
+        return 0
+
+def record_list(records) -> list:
+    """السجلات سواء متخزنة list (القديم) أو dict بالـ ID"""
+    if isinstance(records, dict):
+        return list(records.values())
+    return list(records or [])
+
+def keyed_records(records, prefix: str, seq: int):
+    """تحويل list قديمة لـ dict بالـ ID → (records, seq)
+    
+    الـ IDs المكررة (من ACC-{len+1} القديمة بعد الحذف) بتاخد IDs جديدة.
+    """
+    if isinstance(records, dict):
+        return records, seq
+    keyed = {}
+    for record in records or []:
+        record_id = record.get('id')
+        if record_id is None or record_id in keyed:
+            seq += 1
+            new_id = f"{prefix}-{seq:04d}"
+            log.warning("⚠️ Duplicate id %s renamed to %s", record_id, new_id)
+            record['id'] = record_id = new_id
+        keyed[record_id] = record
+    return keyed, seq
+
+def month_of(date) -> str:
+    """الشهر (YYYY-MM) اللي سجل أو تاريخ تبعه → اسم الـ segment"""
+    if isinstance(date, datetime):
+        return date.strftime('%Y-%m')
+    return str(date or '')[:7] or 'undated'
+
+def segment_totals(kind: str, record: dict) -> dict:
+    """الأرقام اللي بتتجمع لكل segment في الـ manifest"""
+    if kind == 'sales':
+        return {'count': 1, 'revenue': record.get('price', 0)}
+    return {'count': 1, 'cost': record.get('cost', 0), 'quantity': record.get('quantity', 0)}
+
+def _walk(doc: dict, path: list) -> dict:
+    """الوصول للـ dict الأب لآخر مفتاح في المسار (وإنشاؤه لو مش موجود)"""
+    node = doc
+    for key in path[:-1]:
+        if not isinstance(node.get(key), dict):
+            node[key] = {}
+        node = node[key]
+    return node
+
+def apply_ops(doc: dict, ops: List[dict]):
+    """تطبيق مجموعة تعديلات (من الـ journal) على مستند في الذاكرة"""
+    for op in ops:
+        kind = op['op']
+        path = op['path']
+        parent = _walk(doc, path)
+        key = path[-1]
+        
+        if kind == 'set':
+            parent[key] = op['value']
+        elif kind == 'incr':
+            parent[key] = parent.get(key, 0) + op['value']
+        elif kind == 'append':
+            if not isinstance(parent.get(key), list):
+                parent[key] = []
+            parent[key].append(op['value'])
+            if op.get('limit'):
+                del parent[key][:-op['limit']]
+        elif kind == 'merge':
+            if isinstance(parent.get(key), dict):
+                parent[key].update(op['value'])
+        # update / remove: ops الـ layout القديم (lists) عشان الـ journals القديمة تتطبق
+        elif kind == 'update':
+            for item in parent.get(key, []):
+                if item.get('id') == op['id']:
+                    item.update(op['value'])
+                    break
+        elif kind == 'unset':
+            parent.pop(key, None)
+        elif kind == 'remove':
+            items = parent.get(key, [])
+            parent[key] = [item for item in items if item.get('id') != op['id']]
+        else:
+            raise ValueError(f"Unknown journal op: {kind}")
+
+def cow_ops(doc: dict, ops: List[dict]) -> dict:
+    """زي apply_ops بس السجلات اللي بتتغير بتتنسخ الأول (copy-on-write على مستوى السجل)
+    
+    المستند نفسه والـ collections اللي فيه (accounts، tickets، daily_stats...) بتتعدل
+    مكانها، والـ containers اللي تحتهم على مسار كل op بس هي اللي بتتنسخ (shallow)؛
+    فالكتابة على حساب واحد بتنسخ الحساب ده بس مهما كان عدد الحسابات. سجل اتشاف
+    قبل كده مبيتعدلش أبداً، بيتبدل بنسخة جديدة: الـ snapshot (pin_doc) بيفضل شايفه زي ما هو.
+    """
+    fresh = set()
+    
+    def own(node):
+        if id(node) in fresh:
+            return node
+        node = dict(node) if isinstance(node, dict) else list(node)
+        fresh.add(id(node))
+        return node
+    
+    for op in ops:
+        path = op['path']
+        node = doc
+        for depth, key in enumerate(path[:-1]):
+            child = node.get(key)
+            if not isinstance(child, dict):
+                child = node[key] = own({})
+            elif depth >= 1:
+                # تحت الـ collection (السجل وجواه)
+                child = node[key] = own(child)
+            node = child
+        key = path[-1]
+        if op['op'] in ('append', 'merge', 'update', 'remove') and isinstance(node.get(key), (dict, list)):
+            if len(path) >= 2:
+                node[key] = own(node[key])
+            if op['op'] == 'update':
+                node[key] = [own(item) if item.get('id') == op['id'] else item for item in node[key]]
+        apply_ops(doc, [op])
+    return doc
+
+def pin_doc(doc: dict) -> dict:
+    """نسخة سطحية من المستند والـ collections اللي فيه (مراجع للسجلات نفسها، من غير نسخها)
+    
+    بتتاخد تحت lock الملف؛ الكتابات بعدها بتعدل الـ collections الأصلية بس.
+    """
+    return {key: dict(value) if isinstance(value, dict) else list(value) if isinstance(value, list) else value
+            for key, value in doc.items()}
+
+def private_copy(record: dict) -> dict:
+    """نسخة خاصة بالـ caller من سجل في الكاش: التعديل فيها ميوصلش للكاش"""
+    return {key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value for key, value in record.items()}
+
+class FrozenView(Mapping):
+    """عرض للقراءة بس لـ dict؛ الـ dicts والـ lists اللي جواه بترجع هي كمان للقراءة بس"""
+    __slots__ = ('_data',)
+    
+    def __init__(self, data: dict):
+        self._data = data
+    
+    def __getitem__(self, key):
+        return frozen(self._data[key])
+    
+    def __iter__(self):
+        return iter(self._data)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __repr__(self) -> str:
+        return f"FrozenView({self._data!r})"
+
+def frozen(value):
+    if isinstance(value, dict):
+        return FrozenView(value)
+    if isinstance(value, list):
+        return tuple(frozen(item) for item in value)
+    return value
+
+def default_stats() -> dict:
+    """العدادات الفاضية (مستند stats جديد أو لو القراءة فشلت)"""
+    return {
+        "total_sales": 0,
+        "total_revenue": 0,
+        "total_purchase_cost": 0,
+        "total_purchased": 0,
+        "total_purchases": 0,
+        "recent_purchases": [],
+        "daily_stats": {},
+        "seller_stats": {},
+        "rank_stats": {}
+    }
+
+def empty_summary() -> dict:
+    """stats_summary() فاضي"""
+    summary = {key: value for key, value in default_stats().items() if key.startswith('total_')}
+    summary.update(today={'sales': 0, 'revenue': 0}, recent_purchases=[], top_sellers=[], top_ranks=[],
+                   accounts={'total': 0})
+    return summary
+
+def top_names(entries: Dict[str, dict]) -> List[str]:
+    """أعلى TOP_STATS اسم: المبيعات، وبعدين الإيرادات، وبعدين الاسم (زي ORDER BY في SQLite)"""
+    return sorted(entries, key=lambda n: (-entries[n].get('sales', 0), -entries[n].get('revenue', 0), n))[:TOP_STATS]
+
+def status_counts(accounts) -> Dict[str, int]:
+    """{'total': العدد، status: العدد} زي AccountIndex.counts()"""
+    counts = {'total': 0}
+    for account in accounts:
+        counts['total'] += 1
+        status = account.get('status', 'not_finished')
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+class ReadSnapshot:
+    """نسخة للقراءة بس من كذا مستند اتاخدت في نفس اللحظة
+    
+    snapshot['accounts'] / ['tickets'] → {id: record}، ['stats'] → زي get_stats()، ['config'].
+    السجلات مشتركة مع الكاش من غير نسخ (الكتابات copy-on-write على مستوى السجل)،
+    وكل حاجة بترجع FrozenView / tuple فمحدش يقدر يعدل فيها.
+    """
+    
+    def __init__(self, docs: dict):
+        self._docs = {name: FrozenView(doc) for name, doc in docs.items()}
+    
+    def __getitem__(self, name: str):
+        return self._docs[name]
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._docs
+
+class AsyncDatabase(abc.ABC):
+    """الواجهة الـ async المشتركة للـ backends
+    
+    كل قراءة/كتابة على القرص بتتنفذ في thread pool محدود عشان الـ event loop
+    ميقفش على fsync. الكتابات على نفس الملف بتستنى asyncio.Lock خاص بالملف
+    قبل ما تاخد thread، فالقراءات والكتابات على ملفات تانية تفضل شغالة.
+    
+    مع الـ group commit الكتابات بتستنى في طابور لكل ملف لمدة GROUP_COMMIT_MS،
+    وبعدين الـ batch كله بيتنفذ في thread واحد ويتعمله fsync مرة واحدة
+    (_commit_batch). كل caller بيرجعله الرد بعد ما الـ batch بتاعه يبقى على القرص.
+    """
+    
+    def _start_executor(self):
+        self._executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="db-io")
+        self._doc_locks = {}
+        self._queues = {}
+        self._flushers = {}
+        self._entity_locks = weakref.WeakValueDictionary()
+        self.batches_committed = 0
+        self.batched_writes = 0
+        self.version_conflicts = 0
+        # indexes في الذاكرة (البحث، ترتيب الحسابات): كل واحد بيتبني أول ما يتطلب،
+        # وبعدها كل كتابة بتحدثه (_reindex)
+        self._indexes = {}
+        self._index_locks = {}
+        self._index_dirty = {}
+        # إجماليات بالساعة للمبيعات/المشتريات (rollups.py): بتتبني أول ما تتطلب وبعدها
+        # add_sale / add_purchase بيزودوها وهما ماسكين lock الإحصائيات
+        self._rollups = None
+    
+    def _doc_lock(self, path: str) -> asyncio.Lock:
+        lock = self._doc_locks.get(path)
+        if lock is None:
+            lock = self._doc_locks[path] = asyncio.Lock()
+        return lock
+    
+    def entity_lock(self, kind: str, record_id: str) -> asyncio.Lock:
+        """lock لسجل واحد (حساب/تذكرة): الـ read-modify-write على سجلات تانية مبيستناهوش"""
+        key = (kind, record_id)
+        lock = self._entity_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._entity_locks[key] = lock
+        return lock
+    
+    async def _modify(self, kind: str, get, update, record_id: str, change, retries: int) -> Optional[dict]:
+        """قراءة السجل → change(نسخة منه) → updates → compare-and-swap على version
+        
+        لو حد عدّل السجل بين القراءة والكتابة (من غير الـ entity lock) بنقرا تاني ونعيد.
+        """
+        async with self.entity_lock(kind, record_id):
+            for attempt in range(retries):
+                record = await get(record_id)
+                if record is None:
+                    return None
+                updates = change(dict(record))
+                if not updates:
+                    return record
+                version = record.get('version', 0)
+                if await update(record_id, updates, expected_version=version):
+                    return {**record, **updates, 'version': version + 1}
+                await asyncio.sleep(0.001 * 2 ** attempt)
+        log.warning("⚠️ Gave up updating %s %s after %s conflicts", kind, record_id, retries)
+        return None
+    
+    def _version_conflict(self, record_id: str, record: dict, expected_version) -> bool:
+        """True لو السجل اتغير عن النسخة اللي الـ caller قراها"""
+        if expected_version is None or record.get('version', 0) == expected_version:
+            return False
+        self.version_conflicts += 1
+        log.debug("🔁 Version conflict on %s: expected %s, found %s", record_id, expected_version, record.get('version', 0))
+        return True
+    
+    async def _call(self, func, *args):
+        """تنفيذ دالة sync في الـ thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+    
+    async def _call_locked(self, path: str, func, *args):
+        """تنفيذ كتابة على ملف معين (كتابة واحدة في المرة لكل ملف)"""
+        async with self._doc_lock(path):
+            return await self._call(func, *args)
+    
+    async def _call_batched(self, path: str, func, *args):
+        """كتابة بتدخل في الـ batch الجاي للملف (أو فوراً لو الـ group commit مقفول)"""
+        if GROUP_COMMIT_MS <= 0:
+            return await self._call_locked(path, func, *args)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(path, []).append((func, args, future))
+        if path not in self._flushers:
+            self._flushers[path] = asyncio.create_task(self._flush_queue(path))
+        return await future
+    
+    async def _flush_queue(self, path: str):
+        """تنفيذ طابور الملف batches لحد ما يفضى"""
+        try:
+            await asyncio.sleep(GROUP_COMMIT_MS / 1000)
+            async with self._doc_lock(path):
+                # اللي بيوصل أثناء تنفيذ batch بيتجمع في اللي بعده
+                while self._queues.get(path):
+                    batch = self._queues.pop(path)
+                    try:
+                        results = await self._call(self._commit_batch, path, [(func, args) for func, args, _ in batch])
+                    except Exception as e:
+                        results = [(False, e)] * len(batch)
+                    self.batches_committed += 1
+                    self.batched_writes += len(batch)
+                    
+                    for (_, _, future), (ok, value) in zip(batch, results):
+                        if future.done():
+                            continue
+                        if ok:
+                            future.set_result(value)
+                        else:
+                            future.set_exception(value)
+        finally:
+            self._flushers.pop(path, None)
+    
+    @abc.abstractmethod
+    def _commit_batch(self, path: str, calls: list) -> list:
+        """تنفيذ كتابات batch على ملف واحد → [(ok, result أو exception)]"""
+    
+    # ============ Wrapper Functions for async compatibility ============
+    async def load_json(self, path: str) -> dict:
+        """Async wrapper for reading JSON (نسخة كاملة خاصة بالـ caller)"""
+        return await self._call(self._load_copy, path)
+    
+    def _load_copy(self, path: str) -> dict:
+        return copy.deepcopy(self._read_file(path))
+    
+    async def save_json(self, path: str, data: dict):
+        """Async wrapper for writing JSON"""
+        await self._call_locked(path, self._write_file, path, data)
+        if path in (self.accounts_file, self.tickets_file):
+            # المستند كله اتبدل: الـ indexes بتتبني من جديد أول ما تتطلب
+            self._indexes.clear()
+        elif path == self.stats_file:
+            self._rollups = None
+    
+    # ============ Accounts Functions ============
+    async def add_account(self, account_data: dict) -> str:
+        """إضافة حساب جديد"""
+        account_id = await self._call_batched(self.accounts_file, self._add_account, account_data)
+        if account_id != "ERROR":
+            await self._reindex('account', account_id, account_data)
+        return account_id
+    
+    async def add_accounts(self, accounts: List[dict]) -> List[str]:
+        """إضافة حسابات كتير في transaction واحدة → الـ IDs بالترتيب ([] لو فشلت، ومفيش ولا حساب بيتضاف)"""
+        account_ids = await self._call_locked(self.accounts_file, self._add_accounts, accounts)
+        for account in accounts if account_ids else []:
+            await self._reindex('account', account['id'], account)
+        return account_ids
+    
+    async def get_account(self, account_id: str) -> Optional[dict]:
+        """الحصول على حساب بواسطة ID"""
+        return await self._call(self._get_account, account_id)
+    
+    async def update_account(self, account_id: str, updates: dict, expected_version: int = None) -> bool:
+        """تحديث بيانات حساب (expected_version: يتكتب بس لو الحساب لسه على النسخة دي)"""
+        updated = await self._call_batched(self.accounts_file, self._update_account, account_id, updates, expected_version)
+        if updated:
+            await self._reindex('account', account_id)
+        return updated
+    
+    async def modify_account(self, account_id: str, change, retries: int = MODIFY_RETRIES) -> Optional[dict]:
+        """read-modify-write آمن: change(account) → dict التعديلات → الحساب بعد التعديل (None لو مش موجود)"""
+        return await self._modify('account', self.get_account, self.update_account, account_id, change, retries)
+    
+    async def delete_account(self, account_id: str) -> bool:
+        """حذف حساب"""
+        deleted = await self._call_batched(self.accounts_file, self._delete_account, account_id)
+        if deleted:
+            await self._reindex('account', account_id)
+        return deleted
+    
+    async def get_all_accounts(self, status: str = None, full: bool = True) -> List[dict]:
+        """الحصول على جميع الحسابات (full=False: من غير الحقول النصية الكبيرة، أخف في الذاكرة)"""
+        return await self._call(self._get_all_accounts, status, full)
+    
+    async def get_backup_accounts(self, chunk: int = 500):
+        """النسخ الاحتياطية (async generator: بيقرا chunk ورا chunk من الـ store)
+        
+        async for account in db.get_backup_accounts(): ...
+        """
+        cursor = 0
+        while cursor is not None:
+            records, cursor = await self._call(self._read_backups, cursor, chunk)
+            for record in records:
+                yield record
+    
+    async def prune_backups(self) -> int:
+        """تطبيق الـ retention على النسخ الاحتياطية → عدد اللي اتشال
+        
+        البوت بيشغلها في الخلفية مع setup_hook (مش مع إنشاء الـ instance، عشان
+        import database لوحده ميمسحش حاجة).
+        """
+        return await self._call(self._prune_backups)
+    
+    # ============ Tickets Functions ============
+    async def create_ticket(self, ticket_data: dict) -> str:
+        """إنشاء تذكرة جديدة"""
+        ticket_id = await self._call_batched(self.tickets_file, self._create_ticket, ticket_data)
+        if ticket_id != "ERROR":
+            await self._reindex('ticket', ticket_id, ticket_data)
+        return ticket_id
+    
+    async def get_ticket(self, ticket_id: str) -> Optional[dict]:
+        """الحصول على تذكرة بواسطة ID"""
+        return await self._call(self._get_ticket, ticket_id)
+    
+    async def get_ticket_by_channel(self, channel_id: int) -> Optional[dict]:
+        """الحصول على التذكرة المفتوحة لقناة معينة"""
+        return await self._call(self._get_ticket_by_channel, channel_id)
+    
+    async def update_ticket(self, ticket_id: str, updates: dict, expected_version: int = None) -> bool:
+        """تحديث بيانات تذكرة (expected_version: يتكتب بس لو التذكرة لسه على النسخة دي)"""
+        updated = await self._call_batched(self.tickets_file, self._update_ticket, ticket_id, updates, expected_version)
+        if updated:
+            await self._reindex('ticket', ticket_id)
+        return updated
+    
+    async def modify_ticket(self, ticket_id: str, change, retries: int = MODIFY_RETRIES) -> Optional[dict]:
+        """read-modify-write آمن لتذكرة مفتوحة (زي modify_account)"""
+        return await self._modify('ticket', self.get_ticket, self.update_ticket, ticket_id, change, retries)
+    
+    async def close_ticket(self, ticket_id: str, close_data: dict) -> bool:
+        """إغلاق تذكرة"""
+        closed = await self._call_batched(self.tickets_file, self._close_ticket, ticket_id, close_data)
+        if closed:
+            await self._reindex('ticket', ticket_id)
+        return closed
+    
+    async def get_closed_ticket(self, ticket_id: str) -> Optional[dict]:
+        """تذكرة مقفولة من الأرشيف"""
+        return await self._call(self._get_closed_ticket, ticket_id)
+    
+    async def get_closed_tickets_by_user(self, user_id: int) -> List[dict]:
+        """كل التذاكر المقفولة لمستخدم"""
+        return await self._call(self._get_closed_tickets_by_user, user_id)
+    
+    async def count_closed_tickets(self) -> int:
+        """عدد التذاكر المقفولة"""
+        return await self._call(self._count_closed_tickets)
+    
+    # ============ Stats Functions ============
+    async def add_sale(self, sale_data: dict):
+        """إضافة عملية بيع للإحصائيات"""
+        await self._call_batched(self.stats_file, self._add_sale, sale_data)
+    
+    async def add_purchase(self, purchase_data: dict) -> str:
+        """إضافة عملية شراء حسابات"""
+        return await self._call_batched(self.stats_file, self._add_purchase, purchase_data)
+    
+    async def get_stats(self, history: bool = False) -> dict:
+        """الحصول على الإحصائيات (العدادات بس، إلا لو history=True)"""
+        return await self._call(self._get_stats, history)
+    
+    async def stats_summary(self) -> dict:
+        """اللي embed الإحصائيات محتاجه بس، من عدادات بتتحدث مع كل كتابة
+        
+        total_* و recent_purchases زي get_stats()، today = {sales, revenue} النهارده،
+        top_sellers / top_ranks = [(الاسم، {sales, revenue})] (أعلى TOP_STATS)،
+        accounts = {'total': العدد، status: العدد}. مفيش مبيعات بتتعد أو تترتب وقت العرض.
+        
+        عدد الحسابات بيتقري مع الإحصائيات في نفس القراءة (مش من index الحسابات اللي
+        بيتحدث بعد الكتابة)، فالـ embed مبيجمعش أرقام من لحظتين مختلفتين.
+        """
+        return await self._call(self._stats_summary)
+    
+    async def stats_range(self, start: datetime, end: datetime, unit: str = None) -> dict:
+        """إجماليات المبيعات/الإيرادات/المشتريات في [start, end) من الـ rollups
+        
+        → {'total', 'previous' (نفس الطول قبل start)، 'unit'، 'buckets': [(بداية، إجماليات)]}؛
+        كل رقم فرق خانتين في الـ prefix sums، مش قراءة للسجل.
+        """
+        return await self._call(self._stats_range, start, end, unit)
+    
+    async def get_sales(self, start=None, end=None, limit: int = None) -> List[dict]:
+        """المبيعات في المدى [start, end) (آخر limit لو محدد)"""
+        return await self._call(self._get_history, 'sales', start, end, limit)
+    
+    async def get_purchases(self, start=None, end=None, limit: int = None) -> List[dict]:
+        """المشتريات في المدى [start, end) (آخر limit لو محدد)"""
+        return await self._call(self._get_history, 'purchases', start, end, limit)
+    
+    async def get_config(self) -> dict:
+        """الحصول على الإعدادات"""
+        return await self._call(self._get_config)
+    
+    async def snapshot(self, *names: str) -> ReadSnapshot:
+        """قراءة كذا مستند في نفس اللحظة: snapshot = await db.snapshot('stats', 'accounts')"""
+        return await self._call(self._snapshot, names)
+    
+    async def save_config(self, config: dict):
+        """حفظ الإعدادات"""
+        await self._call_batched(self.config_file, self._save_config, config)
+    
+    # ============ Indexes ============
+    async def _index(self, name: str, factory, records):
+        """index متبني (أول مرة: factory() + put لكل (kind, record) من records() في thread)
+        
+        الكتابات اللي بتحصل أثناء البناء بتتعاد بعده.
+        """
+        lock = self._index_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(name)
+            if index is None:
+                started = time.perf_counter()
+                self._index_dirty[name] = set()
+                index = factory()
+                try:
+                    for kind, record in await self._call(records):
+                        index.put(kind, record)
+                finally:
+                    dirty = self._index_dirty.pop(name)
+                self._indexes[name] = index
+                for kind, record_id in dirty:
+                    await self._reindex(kind, record_id)
+                log.info("🗂️ Built %s index: %s records", name, len(index), extra=fields(ms=lazy(elapsed_ms, started)))
+            return index
+    
+    async def _index_record(self, kind: str, record_id: str) -> Optional[dict]:
+        if kind == 'account':
+            return await self.get_account(record_id)
+        return await self.get_ticket(record_id) or await self.get_closed_ticket(record_id)
+    
+    async def _reindex(self, kind: str, record_id: str, record: dict = None):
+        """تحديث سجل في الـ indexes بعد كتابة (record=None: بيتقرا من جديد، ولو مش موجود بيتشال)"""
+        for dirty in self._index_dirty.values():
+            dirty.add((kind, record_id))
+        if not self._indexes:
+            return
+        if record is None:
+            record = await self._index_record(kind, record_id)
+        for index in list(self._indexes.values()):
+            if record is None:
+                index.remove(kind, record_id)
+            else:
+                index.put(kind, record)
+    
+    # ============ Search ============
+    async def search(self, query: str, kinds=None, sensitive: bool = False,
+                     offset: int = 0, limit: int = 10):
+        """بحث في الحسابات والتذاكر → (عدد النتايج كله، [(kind, record, score)] للصفحة)
+        
+        sensitive=False: account_info مبيدخلش في المطابقة (للأدمن بس).
+        """
+        try:
+            index = await self._index('search', SearchIndex, self._search_records)
+        except Exception as e:
+            log.error("❌ Error building search index: %s", e)
+            return 0, []
+        started = time.perf_counter()
+        total, page = index.search(query, kinds, sensitive, offset, limit)
+        log.debug("🔎 Search %r: %s results", query, total, extra=fields(ms=lazy(elapsed_ms, started)))
+        
+        results = []
+        for kind, record_id, score in page:
+            record = await self._index_record(kind, record_id)
+            if record is not None:
+                results.append((kind, record, score))
+        return total, results
+    
+    @abc.abstractmethod
+    def _search_records(self) -> List[tuple]:
+        """[(kind, record)] لكل الحسابات والتذاكر (المفتوحة والمقفولة) لبناء الـ index"""
+    
+    # ============ Account Listing ============
+    async def list_accounts(self, status: str = None, min_level: int = None, max_level: int = None,
+                            rank: str = None, opened_by: str = None, cursor: str = None,
+                            limit: int = PAGE_SIZE) -> dict:
+        """صفحة حسابات بفلاتر → {'accounts', 'next', 'prev'} (الـ cursors بتترجع زي ما هي)
+        
+        الصفوف فيها id, status, current_level, opened_by, rank بس (من غير قراءة الحسابات).
+        """
+        try:
+            index = await self._index('accounts', AccountIndex, self._account_records)
+            accounts, next_cursor, prev_cursor = index.page(status, min_level, max_level, rank, opened_by, cursor, limit)
+        except Exception as e:
+            log.error("❌ Error listing accounts: %s", e)
+            return {'accounts': [], 'next': None, 'prev': None}
+        return {'accounts': accounts, 'next': next_cursor, 'prev': prev_cursor}
+    
+    async def accounts_in_levels(self, min_level: int, max_level: int, status: str = None,
+                                 limit: int = None) -> Tuple[int, List[dict]]:
+        """الحسابات من لفل لـ لفل (الأعلى الأول) → (العدد، أول limit صف) من index اللفل"""
+        try:
+            index = await self._index('accounts', AccountIndex, self._account_records)
+            return index.level_range(min_level, max_level, status, limit)
+        except Exception as e:
+            log.error("❌ Error reading level range: %s", e)
+            return 0, []
+    
+    async def account_counts(self) -> dict:
+        """{'total': العدد، status: العدد} من index الحسابات (من غير قراءة الحسابات)"""
+        try:
+            index = await self._index('accounts', AccountIndex, self._account_records)
+            return index.counts()
+        except Exception as e:
+            log.error("❌ Error counting accounts: %s", e)
+            return {'total': 0}
+    
+    def _account_records(self) -> List[tuple]:
+        return [('account', account) for account in self._get_all_accounts(None, False)]
+    
+    # ============ Rollups ============
+    @abc.abstractmethod
+    def _stats_lock(self):
+        """الـ lock اللي add_sale / add_purchase بيكتبوا وهما ماسكينه"""
+    
+    def _rollups_locked(self) -> Rollups:
+        """الـ rollups (أول مرة: من السجل كله)؛ لازم _stats_lock يكون ماسك"""
+        if self._rollups is None:
+            started = time.perf_counter()
+            rollups = Rollups()
+            for kind in ('sales', 'purchases'):
+                for record in self._get_history(kind):
+                    rollups.add(kind, record)
+            self._rollups = rollups
+            log.info("🗂️ Built rollups: %s hours", len(rollups), extra=fields(ms=lazy(elapsed_ms, started)))
+        return self._rollups
+    
+    def _roll(self, kind: str, record: dict):
+        """سجل جديد اتكتب (جوه _stats_lock): لو الـ rollups متبنية بيتضاف ليها"""
+        if self._rollups is not None:
+            self._rollups.add(kind, record)
+    
+    def _stats_range(self, start: datetime, end: datetime, unit: str = None) -> dict:
+        unit = unit or pick_unit(start, end)
+        try:
+            with self._stats_lock():
+                rollups = self._rollups_locked()
+                return {
+                    'total': rollups.total(start, end),
+                    'previous': rollups.total(start - (end - start), start),
+                    'unit': unit,
+                    'buckets': rollups.buckets(start, end, unit)
+                }
+        except Exception as e:
+            log.error("❌ Error reading stats range: %s", e)
+            empty = dict.fromkeys(METRICS, 0)
+            return {'total': empty, 'previous': dict(empty), 'unit': unit, 'buckets': []}
 
-class Database:
-    def __init__(self):
-        ensure_data_dir()
-        self.accounts_file = f"{DATA_DIR}/accounts.json"
-        self.tickets_file = f"{DATA_DIR}/tickets.json"
-        self.stats_file = f"{DATA_DIR}/stats.json"
-        self.config_file = f"{DATA_DIR}/config.json"
-        self.lock = threading.Lock()
+class Database(AsyncDatabase):
+    def __init__(self, data_dir: str = DATA_DIR):
+        # data_dir غير DATA_DIR: import_json في SQLite بيقرا نسخة من مجلد تاني
+        self.data_dir = data_dir
+        ensure_data_dir(data_dir)
+        self.accounts_file = f"{self.data_dir}/accounts.json"
+        self.tickets_file = f"{self.data_dir}/tickets.json"
+        self.stats_file = f"{self.data_dir}/stats.json"
+        self.config_file = f"{self.data_dir}/config.json"
+        # سجل المبيعات والمشتريات: segment لكل شهر (data/sales/2026-10.jsonl)،
+        # وإجمالي كل segment في stats.json['manifest']
+        self.log_kinds = ('sales', 'purchases')
+        # أرشيف التذاكر المقفولة: gzip member لكل تذكرة + index (id → offset)
+        self.archive_file = f"{self.data_dir}/archive/tickets.jsonl.gz"
+        self.archive_index_file = f"{self.data_dir}/archive/tickets.idx"
+        self._archive_index = None
+        # نسخ الحسابات الاحتياطية: objects/<sha256>.json (المحتوى نفسه هو الاسم)
+        # + refs.jsonl (سطر لكل نسخة: id, hash, at)
+        self.backup_dir = f"{self.data_dir}/backups"
+        self.backup_refs = f"{self.data_dir}/backups/refs.jsonl"
+        # ملفات اتنقلت بيانتها لمكان تاني وتتمسح بعد ما الـ snapshot الجديد يتكتب
+        self._obsolete = {}
+        self._text_tails = {}
+        # lock لكل ملف: الكتابة على ملف مش بتوقف القراءة من ملف تاني
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        # كاش للملفات في الذاكرة: path -> (stamp, data)
+        self._cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # آخر رقم تسلسلي اتطبق لكل ملف، وعدد السجلات في الـ journal
+        self._seqs = {}
+        self._journal_counts = {}
+        self._compacting = set()
+        self._generations = {}
+        # سطور الـ journal اللي مستنية fsync الـ batch الحالي: path -> [lines]
+        self._batches = {}
+        # سطور الـ logs المستنية نفس الـ batch: path -> {log_path: [lines]}
+        self._log_batches = {}
+        self._start_executor()
         self._init_files()
     
-    def _init_files(self):
+    def _init_files(self, only: str = None):
         """إنشاء ملفات JSON الأساسية"""
         defaults = {
             self.accounts_file: {
-                "accounts": [],
-                "backup": []
+                "accounts": {},
+                "sequences": {"ACC": 0}
             },
             self.tickets_file: {
-                "tickets": [],
-                "closed_tickets": []
+                "tickets": {},
+                "channel_index": {},
+                "sequences": {"TKT": 0}
             },
             self.stats_file: {
+                "sequences": {"PUR": 0},
+                "manifest": {"sales": {}, "purchases": {}},
                 "total_sales": 0,
                 "total_revenue": 0,
                 "total_purchase_cost": 0,
-                "accounts_sold": [],
-                "purchases": [],
+                "total_purchased": 0,
+                "total_purchases": 0,
+                "recent_purchases": [],
                 "daily_stats": {},
                 "seller_stats": {},
                 "rank_stats": {}
@@ -50,390 +785,1277 @@ class Database:
         }
         
         for file_path, default_data in defaults.items():
+            if only and file_path != only:
+                continue
             if not os.path.exists(file_path):
                 try:
                     self._write_file(file_path, default_data)
-                    print(f"✅ Created file: {file_path}")
+                    log.info("✅ Created file: %s", file_path)
                 except Exception as e:
-                    print(f"❌ Error creating {file_path}: {e}")
+                    log.error("❌ Error creating %s: %s", file_path, e)
+    
+    def _lock_for(self, file_path: str) -> threading.RLock:
+        with self._locks_guard:
+            lock = self._locks.get(file_path)
+            if lock is None:
+                lock = self._locks[file_path] = threading.RLock()
+            return lock
+    
+    def _locks_for(self, paths) -> ExitStack:
+        """locks كذا ملف مع بعض (القراءة من القرص لو الكاش قديم بتحصل قبلها)
+        
+        دايماً بنفس الترتيب عشان اتنين ماسكين نفس الملفات ميقفلوش على بعض.
+        """
+        paths = sorted(set(paths))
+        for path in paths:
+            self._read_file(path)
+        stack = ExitStack()
+        for path in paths:
+            stack.enter_context(self._lock_for(path))
+        return stack
+    
+    def _file_stamp(self, file_path: str):
+        """بصمة الملف على القرص (وقت التعديل + الحجم)"""
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _doc_stamp(self, file_path: str):
+        """بصمة المستند = بصمة الـ snapshot + بصمة الـ journal"""
+        return (self._file_stamp(file_path), self._file_stamp(f"{file_path}.journal"))
+    
+    def _replay_journal(self, journal_path: str, data: dict, seq: int):
+        """تطبيق سجلات الـ journal اللي بعد آخر snapshot"""
+        if not os.path.exists(journal_path):
+            return seq, 0
+        
+        applied = 0
+        good_end = 0
+        with open(journal_path, 'rb') as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # سطر ناقص من كتابة اتقطعت
+                try:
+                    record = serializers.loads_line(raw)
+                except json.JSONDecodeError:
+                    break
+                good_end += len(raw)
+                if record['seq'] <= seq:
+                    continue
+                apply_ops(data, record['ops'])
+                seq = record['seq']
+                applied += 1
+        
+        # شيل أي بقايا كتابة ناقصة عشان الإضافات الجاية متتلزقش فيها
+        if good_end != os.path.getsize(journal_path):
+            log.warning("⚠️ Truncating torn journal tail: %s", journal_path)
+            with open(journal_path, 'r+b') as f:
+                f.truncate(good_end)
+        return seq, applied
+    
+    def _load_file(self, file_path: str) -> dict:
+        """تحميل الـ snapshot وإعادة تطبيق الـ journal عليه"""
+        # الصيغة (JSON / msgpack) بتتعرف من المحتوى؛ ملف فاضي = {}
+        started = time.perf_counter()
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        data = serializers.loads(raw)
+        
+        seq = data.pop('_seq', 0)
+        seq, old_count = self._replay_journal(f"{file_path}.journal.old", data, seq)
+        seq, count = self._replay_journal(f"{file_path}.journal", data, seq)
+        
+        self._seqs[file_path] = seq
+        self._journal_counts[file_path] = old_count + count
+        log.debug("📖 Read from %s", os.path.basename(file_path),
+                  extra=fields(bytes=lazy(len, raw), replayed=old_count + count, ms=lazy(elapsed_ms, started)))
+        return data
     
     def _read_file(self, file_path: str) -> dict:
-        """قراءة ملف JSON بشكل متزامن"""
-        with self.lock:
+        """قراءة ملف JSON من الكاش، أو من القرص لو الملف اتغير"""
+        with self._lock_for(file_path):
             try:
                 if not os.path.exists(file_path):
-                    print(f"⚠️ File not found: {file_path}, initializing...")
-                    self._init_files()
+                    log.warning("⚠️ File not found: %s, initializing...", file_path)
+                    self._init_files(only=file_path)
+                
+                stamp = self._doc_stamp(file_path)
+                cached = self._cache.get(file_path)
+                if cached is not None and cached[0] == stamp:
+                    self.cache_hits += 1
+                    return cached[1]
                 
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    print(f"📖 Read from {os.path.basename(file_path)}: {len(str(data))} chars")
-                    return data
+                self.cache_misses += 1
+                data = self._load_file(file_path)
+                self._cache[file_path] = (self._doc_stamp(file_path), data)
+                if self._upgrade(file_path, data):
+                    self._write_file(file_path, data)
+                    log.info("⬆️ Upgraded %s to the current layout", os.path.basename(file_path))
+                return data
             except json.JSONDecodeError as e:
-                print(f"❌ JSON Error in {file_path}: {e}")
+                log.error("❌ JSON Error in %s: %s", file_path, e)
                 return {}
             except Exception as e:
-                print(f"❌ Error reading {file_path}: {e}")
+                log.error("❌ Error reading %s: %s", file_path, e)
                 return {}
     
-    def _write_file(self, file_path: str, data: dict):
-        """كتابة ملف JSON بشكل متزامن مع التأكد من الحفظ"""
-        with self.lock:
-            try:
-                # Write to temp file first
-                temp_file = f"{file_path}.tmp"
-                
-                with open(temp_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+    def _upgrade(self, file_path: str, data: dict) -> bool:
+        """تحويل الملفات القديمة للشكل الحالي (بيعدل data مكانها)"""
+        if not data:
+            return False
+        changed = False
+        if 'sequences' not in data:
+            changed = self._upgrade_sequences(file_path, data)
+        if file_path == self.stats_file and ('accounts_sold' in data or 'purchases' in data):
+            self._split_stats(data)
+            changed = True
+        elif file_path == self.stats_file and 'manifest' not in data:
+            self._partition_logs(data)
+            changed = True
+        if file_path == self.tickets_file and 'closed_tickets' in data:
+            self._archive_closed(data)
+            changed = True
+        if file_path == self.accounts_file and 'backup' in data:
+            self._move_backups(data)
+            changed = True
+        if file_path == self.accounts_file and self._text_layout_stale(data):
+            self._relayout_text(data)
+            changed = True
+        return changed
+    
+    def _archive_closed(self, data: dict):
+        """نقل closed_tickets من tickets.json للأرشيف"""
+        closed = data.pop('closed_tickets', None) or {}
+        if isinstance(closed, list):
+            closed = {t.get('id'): t for t in closed}
+        with self._lock_for(self.tickets_file):
+            index = self._archive_map()
+            # لو الترقية اتقطعت قبل كده، اللي اتأرشف خلاص ميتكررش
+            pending = [t for ticket_id, t in closed.items() if ticket_id not in index['ids']]
+            if pending:
+                self._archive_tickets(pending)
+        log.info("📦 Archived %s closed tickets", len(pending))
+    
+    def _split_stats(self, data: dict):
+        """نقل accounts_sold / purchases من stats.json للـ segments وحساب عداداتها"""
+        sales = data.pop('accounts_sold', None) or []
+        purchases = data.pop('purchases', None) or []
+        data['manifest'] = {
+            'sales': self._write_segments('sales', sales),
+            'purchases': self._write_segments('purchases', purchases)
+        }
+        data['total_purchased'] = sum(p.get('quantity', 0) for p in purchases)
+        data['total_purchases'] = len(purchases)
+        data['recent_purchases'] = purchases[-RECENT_PURCHASES:]
+    
+    def _partition_logs(self, data: dict):
+        """تقسيم data/sales.jsonl و purchases.jsonl (سجل واحد) على segments شهرية"""
+        data['manifest'] = {}
+        for kind in self.log_kinds:
+            legacy = f"{self.data_dir}/{kind}.jsonl"
+            if os.path.exists(legacy):
+                data['manifest'][kind] = self._write_segments(kind, self._read_log(legacy))
+                self._obsolete.setdefault(self.stats_file, []).append(legacy)
+            else:
+                # مستند من غير manifest (save_json يدوي): نحسبه من الـ segments الموجودة
+                data['manifest'][kind] = self._scan_segments(kind)
+    
+    def _scan_segments(self, kind: str) -> dict:
+        """إعادة حساب manifest نوع من ملفات الـ segments نفسها"""
+        folder = f"{self.data_dir}/{kind}"
+        manifest = {}
+        if not os.path.isdir(folder):
+            return manifest
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith('.jsonl'):
+                continue
+            totals = manifest[name[:-len('.jsonl')]] = {}
+            for record in self._read_log(os.path.join(folder, name)):
+                for key, value in segment_totals(kind, record).items():
+                    totals[key] = totals.get(key, 0) + value
+        return manifest
+    
+    def _segment_path(self, kind: str, month: str) -> str:
+        return f"{self.data_dir}/{kind}/{month}.jsonl"
+    
+    def _write_segments(self, kind: str, records: List[dict]) -> dict:
+        """استبدال كل segments النوع ده بالسجلات دي → manifest
+        
+        استبدال مش إضافة: لو الترقية اتقطعت قبل كده منكررش السجلات.
+        """
+        months = {}
+        for record in records:
+            months.setdefault(month_of(record.get('date')), []).append(record)
+        
+        folder = f"{self.data_dir}/{kind}"
+        os.makedirs(folder, exist_ok=True)
+        for name in os.listdir(folder):
+            if name.endswith('.jsonl') and name[:-len('.jsonl')] not in months:
+                os.remove(os.path.join(folder, name))
+        
+        manifest = {}
+        for month, items in months.items():
+            self._write_log(self._segment_path(kind, month), items)
+            totals = manifest[month] = {}
+            for record in items:
+                for key, value in segment_totals(kind, record).items():
+                    totals[key] = totals.get(key, 0) + value
+        return manifest
+    
+    def _upgrade_sequences(self, file_path: str, data: dict) -> bool:
+        """lists → dicts بالـ ID + sequence لكل نوع"""
+        if file_path == self.accounts_file:
+            # الـ sequence يبدأ بعد أكبر ID اتستخدم (حتى في الـ backup) عشان ميتكررش
+            used = [a.get('id') for a in record_list(data.get('accounts')) + record_list(data.get('backup'))
+                    if isinstance(a, dict)]
+            seq = max(map(id_number, used), default=0)
+            data['accounts'], seq = keyed_records(data.get('accounts'), 'ACC', seq)
+            data['sequences'] = {'ACC': seq}
+        elif file_path == self.tickets_file:
+            tickets = record_list(data.get('tickets')) + record_list(data.get('closed_tickets'))
+            seq = max((id_number(t.get('id')) for t in tickets if isinstance(t, dict)), default=0)
+            data['tickets'], seq = keyed_records(data.get('tickets'), 'TKT', seq)
+            data['closed_tickets'], seq = keyed_records(data.get('closed_tickets'), 'TKT', seq)
+            data['channel_index'] = {
+                str(t['channel_id']): t['id'] for t in data['tickets'].values() if t.get('channel_id')
+            }
+            data['sequences'] = {'TKT': seq}
+        elif file_path == self.stats_file:
+            seq = max((id_number(p.get('id')) for p in data.get('purchases', [])), default=0)
+            data['sequences'] = {'PUR': seq}
+        else:
+            return False
+        return True
+    
+    def _next_id(self, file_path: str, prefix: str):
+        """ID جديد من الـ sequence المحفوظ → (id, op) والـ op لازم يدخل في نفس الـ _mutate"""
+        data = self._read_file(file_path)
+        seq = data.get('sequences', {}).get(prefix, 0) + 1
+        return f"{prefix}-{seq:04d}", {'op': 'incr', 'path': ['sequences', prefix], 'value': 1}
+    
+    def _write_temp(self, temp_file: str, text, sync: bool = True):
+        """كتابة ملف مؤقت مع fsync (نص أو bytes)"""
+        if isinstance(text, str):
+            text = text.encode('utf-8')
+        try:
+            with open(temp_file, 'wb') as f:
+                f.write(text)
+                if sync:
                     f.flush()  # Force write to disk
                     os.fsync(f.fileno())  # Ensure data is written to disk
+        except Exception:
+            # Clean up temp file if exists
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+    
+    def _write_file(self, file_path: str, data: dict):
+        """استبدال المستند بالكامل (snapshot جديد + تفريغ الـ journal)
+        
+        مستند stats فيه accounts_sold / purchases بيستبدل الـ logs بيهم.
+        """
+        with self._lock_for(file_path):
+            try:
+                started = time.perf_counter()
+                self._upgrade(file_path, data)
+                seq = self._seqs.get(file_path, 0)
+                text = serializers.dumps({**data, '_seq': seq})
+                self._write_temp(f"{file_path}.tmp", text)
+                os.replace(f"{file_path}.tmp", file_path)
                 
-                # Replace original file
-                if os.path.exists(file_path):
-                    os.replace(temp_file, file_path)
-                else:
-                    os.rename(temp_file, file_path)
-                
-                # Verify write
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    verify = json.load(f)
-                    if verify != data:
-                        raise Exception("Data verification failed!")
+                # السجلات القديمة كلها رقمها <= seq فمش هتتطبق تاني حتى لو فضلت
+                for journal in (f"{file_path}.journal", f"{file_path}.journal.old"):
+                    if os.path.exists(journal):
+                        os.remove(journal)
+                self._journal_counts[file_path] = 0
+                if file_path in self._batches:
+                    # التعديلات المستنية في الـ batch اتغطت بالـ snapshot ده
+                    self._batches[file_path] = []
+                self._generations[file_path] = self._generations.get(file_path, 0) + 1
                 
-                print(f"💾 Saved to {os.path.basename(file_path)}: {len(str(data))} chars")
+                for path in self._obsolete.pop(file_path, []):
+                    if os.path.exists(path):
+                        os.remove(path)
                 
+                # Write-through: الكاش يفضل مطابق للملف اللي اتكتب
+                self._cache[file_path] = (self._doc_stamp(file_path), data)
+                log.debug("💾 Saved to %s", os.path.basename(file_path),
+                          extra=fields(bytes=lazy(len, text), format=lazy(serializers.resolve), ms=lazy(elapsed_ms, started)))
+            
             except Exception as e:
-                print(f"❌ Error writing {file_path}: {e}")
-                # Clean up temp file if exists
-                if os.path.exists(f"{file_path}.tmp"):
-                    os.remove(f"{file_path}.tmp")
+                log.error("❌ Error writing %s: %s", file_path, e)
+                self._cache.pop(file_path, None)
                 raise
     
-    # ============ Wrapper Functions for async compatibility ============
-    async def load_json(self, path: str) -> dict:
-        """Async wrapper for reading JSON"""
-        return self._read_file(path)
+    def _mutate(self, file_path: str, ops: List[dict]):
+        """تسجيل تعديل صغير في الـ journal (append + fsync) وتطبيقه على الكاش"""
+        with self._lock_for(file_path):
+            data = self._read_file(file_path)
+            if file_path not in self._cache:
+                raise Exception(f"Cannot journal to unreadable file: {file_path}")
+            
+            seq = self._seqs.get(file_path, 0) + 1
+            line = serializers.dumps_line({'seq': seq, 'ops': ops})
+            # السجلات اللي بتتغير بتتنسخ: أي ReadSnapshot ماسك القديمة ميتأثرش
+            updated = cow_ops(data, ops)
+            batch = self._batches.get(file_path)
+            if batch is not None:
+                # جوه batch: السطر بيتكتب مع الباقي في _commit_batch
+                self._cache[file_path] = (self._cache[file_path][0], updated)
+                self._seqs[file_path] = seq
+                batch.append(line)
+                return
+            
+            try:
+                self._append_journal(file_path, [line])
+                self._cache[file_path] = (self._cache[file_path][0], updated)
+                self._seqs[file_path] = seq
+            except Exception as e:
+                log.error("❌ Error journaling %s: %s", file_path, e)
+                self._cache.pop(file_path, None)
+                raise
     
-    async def save_json(self, path: str, data: dict):
-        """Async wrapper for writing JSON"""
-        self._write_file(path, data)
+    def _append_lines(self, path: str, lines: List[str]):
+        """إضافة سطور لملف بـ write + fsync واحد"""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("".join(line + "\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
     
-    # ============ Accounts Functions ============
-    async def add_account(self, account_data: dict) -> str:
-        """إضافة حساب جديد"""
-        try:
-            data = self._read_file(self.accounts_file)
-            
-            if 'accounts' not in data:
-                data['accounts'] = []
-            if 'backup' not in data:
-                data['backup'] = []
+    def _append_log(self, owner: str, log_path: str, record: dict):
+        """إضافة سجل لـ log تابع لمستند (لازم lock المستند يكون متاخد)
+        
+        جوه batch السطر بيتكتب مع الـ batch قبل الـ journal بتاع المستند.
+        """
+        self._append_line(owner, log_path, serializers.dumps_line(record))
+    
+    def _append_line(self, owner: str, log_path: str, line: str):
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        pending = self._log_batches.get(owner)
+        if pending is not None:
+            pending.setdefault(log_path, []).append(line)
+        else:
+            self._append_lines(log_path, [line])
+    
+    def _read_log(self, log_path: str) -> List[dict]:
+        """قراءة كل سجلات log (السطر الأخير الناقص بيتساب)"""
+        records = []
+        if not os.path.exists(log_path):
+            return records
+        with open(log_path, 'rb') as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    records.append(serializers.loads_line(raw))
+                except json.JSONDecodeError:
+                    log.warning("⚠️ Skipping bad line in %s", os.path.basename(log_path))
+        return records
+    
+    def _log_record(self, kind: str, record: dict) -> List[dict]:
+        """إضافة سجل للـ segment بتاع شهره → ops الـ manifest (لنفس الـ _mutate)"""
+        month = month_of(record.get('date'))
+        self._append_log(self.stats_file, self._segment_path(kind, month), record)
+        return [
+            {'op': 'incr', 'path': ['manifest', kind, month, key], 'value': value}
+            for key, value in segment_totals(kind, record).items()
+        ]
+    
+    def _iter_segments(self, kind: str, start=None, end=None, newest_first: bool = False):
+        """السجلات من الـ segments اللي في المدى بس [start, end)، segment واحد في الذاكرة"""
+        start = start.isoformat() if isinstance(start, datetime) else start
+        end = end.isoformat() if isinstance(end, datetime) else end
+        with self._lock_for(self.stats_file):
+            months = sorted(self._read_file(self.stats_file).get('manifest', {}).get(kind, {}))
+        months = [m for m in months
+                  if (start is None or m >= start[:7]) and (end is None or m <= end[:7])]
+        
+        for month in (reversed(months) if newest_first else months):
+            records = self._read_log(self._segment_path(kind, month))
+            if newest_first:
+                records.reverse()
+            for record in records:
+                date = record.get('date', '')
+                if (start is None or date >= start) and (end is None or date < end):
+                    yield record
+    
+    def _write_log(self, log_path: str, records: List[dict]):
+        """استبدال log بالكامل (temp + replace)"""
+        text = "".join(serializers.dumps_line(r) + "\n" for r in records)
+        self._write_temp(f"{log_path}.tmp", text)
+        os.replace(f"{log_path}.tmp", log_path)
+    
+    def _append_journal(self, file_path: str, lines: List[str]):
+        """كتابة سطور في الـ journal بـ write + fsync واحد (الـ lock لازم يكون متاخد)"""
+        self._append_lines(f"{file_path}.journal", lines)
+        
+        self._journal_counts[file_path] = self._journal_counts.get(file_path, 0) + len(lines)
+        if file_path in self._cache:
+            self._cache[file_path] = (self._doc_stamp(file_path), self._cache[file_path][1])
+        
+        if self._journal_counts[file_path] >= COMPACT_EVERY and file_path not in self._compacting:
+            threading.Thread(target=self._compact, args=(file_path,), daemon=True).start()
+    
+    def _commit_batch(self, file_path: str, calls: list) -> list:
+        """تنفيذ كل كتابات الـ batch على الكاش وبعدين fsync واحد للـ journal"""
+        results = []
+        with self._lock_for(file_path):
+            self._batches[file_path] = []
+            self._log_batches[file_path] = {}
+            try:
+                for func, args in calls:
+                    try:
+                        results.append((True, func(*args)))
+                    except Exception as e:
+                        results.append((False, e))
+            finally:
+                lines = self._batches.pop(file_path)
+                logs = self._log_batches.pop(file_path)
             
-            account_id = f"ACC-{len(data['accounts']) + 1:04d}"
-            account_data['id'] = account_id
-            account_data['created_at'] = datetime.now().isoformat()
-            account_data['status'] = account_data.get('status', 'not_finished')
+            if lines or logs:
+                try:
+                    # الـ logs الأول: العداد ميتحسبش لسجل مش موجود
+                    for log_path, log_lines in logs.items():
+                        self._append_lines(log_path, log_lines)
+                    if lines:
+                        self._append_journal(file_path, lines)
+                except Exception as e:
+                    # الكاش فيه تعديلات مش على القرص → يتقري من جديد
+                    log.error("❌ Error journaling batch to %s: %s", file_path, e)
+                    self._cache.pop(file_path, None)
+                    if file_path == self.stats_file:
+                        # والـ rollups اتزودت بسجلات الـ batch ده: تتبني من جديد (زي SQLite)
+                        self._rollups = None
+                    raise
+        return results
+    
+    def _compact(self, file_path: str):
+        """دمج الـ journal في snapshot جديد (بيشتغل في الخلفية)"""
+        journal = f"{file_path}.journal"
+        temp_file = f"{file_path}.compact.tmp"
+        with self._lock_for(file_path):
+            if file_path in self._compacting:
+                return
+            self._compacting.add(file_path)
+        
+        try:
+            with self._lock_for(file_path):
+                data = self._read_file(file_path)
+                seq = self._seqs.get(file_path, 0)
+                generation = self._generations.get(file_path, 0)
+                text = serializers.dumps({**data, '_seq': seq})
+                # التعديلات الجديدة هتتكتب في journal جديد أثناء كتابة الـ snapshot
+                if os.path.exists(f"{journal}.old") and os.path.exists(journal):
+                    # بقايا compaction اتقطع: نضم الاتنين عشان منضيعش سجلات
+                    with open(journal, 'rb') as src, open(f"{journal}.old", 'ab') as dst:
+                        dst.write(src.read())
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(journal)
+                elif os.path.exists(journal):
+                    os.replace(journal, f"{journal}.old")
+                self._cache[file_path] = (self._doc_stamp(file_path), data)
             
-            data['accounts'].append(account_data)
-            data['backup'].append(account_data.copy())
+            # الكتابة الكبيرة بره الـ lock
+            self._write_temp(temp_file, text)
             
-            self._write_file(self.accounts_file, data)
-            print(f"✅ Added account: {account_id}")
+            with self._lock_for(file_path):
+                if self._generations.get(file_path, 0) != generation:
+                    # حد استبدل المستند بالكامل (save_json) أثناء الكتابة
+                    os.remove(temp_file)
+                    return
+                os.replace(temp_file, file_path)
+                if os.path.exists(f"{journal}.old"):
+                    os.remove(f"{journal}.old")
+                self._journal_counts[file_path] = max(0, self._seqs.get(file_path, 0) - seq)
+                if file_path in self._cache:
+                    self._cache[file_path] = (self._doc_stamp(file_path), self._cache[file_path][1])
+            log.info("🗜️ Compacted %s at seq %s", os.path.basename(file_path), seq)
+        except Exception as e:
+            log.error("❌ Error compacting %s: %s", file_path, e)
+        finally:
+            self._compacting.discard(file_path)
+    
+    def compact(self):
+        """دمج كل الـ journals فوراً"""
+        for file_path in [self.accounts_file, self.tickets_file, self.stats_file, self.config_file]:
+            if self._journal_counts.get(file_path):
+                self._compact(file_path)
+    
+    def snapshot_plan(self) -> list:
+        """الملفات اللي الـ snapshot بياخدها: [(paths, lock, mode)] بالترتيب
+        
+        doc: المستند + الـ journals بتوعه بيتنسخوا مع بعض تحت lock الملف.
+        append: ملف append-only؛ الحجم بيتاخد تحت الـ lock والقراءة بره.
+        immutable: ملف مبيتغيرش بعد ما يتكتب (objects الـ backup).
+        المستندات الأول: العدادات اللي اتنسخت مش هتعد سجل ملحقش يتنسخ.
+        """
+        plan = []
+        for file_path in (self.accounts_file, self.tickets_file, self.stats_file, self.config_file):
+            paths = [file_path, f"{file_path}.journal", f"{file_path}.journal.old"]
+            plan.append((paths, self._lock_for(file_path), 'doc'))
+        
+        for kind in self.log_kinds:
+            folder = f"{self.data_dir}/{kind}"
+            if os.path.isdir(folder):
+                for name in sorted(os.listdir(folder)):
+                    if name.endswith('.jsonl'):
+                        plan.append(([os.path.join(folder, name)], self._lock_for(self.stats_file), 'append'))
+        for path in (self.archive_file, self.archive_index_file):
+            plan.append(([path], self._lock_for(self.tickets_file), 'append'))
+        plan.append(([self.backup_refs], self._lock_for(self.accounts_file), 'append'))
+        text_path = self._text_path(self._read_file(self.accounts_file))
+        if text_path:
+            plan.append(([text_path], self._lock_for(self.accounts_file), 'append'))
+        
+        objects = f"{self.backup_dir}/objects"
+        if os.path.isdir(objects):
+            for folder in sorted(os.listdir(objects)):
+                for name in sorted(os.listdir(os.path.join(objects, folder))):
+                    if name.endswith('.json'):
+                        plan.append(([os.path.join(objects, folder, name)], None, 'immutable'))
+        return plan
+    
+    def cache_info(self) -> dict:
+        """إحصائيات الكاش (hits / misses)"""
+        total = self.cache_hits + self.cache_misses
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / total if total else 0.0,
+            'files': len(self._cache),
+            'journal_records': sum(self._journal_counts.values())
+        }
+    
+    # ============ Accounts Functions ============
+    def _add_account(self, account_data: dict) -> str:
+        """إضافة حساب جديد"""
+        try:
+            with self._lock_for(self.accounts_file):
+                account_id, seq_op = self._next_id(self.accounts_file, 'ACC')
+                account_data['id'] = account_id
+                account_data['created_at'] = datetime.now().isoformat()
+                account_data['status'] = account_data.get('status', 'not_finished')
+                account_data['version'] = 1
+                
+                self._backup_account(account_data)
+                record = self._resident(self._read_file(self.accounts_file), account_data)
+                self._mutate(self.accounts_file, [
+                    seq_op,
+                    {'op': 'set', 'path': ['accounts', account_id], 'value': record}
+                ])
+            log.info("✅ Added account: %s", account_id)
             
             return account_id
         except Exception as e:
-            print(f"❌ Error adding account: {e}")
+            log.error("❌ Error adding account: %s", e)
             return "ERROR"
     
-    async def get_account(self, account_id: str) -> Optional[dict]:
-        """الحصول على حساب بواسطة ID"""
+    def _add_accounts(self, accounts: List[dict]) -> List[str]:
+        """إضافة حسابات كتير: سطر journal واحد وfsync واحد للـ refs والنصوص"""
         try:
+            [(ok, value)] = self._commit_batch(self.accounts_file, [(self._insert_accounts, (accounts,))])
+            if not ok:
+                raise value
+            log.info("✅ Imported %s accounts", len(value))
+            return value
+        except Exception as e:
+            log.error("❌ Error importing accounts: %s", e)
+            return []
+    
+    def _insert_accounts(self, accounts: List[dict]) -> List[str]:
+        with self._lock_for(self.accounts_file):
             data = self._read_file(self.accounts_file)
-            accounts = data.get('accounts', [])
+            seq = data.get('sequences', {}).get('ACC', 0)
+            created_at = datetime.now().isoformat()
+            ops = [{'op': 'incr', 'path': ['sequences', 'ACC'], 'value': len(accounts)}]
+            account_ids = []
+            # os.sync واحد لكل الـ backup objects بدل fsync لكل ملف
+            deferred = hasattr(os, 'sync')
             
-            for acc in accounts:
-                if acc.get('id') == account_id:
-                    return acc
-            return None
+            for number, account_data in enumerate(accounts, seq + 1):
+                account_id = f"ACC-{number:04d}"
+                account_data['id'] = account_id
+                account_data['created_at'] = created_at
+                account_data['status'] = account_data.get('status', 'not_finished')
+                account_data['version'] = 1
+                
+                self._backup_account(account_data, sync=not deferred)
+                ops.append({'op': 'set', 'path': ['accounts', account_id], 'value': self._resident(data, account_data)})
+                account_ids.append(account_id)
+            
+            if deferred:
+                os.sync()
+            # كل الحسابات في _mutate واحد: يا كلهم في الـ journal يا ولا واحد
+            self._mutate(self.accounts_file, ops)
+        return account_ids
+    
+    def _load_copy(self, path: str) -> dict:
+        # الـ collections بتتعدل مكانها تحت الـ lock، فالنسخ لازم يكون جواه
+        with self._lock_for(path):
+            return copy.deepcopy(self._read_file(path))
+    
+    def _account_header(self, account_id: str) -> Optional[dict]:
+        """السجل زي ما هو في الذاكرة (في low-memory من غير النصوص الكبيرة)"""
+        return self._read_file(self.accounts_file).get('accounts', {}).get(account_id)
+    
+    def _get_account(self, account_id: str) -> Optional[dict]:
+        """الحصول على حساب بواسطة ID"""
+        try:
+            with self._lock_for(self.accounts_file):
+                account = self._account_header(account_id)
+                return private_copy(self._hydrate(account)) if account else None
         except Exception as e:
-            print(f"❌ Error getting account: {e}")
+            log.error("❌ Error getting account: %s", e)
             return None
     
-    async def update_account(self, account_id: str, updates: dict) -> bool:
+    def _update_account(self, account_id: str, updates: dict, expected_version: int = None) -> bool:
         """تحديث بيانات حساب"""
         try:
-            data = self._read_file(self.accounts_file)
-            accounts = data.get('accounts', [])
-            
-            for i, acc in enumerate(accounts):
-                if acc.get('id') == account_id:
-                    accounts[i].update(updates)
-                    accounts[i]['updated_at'] = datetime.now().isoformat()
-                    data['accounts'] = accounts
-                    self._write_file(self.accounts_file, data)
-                    print(f"✅ Updated account: {account_id}")
-                    return True
-            return False
+            with self._lock_for(self.accounts_file):
+                account = self._account_header(account_id)
+                if account is None or self._version_conflict(account_id, account, expected_version):
+                    return False
+                
+                updates = self._resident(self._read_file(self.accounts_file), updates, account.get('text_refs'))
+                self._mutate(self.accounts_file, [
+                    {'op': 'merge', 'path': ['accounts', account_id],
+                     'value': {**updates, 'updated_at': datetime.now().isoformat()}},
+                    {'op': 'set', 'path': ['accounts', account_id, 'version'], 'value': account.get('version', 0) + 1}
+                ])
+            log.info("✅ Updated account: %s", account_id)
+            return True
         except Exception as e:
-            print(f"❌ Error updating account: {e}")
+            log.error("❌ Error updating account: %s", e)
             return False
     
-    async def delete_account(self, account_id: str) -> bool:
+    def _delete_account(self, account_id: str) -> bool:
         """حذف حساب"""
         try:
-            data = self._read_file(self.accounts_file)
-            accounts = data.get('accounts', [])
-            
-            for i, acc in enumerate(accounts):
-                if acc.get('id') == account_id:
-                    del accounts[i]
-                    data['accounts'] = accounts
-                    self._write_file(self.accounts_file, data)
-                    print(f"✅ Deleted account: {account_id}")
-                    return True
-            return False
+            with self._lock_for(self.accounts_file):
+                if self._account_header(account_id) is None:
+                    return False
+                
+                self._mutate(self.accounts_file, [
+                    {'op': 'unset', 'path': ['accounts', account_id]}
+                ])
+            log.info("✅ Deleted account: %s", account_id)
+            return True
         except Exception as e:
-            print(f"❌ Error deleting account: {e}")
+            log.error("❌ Error deleting account: %s", e)
             return False
     
-    async def get_all_accounts(self, status: str = None) -> List[dict]:
+    def _get_all_accounts(self, status: str = None, full: bool = True) -> List[dict]:
         """الحصول على جميع الحسابات"""
         try:
-            data = self._read_file(self.accounts_file)
-            accounts = data.get('accounts', [])
-            
-            if status:
-                return [acc for acc in accounts if acc.get('status') == status]
-            return accounts
+            with self._lock_for(self.accounts_file):
+                data = self._read_file(self.accounts_file)
+                accounts = list(data.get('accounts', {}).values())
+                if status:
+                    accounts = [acc for acc in accounts if acc.get('status') == status]
+                text_path = self._text_path(data)
+                if not full or not text_path:
+                    return [private_copy(acc) for acc in accounts]
+                with open(text_path, 'rb') as handle:
+                    return [private_copy(self._hydrate(acc, handle)) for acc in accounts]
         except Exception as e:
-            print(f"❌ Error getting all accounts: {e}")
+            log.error("❌ Error getting all accounts: %s", e)
             return []
     
-    async def get_backup_accounts(self) -> List[dict]:
-        """الحصول على النسخ الاحتياطية"""
+    # ============ Account Text (low-memory) ============
+    def _text_path(self, data: dict) -> Optional[str]:
+        name = data.get('text_file')
+        return f"{self.data_dir}/{name}" if name else None
+    
+    def _read_text(self, refs: dict, handle) -> dict:
+        """قيم الحقول من ملف النصوص: {field: [offset, length]} → {field: value}"""
+        values = {}
+        for field, (offset, length) in refs.items():
+            handle.seek(offset)
+            values[field] = serializers.loads_line(handle.read(length))
+        return values
+    
+    def _hydrate(self, account: dict, handle=None) -> dict:
+        """السجل كامل بالنصوص (الـ accounts lock لازم يكون متاخد عشان سطور الـ batch تكون اتكتبت)"""
+        refs = account.get('text_refs')
+        if not refs:
+            return account
+        full = {key: value for key, value in account.items() if key != 'text_refs'}
+        if handle is not None:
+            full.update(self._read_text(refs, handle))
+        else:
+            with open(self._text_path(self._read_file(self.accounts_file)), 'rb') as f:
+                full.update(self._read_text(refs, f))
+        return full
+    
+    def _store_text(self, data: dict, value) -> list:
+        """إضافة قيمة لآخر ملف النصوص → [offset, length] (جوه batch السطر بيتكتب مع الـ batch)"""
+        path = self._text_path(data)
+        line = serializers.dumps_line(value)
+        length = len(line.encode('utf-8'))
+        pending = self._log_batches.get(self.accounts_file, {}).get(path, [])
+        waiting = len(pending)
+        # (عدد السطور المستنية، آخر الملف بعدها): batch فيه آلاف السطور ميتحسبش من الأول كل مرة
+        tail = self._text_tails.get(path)
+        if tail is not None and waiting and tail[0] == waiting:
+            offset = tail[1]
+        else:
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            offset += sum(len(p.encode('utf-8')) + 1 for p in pending)
+        self._append_line(self.accounts_file, path, line)
+        self._text_tails[path] = (waiting + 1, offset + length + 1)
+        return [offset, length]
+    
+    def _resident(self, data: dict, record: dict, refs: dict = None) -> dict:
+        """النسخة اللي بتتحفظ في accounts.json: في low-memory الحقول الكبيرة → text_refs"""
+        if 'text_file' not in data or not any(field in record for field in BULKY_FIELDS):
+            return record
+        header = {key: value for key, value in record.items() if key not in BULKY_FIELDS}
+        header['text_refs'] = {
+            **(refs or {}),
+            **{field: self._store_text(data, record[field]) for field in BULKY_FIELDS if field in record}
+        }
+        return header
+    
+    def _text_layout_stale(self, data: dict) -> bool:
+        """الحسابات محتاجة تتنقل من/لملف النصوص (تغيير LOW_MEMORY) أو الملف محتاج compaction"""
+        accounts = data.get('accounts', {}).values()
+        if not LOW_MEMORY:
+            return 'text_file' in data
+        if 'text_file' not in data or any(field in acc for acc in accounts for field in BULKY_FIELDS):
+            return True
+        path = self._text_path(data)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        live = sum(length + 1 for acc in accounts for _, length in acc.get('text_refs', {}).values())
+        return size - live > max(live, TEXT_COMPACT_MIN)
+    
+    def _relayout_text(self, data: dict):
+        """كتابة كل النصوص في ملف نصوص جديد (LOW_MEMORY)، أو رجوعها جوه السجلات
+        
+        الملف الجديد ليه اسم جديد (accounts-N.text) والقديم بيتمسح بعد ما accounts.json
+        الجديد يتكتب، فلو الكتابة اتقطعت الـ offsets القديمة لسه صح.
+        """
+        old_path = self._text_path(data)
+        handle = open(old_path, 'rb') if old_path and os.path.exists(old_path) else None
         try:
-            data = self._read_file(self.accounts_file)
-            return data.get('backup', [])
+            accounts = data.get('accounts', {})
+            # كل ملفات النصوص الموجودة (حتى لو من مستند اتبدل بـ save_json) بتتمسح بعد الكتابة
+            leftovers = [name for name in os.listdir(self.data_dir) if re.fullmatch(r'accounts-\d+\.text', name)]
+            if LOW_MEMORY:
+                generation = max((int(name[len('accounts-'):-len('.text')]) for name in leftovers), default=0) + 1
+                data['text_file'] = f"accounts-{generation}.text"
+                new_path = self._text_path(data)
+                offset = 0
+                with open(f"{new_path}.tmp", 'wb') as f:
+                    for account in accounts.values():
+                        values = self._read_text(account.pop('text_refs', {}), handle) if handle else {}
+                        values.update({field: account.pop(field) for field in BULKY_FIELDS if field in account})
+                        refs = {}
+                        for field, value in values.items():
+                            raw = serializers.dumps_line(value).encode('utf-8')
+                            f.write(raw + b"\n")
+                            refs[field] = [offset, len(raw)]
+                            offset += len(raw) + 1
+                        if refs:
+                            account['text_refs'] = refs
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(f"{new_path}.tmp", new_path)
+                log.info("📝 Moved account text to %s (%s bytes)", data['text_file'], offset)
+            else:
+                for account in accounts.values():
+                    account.update(self._read_text(account.pop('text_refs', {}), handle) if handle else {})
+                data.pop('text_file')
+                log.info("📝 Moved account text back into accounts.json")
+        finally:
+            if handle:
+                handle.close()
+        self._obsolete.setdefault(self.accounts_file, []).extend(f"{self.data_dir}/{name}" for name in leftovers)
+    
+    # ============ Account Backups ============
+    def _backup_object(self, digest: str) -> str:
+        return f"{self.backup_dir}/objects/{digest[:2]}/{digest}.json"
+    
+    def _store_backup(self, account: dict, sync: bool = True) -> str:
+        """كتابة نسخة في الـ store → الـ hash (نفس المحتوى = نفس الملف، مرة واحدة)"""
+        blob = json.dumps(account, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(blob).hexdigest()
+        path = self._backup_object(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write_temp(f"{path}.tmp", blob, sync)
+            os.replace(f"{path}.tmp", path)
+        return digest
+    
+    def _backup_account(self, account: dict, sync: bool = True):
+        """نسخة احتياطية لحساب (الـ accounts lock لازم يكون متاخد)
+        
+        الـ object بيتكتب ويتعمله fsync الأول، والـ ref بيدخل مع الـ batch.
+        sync=False: الـ caller مسؤول يعمل sync قبل ما الـ batch يتكتب.
+        """
+        digest = self._store_backup(account, sync)
+        self._append_log(self.accounts_file, self.backup_refs, {
+            'id': account.get('id'), 'hash': digest, 'at': datetime.now().isoformat()
+        })
+    
+    def _move_backups(self, data: dict):
+        """نقل data['backup'] القديمة للـ store (بيستبدل الـ refs: لو اتقطعت منكررش)"""
+        backups = data.pop('backup', None) or []
+        refs = [
+            {'id': b.get('id'), 'hash': self._store_backup(b), 'at': b.get('created_at') or datetime.now().isoformat()}
+            for b in backups
+        ]
+        os.makedirs(self.backup_dir, exist_ok=True)
+        self._write_log(self.backup_refs, refs)
+        log.info("📦 Moved %s account backups to %s/", len(refs), self.backup_dir)
+    
+    def _read_backups(self, cursor: int, chunk: int):
+        """chunk من النسخ بداية من offset في refs.jsonl → (records, cursor الجاي أو None)"""
+        records = []
+        try:
+            with self._lock_for(self.accounts_file):
+                self._read_file(self.accounts_file)  # بيرحّل data['backup'] القديمة لو لسه
+                if not os.path.exists(self.backup_refs):
+                    return records, None
+                with open(self.backup_refs, 'rb') as f:
+                    f.seek(cursor)
+                    refs = []
+                    while len(refs) < chunk:
+                        raw = f.readline()
+                        if not raw.endswith(b"\n"):
+                            break
+                        cursor += len(raw)
+                        refs.append(serializers.loads_line(raw))
+            
+            for ref in refs:
+                with open(self._backup_object(ref['hash']), 'rb') as f:
+                    records.append(serializers.loads(f.read()))
+            return records, (cursor if len(refs) == chunk else None)
         except Exception as e:
-            print(f"❌ Error getting backup accounts: {e}")
-            return []
+            log.error("❌ Error getting backup accounts: %s", e)
+            return records, None
+    
+    def _all_backups(self) -> List[Tuple[dict, str]]:
+        """كل النسخ مع وقت أخدها [(record, at)] (للاستيراد في SQLite بس)"""
+        with self._lock_for(self.accounts_file):
+            self._read_file(self.accounts_file)  # بيرحّل data['backup'] القديمة لو لسه
+            refs = self._read_log(self.backup_refs)
+        backups = []
+        for ref in refs:
+            with open(self._backup_object(ref['hash']), 'rb') as f:
+                backups.append((serializers.loads(f.read()), ref.get('at')))
+        return backups
+    
+    def _prune_backups(self) -> int:
+        """شيل نسخ الحسابات اللي مبقتش موجودة وعدى عليها BACKUP_RETENTION_DAYS
+        
+        نسخ الحسابات اللي لسه موجودة بتفضل دايماً. الـ objects اللي مبقاش ليها
+        ref بتتمسح.
+        """
+        if BACKUP_RETENTION_DAYS <= 0:
+            return 0
+        try:
+            with self._lock_for(self.accounts_file):
+                live = set(self._read_file(self.accounts_file).get('accounts', {}))
+                refs = self._read_log(self.backup_refs)
+                cutoff = (datetime.now() - timedelta(days=BACKUP_RETENTION_DAYS)).isoformat()
+                kept = [r for r in refs if r.get('id') in live or r.get('at', '') >= cutoff]
+                if len(kept) == len(refs):
+                    return 0
+                self._write_log(self.backup_refs, kept)
+                
+                used = {r['hash'] for r in kept}
+                objects = f"{self.backup_dir}/objects"
+                for folder in os.listdir(objects):
+                    for name in os.listdir(os.path.join(objects, folder)):
+                        if name.endswith('.json') and name[:-len('.json')] not in used:
+                            os.remove(os.path.join(objects, folder, name))
+                    if not os.listdir(os.path.join(objects, folder)):
+                        os.rmdir(os.path.join(objects, folder))
+            log.info("🧹 Pruned %s account backups", len(refs) - len(kept))
+            return len(refs) - len(kept)
+        except Exception as e:
+            log.error("❌ Error pruning backups: %s", e)
+            return 0
     
     # ============ Tickets Functions ============
-    async def create_ticket(self, ticket_data: dict) -> str:
+    def _create_ticket(self, ticket_data: dict) -> str:
         """إنشاء تذكرة جديدة"""
         try:
-            data = self._read_file(self.tickets_file)
-            
-            if 'tickets' not in data:
-                data['tickets'] = []
-            if 'closed_tickets' not in data:
-                data['closed_tickets'] = []
-            
-            ticket_id = f"TKT-{len(data['tickets']) + len(data['closed_tickets']) + 1:04d}"
-            ticket_data['id'] = ticket_id
-            ticket_data['created_at'] = datetime.now().isoformat()
-            ticket_data['status'] = 'open'
-            
-            data['tickets'].append(ticket_data)
-            self._write_file(self.tickets_file, data)
-            print(f"✅ Created ticket: {ticket_id}")
+            with self._lock_for(self.tickets_file):
+                ticket_id, seq_op = self._next_id(self.tickets_file, 'TKT')
+                ticket_data['id'] = ticket_id
+                ticket_data['created_at'] = datetime.now().isoformat()
+                ticket_data['status'] = 'open'
+                ticket_data['version'] = 1
+                
+                ops = [seq_op, {'op': 'set', 'path': ['tickets', ticket_id], 'value': ticket_data}]
+                if ticket_data.get('channel_id'):
+                    ops.append({'op': 'set', 'path': ['channel_index', str(ticket_data['channel_id'])], 'value': ticket_id})
+                self._mutate(self.tickets_file, ops)
+            log.info("✅ Created ticket: %s", ticket_id)
             
             return ticket_id
         except Exception as e:
-            print(f"❌ Error creating ticket: {e}")
+            log.error("❌ Error creating ticket: %s", e)
             return "ERROR"
     
-    async def get_ticket(self, ticket_id: str) -> Optional[dict]:
+    def _get_ticket(self, ticket_id: str) -> Optional[dict]:
         """الحصول على تذكرة بواسطة ID"""
         try:
-            data = self._read_file(self.tickets_file)
-            tickets = data.get('tickets', [])
-            
+            ticket = self._read_file(self.tickets_file).get('tickets', {}).get(ticket_id)
+            return private_copy(ticket) if ticket is not None else None
+        except Exception as e:
+            log.error("❌ Error getting ticket: %s", e)
+            return None
+    
+    # ============ Closed Tickets Archive ============
+    def _archive_map(self) -> dict:
+        """الـ index في الذاكرة: ids → [offset, length, user_id] و users → [ids]"""
+        if self._archive_index is not None:
+            return self._archive_index
+        
+        index = {'ids': {}, 'users': {}}
+        if os.path.exists(self.archive_index_file):
+            good_end = 0
+            with open(self.archive_index_file, 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    try:
+                        entry = serializers.loads_line(raw)
+                    except json.JSONDecodeError:
+                        break
+                    good_end += len(raw)
+                    self._index_archived(index, entry)
+            if good_end != os.path.getsize(self.archive_index_file):
+                log.warning("⚠️ Truncating torn archive index tail")
+                with open(self.archive_index_file, 'r+b') as f:
+                    f.truncate(good_end)
+        self._archive_index = index
+        return index
+    
+    def _index_archived(self, index: dict, entry: dict):
+        ticket_id = entry['id']
+        if ticket_id not in index['ids']:
+            index['users'].setdefault(str(entry.get('user_id')), []).append(ticket_id)
+        # لو التذكرة اتأرشفت مرتين (crash قبل ما تتشال من tickets.json) الأحدث هو الصح
+        index['ids'][ticket_id] = [entry['offset'], entry['length'], entry.get('user_id')]
+    
+    def _archive_tickets(self, tickets: List[dict]):
+        """إضافة تذاكر للأرشيف (الـ tickets lock لازم يكون متاخد)
+        
+        الأرشيف الأول وبعدين الـ index، كل واحد بـ fsync: أي entry في الـ index
+        بيشاور على بيانات موجودة على القرص. الأرشيف نفسه gzip عادي متعدد الأجزاء
+        (zcat بيقراه كـ JSONL).
+        """
+        index = self._archive_map()
+        os.makedirs(os.path.dirname(self.archive_file), exist_ok=True)
+        entries = []
+        with open(self.archive_file, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
             for ticket in tickets:
-                if ticket.get('id') == ticket_id:
-                    return ticket
+                line = serializers.dumps_line(ticket) + "\n"
+                blob = gzip.compress(line.encode('utf-8'))
+                f.write(blob)
+                entries.append({'id': ticket['id'], 'user_id': ticket.get('user_id'),
+                                'offset': offset, 'length': len(blob)})
+                offset += len(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        self._append_lines(self.archive_index_file, [
+            serializers.dumps_line(entry) for entry in entries
+        ])
+        for entry in entries:
+            self._index_archived(index, entry)
+    
+    def _read_archived(self, offset: int, length: int) -> dict:
+        with open(self.archive_file, 'rb') as f:
+            f.seek(offset)
+            return serializers.loads_line(gzip.decompress(f.read(length)))
+    
+    def _get_closed_ticket(self, ticket_id: str) -> Optional[dict]:
+        """تذكرة مقفولة: seek لمكانها في الأرشيف وفك الجزء ده بس"""
+        try:
+            with self._lock_for(self.tickets_file):
+                self._read_file(self.tickets_file)  # بيرحّل closed_tickets القديمة لو لسه
+                entry = self._archive_map()['ids'].get(ticket_id)
+            if entry is None:
+                return None
+            return self._read_archived(entry[0], entry[1])
+        except Exception as e:
+            log.error("❌ Error reading archived ticket: %s", e)
             return None
+    
+    def _get_closed_tickets_by_user(self, user_id: int) -> List[dict]:
+        """كل التذاكر المقفولة لمستخدم (بالترتيب اللي اتقفلت بيه)"""
+        try:
+            with self._lock_for(self.tickets_file):
+                self._read_file(self.tickets_file)
+                index = self._archive_map()
+                entries = [index['ids'][t] for t in index['users'].get(str(user_id), [])]
+            return [self._read_archived(offset, length) for offset, length, _ in entries]
         except Exception as e:
-            print(f"❌ Error getting ticket: {e}")
+            log.error("❌ Error reading archived tickets: %s", e)
+            return []
+    
+    def _archived_tickets(self) -> dict:
+        """كل الأرشيف (للاستيراد في SQLite وبناء index البحث، بيحمل كل حاجة في الذاكرة)"""
+        with self._lock_for(self.tickets_file):
+            self._read_file(self.tickets_file)
+            entries = dict(self._archive_map()['ids'])
+        return {ticket_id: self._read_archived(offset, length) for ticket_id, (offset, length, _) in entries.items()}
+    
+    def _search_records(self) -> List[tuple]:
+        records = [('account', account) for account in self._get_all_accounts()]
+        with self._lock_for(self.tickets_file):
+            records += [('ticket', ticket) for ticket in self._read_file(self.tickets_file).get('tickets', {}).values()]
+        records += [('ticket', ticket) for ticket in self._archived_tickets().values()]
+        return records
+    
+    def _count_closed_tickets(self) -> int:
+        with self._lock_for(self.tickets_file):
+            self._read_file(self.tickets_file)
+            return len(self._archive_map()['ids'])
+    
+    def _get_ticket_by_channel(self, channel_id: int) -> Optional[dict]:
+        """الحصول على التذكرة المفتوحة لقناة معينة"""
+        try:
+            data = self._read_file(self.tickets_file)
+            ticket_id = data.get('channel_index', {}).get(str(channel_id))
+            ticket = data.get('tickets', {}).get(ticket_id) if ticket_id is not None else None
+            return private_copy(ticket) if ticket is not None else None
+        except Exception as e:
+            log.error("❌ Error getting ticket by channel: %s", e)
             return None
     
-    async def update_ticket(self, ticket_id: str, updates: dict) -> bool:
+    def _update_ticket(self, ticket_id: str, updates: dict, expected_version: int = None) -> bool:
         """تحديث بيانات تذكرة"""
         try:
-            data = self._read_file(self.tickets_file)
-            tickets = data.get('tickets', [])
-            
-            for i, ticket in enumerate(tickets):
-                if ticket.get('id') == ticket_id:
-                    tickets[i].update(updates)
-                    data['tickets'] = tickets
-                    self._write_file(self.tickets_file, data)
-                    print(f"✅ Updated ticket: {ticket_id}")
-                    return True
-            return False
+            with self._lock_for(self.tickets_file):
+                ticket = self._get_ticket(ticket_id)
+                if ticket is None or self._version_conflict(ticket_id, ticket, expected_version):
+                    return False
+                
+                self._mutate(self.tickets_file, [
+                    {'op': 'merge', 'path': ['tickets', ticket_id], 'value': updates},
+                    {'op': 'set', 'path': ['tickets', ticket_id, 'version'], 'value': ticket.get('version', 0) + 1}
+                ])
+            log.info("✅ Updated ticket: %s", ticket_id)
+            return True
         except Exception as e:
-            print(f"❌ Error updating ticket: {e}")
+            log.error("❌ Error updating ticket: %s", e)
             return False
     
-    async def close_ticket(self, ticket_id: str, close_data: dict) -> bool:
+    def _close_ticket(self, ticket_id: str, close_data: dict) -> bool:
         """إغلاق تذكرة"""
         try:
-            data = self._read_file(self.tickets_file)
-            tickets = data.get('tickets', [])
-            closed_tickets = data.get('closed_tickets', [])
-            
-            for i, ticket in enumerate(tickets):
-                if ticket.get('id') == ticket_id:
-                    ticket.update(close_data)
-                    ticket['closed_at'] = datetime.now().isoformat()
-                    closed_tickets.append(ticket)
-                    del tickets[i]
-                    
-                    data['tickets'] = tickets
-                    data['closed_tickets'] = closed_tickets
-                    self._write_file(self.tickets_file, data)
-                    print(f"✅ Closed ticket: {ticket_id}")
-                    return True
-            return False
+            with self._lock_for(self.tickets_file):
+                ticket = self._get_ticket(ticket_id)
+                if ticket is None:
+                    return False
+                
+                closed = {**ticket, **close_data, 'closed_at': datetime.now().isoformat()}
+                # الأرشيف الأول: لو حصل crash قبل الـ journal التذكرة تفضل مفتوحة بس
+                self._archive_tickets([closed])
+                ops = [{'op': 'unset', 'path': ['tickets', ticket_id]}]
+                if ticket.get('channel_id'):
+                    ops.append({'op': 'unset', 'path': ['channel_index', str(ticket['channel_id'])]})
+                self._mutate(self.tickets_file, ops)
+            log.info("✅ Closed ticket: %s", ticket_id)
+            return True
         except Exception as e:
-            print(f"❌ Error closing ticket: {e}")
+            log.error("❌ Error closing ticket: %s", e)
             return False
     
     # ============ Stats Functions ============
-    async def add_sale(self, sale_data: dict):
+    def _add_sale(self, sale_data: dict):
         """إضافة عملية بيع للإحصائيات"""
         try:
-            data = self._read_file(self.stats_file)
-            
-            # Ensure all keys exist
-            if 'total_sales' not in data:
-                data['total_sales'] = 0
-            if 'total_revenue' not in data:
-                data['total_revenue'] = 0
-            if 'accounts_sold' not in data:
-                data['accounts_sold'] = []
-            if 'daily_stats' not in data:
-                data['daily_stats'] = {}
-            if 'seller_stats' not in data:
-                data['seller_stats'] = {}
-            if 'rank_stats' not in data:
-                data['rank_stats'] = {}
-            
-            data['total_sales'] += 1
-            data['total_revenue'] += sale_data.get('price', 0)
+            price = sale_data.get('price', 0)
+            seller = sale_data.get('seller', 'Unknown')
+            rank = sale_data.get('rank', 'Unknown')
+            today = datetime.now().strftime('%Y-%m-%d')
             
             sale_record = {
                 **sale_data,
                 'date': datetime.now().isoformat()
             }
-            data['accounts_sold'].append(sale_record)
-            
-            # Daily stats
-            today = datetime.now().strftime('%Y-%m-%d')
-            if today not in data['daily_stats']:
-                data['daily_stats'][today] = {'sales': 0, 'revenue': 0}
-            data['daily_stats'][today]['sales'] += 1
-            data['daily_stats'][today]['revenue'] += sale_data.get('price', 0)
-            
-            # Seller stats
-            seller = sale_data.get('seller', 'Unknown')
-            if seller not in data['seller_stats']:
-                data['seller_stats'][seller] = {'sales': 0, 'revenue': 0}
-            data['seller_stats'][seller]['sales'] += 1
-            data['seller_stats'][seller]['revenue'] += sale_data.get('price', 0)
-            
-            # Rank stats
-            rank = sale_data.get('rank', 'Unknown')
-            if rank not in data['rank_stats']:
-                data['rank_stats'][rank] = {'sales': 0, 'revenue': 0}
-            data['rank_stats'][rank]['sales'] += 1
-            data['rank_stats'][rank]['revenue'] += sale_data.get('price', 0)
-            
-            self._write_file(self.stats_file, data)
-            print(f"✅ Added sale: {sale_data.get('price', 0)} ج from {seller}")
             
+            with self._lock_for(self.stats_file):
+                stats = self._read_file(self.stats_file)
+                manifest_ops = self._log_record('sales', sale_record)
+                self._mutate(self.stats_file, manifest_ops + [
+                    {'op': 'incr', 'path': ['total_sales'], 'value': 1},
+                    {'op': 'incr', 'path': ['total_revenue'], 'value': price},
+                    # Daily stats
+                    {'op': 'incr', 'path': ['daily_stats', today, 'sales'], 'value': 1},
+                    {'op': 'incr', 'path': ['daily_stats', today, 'revenue'], 'value': price},
+                    # Seller stats
+                    {'op': 'incr', 'path': ['seller_stats', seller, 'sales'], 'value': 1},
+                    {'op': 'incr', 'path': ['seller_stats', seller, 'revenue'], 'value': price},
+                    # Rank stats
+                    {'op': 'incr', 'path': ['rank_stats', rank, 'sales'], 'value': 1},
+                    {'op': 'incr', 'path': ['rank_stats', rank, 'revenue'], 'value': price},
+                    # الـ top بيتحدث هنا عشان العرض ميرتبش كل البائعين
+                    {'op': 'set', 'path': ['top_sellers'], 'value': self._top_after(stats, 'seller_stats', 'top_sellers', seller, price)},
+                    {'op': 'set', 'path': ['top_ranks'], 'value': self._top_after(stats, 'rank_stats', 'top_ranks', rank, price)}
+                ])
+                self._roll('sales', sale_record)
+            log.info("✅ Added sale: %s ج from %s", price, seller)
+        
         except Exception as e:
-            print(f"❌ Error adding sale: {e}")
+            log.error("❌ Error adding sale: %s", e)
     
-    async def add_purchase(self, purchase_data: dict) -> str:
+    def _add_purchase(self, purchase_data: dict) -> str:
         """إضافة عملية شراء حسابات"""
         try:
-            data = self._read_file(self.stats_file)
-            
-            if 'purchases' not in data:
-                data['purchases'] = []
-            if 'total_purchase_cost' not in data:
-                data['total_purchase_cost'] = 0
-            
-            purchase_id = f"PUR-{len(data['purchases']) + 1:04d}"
-            purchase_record = {
-                'id': purchase_id,
-                **purchase_data,
-                'date': datetime.now().isoformat()
-            }
-            
-            data['purchases'].append(purchase_record)
-            data['total_purchase_cost'] += purchase_data.get('cost', 0)
-            
-            self._write_file(self.stats_file, data)
-            print(f"✅ Added purchase: {purchase_id} - {purchase_data.get('cost', 0)} ج")
+            with self._lock_for(self.stats_file):
+                purchase_id, seq_op = self._next_id(self.stats_file, 'PUR')
+                purchase_record = {
+                    'id': purchase_id,
+                    **purchase_data,
+                    'date': datetime.now().isoformat()
+                }
+                
+                manifest_ops = self._log_record('purchases', purchase_record)
+                self._mutate(self.stats_file, manifest_ops + [
+                    seq_op,
+                    {'op': 'incr', 'path': ['total_purchase_cost'], 'value': purchase_data.get('cost', 0)},
+                    {'op': 'incr', 'path': ['total_purchased'], 'value': purchase_data.get('quantity', 0)},
+                    {'op': 'incr', 'path': ['total_purchases'], 'value': 1},
+                    {'op': 'append', 'path': ['recent_purchases'], 'value': purchase_record, 'limit': RECENT_PURCHASES}
+                ])
+                self._roll('purchases', purchase_record)
+            log.info("✅ Added purchase: %s - %s ج", purchase_id, purchase_data.get('cost', 0))
             
             return purchase_id
         except Exception as e:
-            print(f"❌ Error adding purchase: {e}")
+            log.error("❌ Error adding purchase: %s", e)
             return "ERROR"
     
-    async def get_stats(self) -> dict:
-        """الحصول على الإحصائيات"""
+    def _get_stats(self, history: bool = False) -> dict:
+        """الحصول على الإحصائيات
+        
+        العدادات بس من stats.json؛ history=True بيضيف accounts_sold و purchases
+        من الـ logs (بيقرا السجل كله، فللأوامر اللي محتاجاه بس).
+        """
         try:
-            data = self._read_file(self.stats_file)
-            
-            # Ensure all required keys exist
-            default_stats = {
-                "total_sales": 0,
-                "total_revenue": 0,
-                "total_purchase_cost": 0,
-                "accounts_sold": [],
-                "purchases": [],
-                "daily_stats": {},
-                "seller_stats": {},
-                "rank_stats": {}
-            }
-            
-            for key, value in default_stats.items():
-                if key not in data:
-                    data[key] = value
-            
-            return data
+            with self._lock_for(self.stats_file):
+                stats = {**default_stats(), **copy.deepcopy(self._read_file(self.stats_file))}
+                if history:
+                    stats['accounts_sold'] = list(self._iter_segments('sales'))
+                    stats['purchases'] = list(self._iter_segments('purchases'))
+            return stats
         except Exception as e:
-            print(f"❌ Error getting stats: {e}")
-            return {
-                "total_sales": 0,
-                "total_revenue": 0,
-                "total_purchase_cost": 0,
-                "accounts_sold": [],
-                "purchases": [],
-                "daily_stats": {},
-                "seller_stats": {},
-                "rank_stats": {}
-            }
+            log.error("❌ Error getting stats: %s", e)
+            stats = default_stats()
+            if history:
+                stats.update(accounts_sold=[], purchases=[])
+            return stats
     
-    async def get_config(self) -> dict:
+    def _stats_lock(self):
+        return self._lock_for(self.stats_file)
+    
+    @staticmethod
+    def _top_after(stats: dict, group: str, top_key: str, name: str, price) -> List[str]:
+        """الـ top بعد بيعة لـ name بـ price (قبل ما الـ incr يتطبق)
+        
+        المبيعات بتزيد بس، فاللي ممكن يدخل الـ top هو name لوحده: بنرتب القديم + name.
+        لو الـ top مش متخزن (مستند قديم أو بعد reset) بيتحسب من الكل مرة واحدة.
+        """
+        entries = stats.get(group, {})
+        names = stats.get(top_key)
+        candidates = list(entries) if names is None else list(names)
+        if name not in candidates:
+            candidates.append(name)
+        ranked = {n: dict(entries.get(n, {})) for n in candidates}
+        ranked[name]['sales'] = ranked[name].get('sales', 0) + 1
+        ranked[name]['revenue'] = ranked[name].get('revenue', 0) + price
+        return top_names(ranked)
+    
+    def _stats_summary(self) -> dict:
+        try:
+            with self._locks_for((self.accounts_file, self.stats_file)):
+                stats = self._read_file(self.stats_file)
+                summary = empty_summary()
+                summary.update((key, stats.get(key, 0)) for key in summary if key.startswith('total_'))
+                today = datetime.now().strftime('%Y-%m-%d')
+                summary['today'] = dict(stats.get('daily_stats', {}).get(today, {'sales': 0, 'revenue': 0}))
+                summary['recent_purchases'] = list(stats.get('recent_purchases', []))
+                for group, top_key in (('seller_stats', 'top_sellers'), ('rank_stats', 'top_ranks')):
+                    entries = stats.get(group, {})
+                    names = stats.get(top_key)
+                    if names is None:
+                        names = top_names(entries)
+                    summary[top_key] = [(n, dict(entries[n])) for n in names if n in entries]
+                summary['accounts'] = status_counts(self._read_file(self.accounts_file).get('accounts', {}).values())
+            return summary
+        except Exception as e:
+            log.error("❌ Error getting stats summary: %s", e)
+            return empty_summary()
+    
+    def _get_history(self, kind: str, start=None, end=None, limit: int = None) -> List[dict]:
+        """سجلات من الـ segments اللي في المدى بس، بالترتيب الزمني"""
+        try:
+            if limit is None:
+                return list(self._iter_segments(kind, start, end))
+            # من الأحدث للأقدم لحد ما نكمل limit → بنفتح آخر segments بس
+            records = []
+            for record in self._iter_segments(kind, start, end, newest_first=True):
+                if len(records) >= limit:
+                    break
+                records.append(record)
+            return records[::-1]
+        except Exception as e:
+            log.error("❌ Error reading %s: %s", kind, e)
+            return []
+    
+    def _snapshot(self, names) -> ReadSnapshot:
+        """كل locks المستندات المطلوبة مع بعض لحظة تثبيت المراجع بس
+        
+        القراءة من القرص (لو الكاش قديم) بتحصل قبلها. تحت الـ locks بتتنسخ الـ collections
+        بس (مراجع، pin_doc)؛ السجلات نفسها مبتتنسخش.
+        """
+        files = {'accounts': self.accounts_file, 'tickets': self.tickets_file,
+                 'stats': self.stats_file, 'config': self.config_file}
+        with self._locks_for(files[name] for name in names):
+            docs = {name: pin_doc(self._read_file(files[name])) for name in names}
+        
+        views = {}
+        for name, data in docs.items():
+            if name == 'stats':
+                views[name] = {**default_stats(), **data}
+            elif name in ('accounts', 'tickets'):
+                views[name] = data.get(name, {})
+            else:
+                views[name] = data
+        return ReadSnapshot(views)
+    
+    def _get_config(self) -> dict:
         """الحصول على الإعدادات"""
         try:
-            data = self._read_file(self.config_file)
-            return data
+            with self._lock_for(self.config_file):
+                return copy.deepcopy(self._read_file(self.config_file))
         except Exception as e:
-            print(f"❌ Error getting config: {e}")
+            log.error("❌ Error getting config: %s", e)
             return {}
     
-    async def save_config(self, config: dict):
+    def _save_config(self, config: dict):
         """حفظ الإعدادات"""
         try:
             self._write_file(self.config_file, config)
-            print(f"✅ Saved config")
+            log.info("✅ Saved config")
         except Exception as e:
-            print(f"❌ Error saving config: {e}")
+            log.error("❌ Error saving config: %s", e)
 
 # Create singleton instance
-db = Database()
+# DB_BACKEND=sqlite → نفس الواجهة بس التخزين في SQLite (database_sqlite.py)
+if os.getenv('DB_BACKEND', 'json').lower() == 'sqlite':
+    from database_sqlite import SQLiteDatabase
+    db = SQLiteDatabase()
+else:
+    db = Database()
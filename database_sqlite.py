@@ -0,0 +1,895 @@
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, List
+
+import serializers
+import logger
+from database import (DATA_DIR, BACKUP_RETENTION_DAYS, RECENT_PURCHASES, TOP_STATS, LOW_MEMORY, BULKY_FIELDS,
+                      ensure_data_dir, id_number, keyed_records, default_stats, empty_summary,
+                      AsyncDatabase, Database, ReadSnapshot)
+
+log = logger.get_logger('sqlite')
+
+SQLITE_PATH = os.getenv('SQLITE_PATH', f"{DATA_DIR}/marvel.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    id TEXT PRIMARY KEY,
+    status TEXT,
+    current_level INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_accounts_status ON accounts(status);
+CREATE TABLE IF NOT EXISTS account_backups (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id TEXT,
+    data TEXT NOT NULL,
+    backed_up_at TEXT
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    id TEXT PRIMARY KEY,
+    channel_id INTEGER,
+    status TEXT,
+    closed INTEGER NOT NULL DEFAULT 0,
+    seq INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets(channel_id);
+CREATE INDEX IF NOT EXISTS idx_tickets_closed ON tickets(closed, seq);
+CREATE INDEX IF NOT EXISTS idx_tickets_user ON tickets(json_extract(data, '$.user_id'));
+CREATE TABLE IF NOT EXISTS sales (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    seller TEXT,
+    rank TEXT,
+    price INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(date);
+CREATE INDEX IF NOT EXISTS idx_sales_seller ON sales(seller);
+CREATE INDEX IF NOT EXISTS idx_sales_rank ON sales(rank);
+CREATE TABLE IF NOT EXISTS purchases (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE,
+    date TEXT NOT NULL,
+    cost INTEGER NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_purchases_date ON purchases(date);
+-- إجماليات بتتحدث في نفس transaction البيعة/الشراء بدل GROUP BY على السجل كله:
+-- kind = 'sales' (key '') / 'day' / 'seller' / 'rank' / 'purchases' (key '')
+CREATE TABLE IF NOT EXISTS aggregates (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    amount INTEGER NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_aggregates_top ON aggregates(kind, count);
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# مسارات الحقول الكبيرة لـ json_remove (الحسابات من غير النصوص)
+HEADER_PATHS = ", ".join(f"'$.{field}'" for field in BULKY_FIELDS)
+
+def _dumps(data) -> str:
+    return serializers.dumps_line(data)
+
+def _amount(value):
+    """مبلغ من aggregates بنفس نوع نسخة JSON: 150.0 -> 150 (قواعد قديمة أعمدتها REAL)
+    
+    أعمدة INTEGER في SQLite بتحفظ الكسور زي ما هي (12.5 يفضل 12.5)
+    """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+class SQLiteDatabase(AsyncDatabase):
+    """نفس واجهة Database بس التخزين في SQLite (WAL) بدل ملفات JSON"""
+    
+    def __init__(self, path: str = SQLITE_PATH):
+        ensure_data_dir()
+        # نفس أسماء الملفات عشان load_json / save_json تفضل شغالة
+        self.accounts_file = f"{DATA_DIR}/accounts.json"
+        self.tickets_file = f"{DATA_DIR}/tickets.json"
+        self.stats_file = f"{DATA_DIR}/stats.json"
+        self.config_file = f"{DATA_DIR}/config.json"
+        self.path = path
+        self.lock = threading.RLock()
+        self._start_executor()
+        
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        # connection للـ snapshots: read transaction في WAL مبتوقفش الكتابات ولا بتستناها
+        self.reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.reader.row_factory = sqlite3.Row
+        self.read_lock = threading.Lock()
+        log.info("✅ SQLite database ready: %s", path)
+        
+        if self._meta('json_imported') is None:
+            self.import_json()
+        # قاعدة من قبل جدول aggregates: يتحسب مرة واحدة من السجل
+        if self._meta('aggregates') is None:
+            with self.lock, self._transaction():
+                self._rebuild_aggregates()
+    
+    def _upgrade_schema(self):
+        """أعمدة اتضافت بعد ما القاعدة اتعملت (CREATE TABLE IF NOT EXISTS مبيضيفهاش)"""
+        columns = {r['name'] for r in self.conn.execute("PRAGMA table_info(account_backups)")}
+        if 'backed_up_at' not in columns:
+            with self.lock, self._transaction():
+                self.conn.execute("ALTER TABLE account_backups ADD COLUMN backed_up_at TEXT")
+                # وقت النسخ القديمة مش معروف: الـ retention بتاعها يبدأ من دلوقتي
+                self.conn.execute("UPDATE account_backups SET backed_up_at = ?", (datetime.now().isoformat(),))
+            log.info("⬆️ Added account_backups.backed_up_at")
+    
+    # ============ Helpers ============
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+    
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+    
+    def _transaction(self):
+        """with self._transaction(): ... → BEGIN IMMEDIATE / COMMIT أو ROLLBACK"""
+        return _Transaction(self)
+    
+    def _commit_batch(self, path: str, calls: list) -> list:
+        """كل كتابات الـ batch في transaction واحدة → COMMIT (وfsync) واحد"""
+        results = []
+        with self.lock:
+            try:
+                with self._transaction():
+                    for func, args in calls:
+                        try:
+                            results.append((True, func(*args)))
+                        except Exception as e:
+                            results.append((False, e))
+            except Exception:
+                # الـ rollups اتزودت بسجلات الـ batch اللي اترجعت: تتبني من جديد
+                self._rollups = None
+                raise
+        return results
+    
+    def _scalar(self, sql: str, params=()):
+        return self.conn.execute(sql, params).fetchone()[0]
+    
+    # الجداول اللي IDs كل نوع بتتخزن فيها (عشان نبدأ الـ sequence بعد أكبر ID)
+    ID_SOURCES = {
+        'ACC': ("SELECT id FROM accounts", "SELECT account_id FROM account_backups"),
+        'TKT': ("SELECT id FROM tickets",),
+        'PUR': ("SELECT id FROM purchases",)
+    }
+    
+    def _sequence(self, prefix: str) -> int:
+        value = self._meta(f"seq:{prefix}")
+        return int(value) if value is not None else 0
+    
+    def _reset_sequence(self, prefix: str, floor: int = 0):
+        """الـ sequence = أكبر من (floor، أكبر ID موجود) — بعد import أو upgrade"""
+        used = [id_number(row[0]) for sql in self.ID_SOURCES[prefix] for row in self.conn.execute(sql)]
+        self._set_meta(f"seq:{prefix}", str(max([floor, *used])))
+    
+    def _next_id(self, prefix: str) -> str:
+        """ID جديد من sequence محفوظ في meta (لازم يتنادى جوه transaction)"""
+        if self._meta(f"seq:{prefix}") is None:
+            self._reset_sequence(prefix)
+        seq = self._sequence(prefix) + 1
+        self._set_meta(f"seq:{prefix}", str(seq))
+        return f"{prefix}-{seq:04d}"
+    
+    # ============ Import ============
+    def import_json(self, data_dir: str = DATA_DIR) -> dict:
+        """استيراد البيانات الحالية من <data_dir>/*.json (مرة واحدة)
+        
+        المصدر بيتقري من نسخة مؤقتة من المجلد: ترقيات الشكل القديم وقص الـ journal
+        الناقص بيحصلوا في النسخة، والمجلد الأصلي مبيتلمسش.
+        """
+        if not os.path.exists(f"{data_dir}/accounts.json"):
+            with self.lock, self._transaction():
+                self._set_meta('json_imported', datetime.now().isoformat())
+            return {}
+        
+        scratch = tempfile.mkdtemp(prefix='json-import-', dir=os.path.dirname(os.path.abspath(data_dir)))
+        try:
+            copy_dir = os.path.join(scratch, 'data')
+            # القاعدة نفسها ممكن تكون جوه مجلد البيانات (SQLITE_PATH الافتراضي)
+            shutil.copytree(data_dir, copy_dir, ignore=shutil.ignore_patterns('*.db', '*.db-wal', '*.db-shm'))
+            source = Database(copy_dir)
+            try:
+                counts = self._import_from(source)
+            finally:
+                source._executor.shutdown()
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        log.info("✅ Imported JSON data into SQLite: %s", counts)
+        return counts
+    
+    def _import_from(self, source: Database) -> dict:
+        counts = {}
+        with self.lock, self._transaction():
+            backups = source._all_backups()
+            accounts = {**source._read_file(source.accounts_file), 'accounts': source._get_all_accounts(),
+                        'backup': [record for record, _ in backups], 'backup_times': [at for _, at in backups]}
+            counts['accounts'] = self._import_accounts(accounts)
+            tickets = {**source._read_file(source.tickets_file), 'closed_tickets': source._archived_tickets()}
+            counts['tickets'] = self._import_tickets(tickets)
+            counts['sales'], counts['purchases'] = self._import_stats(source._get_stats(history=True))
+            self._import_config(source._read_file(source.config_file))
+            self._set_meta('json_imported', datetime.now().isoformat())
+        return counts
+    
+    def _import_accounts(self, data: dict) -> int:
+        self.conn.execute("DELETE FROM accounts")
+        floor = data.get('sequences', {}).get('ACC', 0)
+        accounts, floor = keyed_records(data.get('accounts'), 'ACC', floor)
+        accounts = list(accounts.values())
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO accounts (id, status, current_level, data) VALUES (?, ?, ?, ?)",
+            [(a.get('id'), a.get('status'), a.get('current_level'), _dumps(a)) for a in accounts]
+        )
+        # مستند من غير backup مش بيلمس النسخ الاحتياطية
+        if 'backup' in data:
+            # backup_times (من _read_file / import_json): وقت كل نسخة؛ نسخة من غير وقت = دلوقتي
+            times = data.get('backup_times') or []
+            now = datetime.now().isoformat()
+            self.conn.execute("DELETE FROM account_backups")
+            self.conn.executemany(
+                "INSERT INTO account_backups (account_id, data, backed_up_at) VALUES (?, ?, ?)",
+                [(b.get('id'), _dumps(b), times[i] if i < len(times) and times[i] else now)
+                 for i, b in enumerate(data['backup'])]
+            )
+        self._reset_sequence('ACC', floor)
+        return len(accounts)
+    
+    def _import_tickets(self, data: dict) -> int:
+        self.conn.execute("DELETE FROM tickets")
+        floor = data.get('sequences', {}).get('TKT', 0)
+        rows = []
+        for closed, key in ((1, 'closed_tickets'), (0, 'tickets')):
+            tickets, floor = keyed_records(data.get(key), 'TKT', floor)
+            for t in tickets.values():
+                rows.append((t.get('id'), t.get('channel_id'), t.get('status'), closed, len(rows), _dumps(t)))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO tickets (id, channel_id, status, closed, seq, data) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self._reset_sequence('TKT', floor)
+        return len(rows)
+    
+    def _import_stats(self, data: dict):
+        """مستند من غير accounts_sold / purchases (عدادات بس) مش بيلمس السجل"""
+        if 'accounts_sold' not in data and 'purchases' not in data:
+            return 0, 0
+        self.conn.execute("DELETE FROM sales")
+        self.conn.execute("DELETE FROM purchases")
+        sales = data.get('accounts_sold', [])
+        self.conn.executemany(
+            "INSERT INTO sales (date, seller, rank, price, data) VALUES (?, ?, ?, ?, ?)",
+            [(s.get('date', ''), s.get('seller', 'Unknown'), s.get('rank', 'Unknown'), s.get('price', 0), _dumps(s))
+             for s in sales]
+        )
+        purchases = data.get('purchases', [])
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO purchases (id, date, cost, quantity, data) VALUES (?, ?, ?, ?, ?)",
+            [(p.get('id'), p.get('date', ''), p.get('cost', 0), p.get('quantity', 0), _dumps(p)) for p in purchases]
+        )
+        self._reset_sequence('PUR', data.get('sequences', {}).get('PUR', 0))
+        self._rebuild_aggregates()
+        return len(sales), len(purchases)
+    
+    def _rebuild_aggregates(self):
+        """aggregates من sales و purchases من الأول (استيراد / أول تشغيل بعد الجدول)"""
+        self.conn.execute("DELETE FROM aggregates")
+        for kind, column in (('sales', "''"), ('day', "substr(date, 1, 10)"),
+                             ('seller', "COALESCE(seller, 'Unknown')"), ('rank', "COALESCE(rank, 'Unknown')")):
+            self.conn.execute(
+                f"INSERT INTO aggregates (kind, key, count, amount) "
+                f"SELECT ?, {column}, COUNT(*), COALESCE(SUM(price), 0) FROM sales GROUP BY {column}", (kind,)
+            )
+        self.conn.execute(
+            "INSERT INTO aggregates (kind, key, count, amount, quantity) "
+            "SELECT 'purchases', '', COUNT(*), COALESCE(SUM(cost), 0), COALESCE(SUM(quantity), 0) FROM purchases "
+            "HAVING COUNT(*) > 0"
+        )
+        self._set_meta('aggregates', datetime.now().isoformat())
+    
+    def _aggregate(self, kind: str, key: str, amount, quantity: int = 0):
+        self.conn.execute(
+            "INSERT INTO aggregates (kind, key, count, amount, quantity) VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET count = count + 1, amount = amount + excluded.amount, "
+            "quantity = quantity + excluded.quantity",
+            (kind, key, amount, quantity)
+        )
+    
+    def _import_config(self, data: dict):
+        self.conn.execute("DELETE FROM config")
+        self.conn.executemany(
+            "INSERT INTO config (key, value) VALUES (?, ?)",
+            [(k, _dumps(v)) for k, v in data.items()]
+        )
+    
+    # ============ Document compatibility ============
+    def _load_copy(self, file_path: str) -> dict:
+        # كل قراءة بتبني المستند من الجداول من جديد، فهو أصلاً نسخة خاصة
+        return self._read_file(file_path)
+    
+    def _read_file(self, file_path: str) -> dict:
+        """تجميع المستند القديم (نفس شكل ملف JSON) من الجداول"""
+        with self.lock:
+            try:
+                if file_path == self.accounts_file:
+                    backups = self.conn.execute("SELECT data, backed_up_at FROM account_backups ORDER BY seq").fetchall()
+                    # backup_times بيرجع مع المستند عشان save_json (/force_save) ميصفرش الـ retention
+                    return {
+                        "accounts": {r['id']: json.loads(r['data']) for r in self.conn.execute(
+                            "SELECT id, data FROM accounts ORDER BY rowid")},
+                        "backup": [json.loads(r['data']) for r in backups],
+                        "backup_times": [r['backed_up_at'] for r in backups],
+                        "sequences": {"ACC": self._sequence('ACC')}
+                    }
+                if file_path == self.tickets_file:
+                    return {
+                        "tickets": {r['id']: json.loads(r['data']) for r in self.conn.execute(
+                            "SELECT id, data FROM tickets WHERE closed = 0 ORDER BY seq")},
+                        "closed_tickets": {r['id']: json.loads(r['data']) for r in self.conn.execute(
+                            "SELECT id, data FROM tickets WHERE closed = 1 ORDER BY seq")},
+                        "channel_index": {str(r['channel_id']): r['id'] for r in self.conn.execute(
+                            "SELECT id, channel_id FROM tickets WHERE closed = 0 AND channel_id IS NOT NULL")},
+                        "sequences": {"TKT": self._sequence('TKT')}
+                    }
+                if file_path == self.stats_file:
+                    return {"sequences": {"PUR": self._sequence('PUR')}, **self._build_stats(history=True)}
+                if file_path == self.config_file:
+                    return self._build_config()
+                log.error("❌ Unknown document: %s", file_path)
+                return {}
+            except Exception as e:
+                log.error("❌ Error reading %s: %s", file_path, e)
+                return {}
+    
+    def _write_file(self, file_path: str, data: dict):
+        """استبدال مستند كامل (زي save_json في نسخة JSON)"""
+        with self.lock:
+            try:
+                with self._transaction():
+                    if file_path == self.accounts_file:
+                        self._import_accounts(data)
+                    elif file_path == self.tickets_file:
+                        self._import_tickets(data)
+                    elif file_path == self.stats_file:
+                        self._import_stats(data)
+                    elif file_path == self.config_file:
+                        self._import_config(data)
+                    else:
+                        raise Exception(f"Unknown document: {file_path}")
+                log.debug("💾 Saved %s to SQLite", os.path.basename(file_path))
+            except Exception as e:
+                log.error("❌ Error writing %s: %s", file_path, e)
+                raise
+    
+    def compact(self):
+        """دمج الـ WAL في ملف القاعدة"""
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def snapshot_plan(self) -> list:
+        """SQLite بيتنسخ بالـ backup API من connection تانية (WAL) من غير self.lock"""
+        return [([self.path], None, 'sqlite')]
+    
+    def cache_info(self) -> dict:
+        """مفيش كاش مستندات في SQLite؛ القراءات استعلامات بالـ index"""
+        return {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'files': 0, 'journal_records': 0}
+    
+    # ============ Accounts Functions ============
+    def _add_account(self, account_data: dict) -> str:
+        """إضافة حساب جديد"""
+        try:
+            with self.lock, self._transaction():
+                account_id = self._next_id('ACC')
+                account_data['id'] = account_id
+                account_data['created_at'] = datetime.now().isoformat()
+                account_data['status'] = account_data.get('status', 'not_finished')
+                account_data['version'] = 1
+                
+                self.conn.execute(
+                    "INSERT INTO accounts (id, status, current_level, data) VALUES (?, ?, ?, ?)",
+                    (account_id, account_data['status'], account_data.get('current_level'), _dumps(account_data))
+                )
+                self.conn.execute(
+                    "INSERT INTO account_backups (account_id, data, backed_up_at) VALUES (?, ?, ?)",
+                    (account_id, _dumps(account_data), account_data['created_at'])
+                )
+            log.info("✅ Added account: %s", account_id)
+            return account_id
+        except Exception as e:
+            log.error("❌ Error adding account: %s", e)
+            return "ERROR"
+    
+    def _add_accounts(self, accounts: List[dict]) -> List[str]:
+        """إضافة حسابات كتير في transaction واحدة"""
+        try:
+            with self.lock, self._transaction():
+                if self._meta("seq:ACC") is None:
+                    self._reset_sequence('ACC')
+                seq = self._sequence('ACC')
+                self._set_meta("seq:ACC", str(seq + len(accounts)))
+                created_at = datetime.now().isoformat()
+                
+                for number, account_data in enumerate(accounts, seq + 1):
+                    account_data['id'] = f"ACC-{number:04d}"
+                    account_data['created_at'] = created_at
+                    account_data['status'] = account_data.get('status', 'not_finished')
+                    account_data['version'] = 1
+                rows = [(a['id'], _dumps(a), created_at) for a in accounts]
+                self.conn.executemany(
+                    "INSERT INTO accounts (id, status, current_level, data) VALUES (?, ?, ?, ?)",
+                    [(a['id'], a['status'], a.get('current_level'), data) for a, (_, data, _) in zip(accounts, rows)]
+                )
+                self.conn.executemany(
+                    "INSERT INTO account_backups (account_id, data, backed_up_at) VALUES (?, ?, ?)", rows
+                )
+            log.info("✅ Imported %s accounts", len(accounts))
+            return [a['id'] for a in accounts]
+        except Exception as e:
+            log.error("❌ Error importing accounts: %s", e)
+            return []
+    
+    def _get_account(self, account_id: str) -> Optional[dict]:
+        """الحصول على حساب بواسطة ID"""
+        try:
+            with self.lock:
+                row = self.conn.execute("SELECT data FROM accounts WHERE id = ?", (account_id,)).fetchone()
+            return json.loads(row['data']) if row else None
+        except Exception as e:
+            log.error("❌ Error getting account: %s", e)
+            return None
+    
+    def _update_account(self, account_id: str, updates: dict, expected_version: int = None) -> bool:
+        """تحديث بيانات حساب"""
+        try:
+            with self.lock, self._transaction():
+                row = self.conn.execute("SELECT data FROM accounts WHERE id = ?", (account_id,)).fetchone()
+                if not row:
+                    return False
+                account = json.loads(row['data'])
+                if self._version_conflict(account_id, account, expected_version):
+                    return False
+                version = account.get('version', 0) + 1
+                account.update(updates)
+                account['updated_at'] = datetime.now().isoformat()
+                account['version'] = version
+                self.conn.execute(
+                    "UPDATE accounts SET status = ?, current_level = ?, data = ? WHERE id = ?",
+                    (account.get('status'), account.get('current_level'), _dumps(account), account_id)
+                )
+            log.info("✅ Updated account: %s", account_id)
+            return True
+        except Exception as e:
+            log.error("❌ Error updating account: %s", e)
+            return False
+    
+    def _delete_account(self, account_id: str) -> bool:
+        """حذف حساب"""
+        try:
+            with self.lock, self._transaction():
+                deleted = self.conn.execute("DELETE FROM accounts WHERE id = ?", (account_id,)).rowcount
+            if deleted:
+                log.info("✅ Deleted account: %s", account_id)
+            return bool(deleted)
+        except Exception as e:
+            log.error("❌ Error deleting account: %s", e)
+            return False
+    
+    def _get_all_accounts(self, status: str = None, full: bool = True) -> List[dict]:
+        """الحصول على جميع الحسابات"""
+        try:
+            # full=False: الحقول الكبيرة بتتشال جوه SQLite قبل ما توصل لـ Python
+            column = "data" if full else f"json_remove(data, {HEADER_PATHS}) AS data"
+            with self.lock:
+                if status:
+                    rows = self.conn.execute(f"SELECT {column} FROM accounts WHERE status = ? ORDER BY rowid", (status,))
+                else:
+                    rows = self.conn.execute(f"SELECT {column} FROM accounts ORDER BY rowid")
+                return [json.loads(r['data']) for r in rows]
+        except Exception as e:
+            log.error("❌ Error getting all accounts: %s", e)
+            return []
+    
+    def _search_records(self) -> List[tuple]:
+        with self.lock:
+            accounts = [('account', json.loads(r['data'])) for r in self.conn.execute("SELECT data FROM accounts ORDER BY rowid")]
+            tickets = [('ticket', json.loads(r['data'])) for r in self.conn.execute("SELECT data FROM tickets ORDER BY rowid")]
+        return accounts + tickets
+    
+    def _read_backups(self, cursor: int, chunk: int):
+        """chunk من النسخ بعد seq معين → (records, cursor الجاي أو None)"""
+        try:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT seq, data FROM account_backups WHERE seq > ? ORDER BY seq LIMIT ?", (cursor, chunk)
+                ).fetchall()
+            records = [json.loads(r['data']) for r in rows]
+            return records, (rows[-1]['seq'] if len(rows) == chunk else None)
+        except Exception as e:
+            log.error("❌ Error getting backup accounts: %s", e)
+            return [], None
+    
+    def _prune_backups(self) -> int:
+        """نفس الـ retention بتاع نسخة JSON: نسخ الحسابات اللي اتشالت وعدى على أخدها المدة"""
+        if BACKUP_RETENTION_DAYS <= 0:
+            return 0
+        try:
+            cutoff = (datetime.now() - timedelta(days=BACKUP_RETENTION_DAYS)).isoformat()
+            with self.lock, self._transaction():
+                removed = self.conn.execute(
+                    "DELETE FROM account_backups WHERE account_id NOT IN (SELECT id FROM accounts) "
+                    "AND COALESCE(backed_up_at, '') < ?", (cutoff,)
+                ).rowcount
+            if removed:
+                log.info("🧹 Pruned %s account backups", removed)
+            return removed
+        except Exception as e:
+            log.error("❌ Error pruning backups: %s", e)
+            return 0
+    
+    # ============ Tickets Functions ============
+    def _create_ticket(self, ticket_data: dict) -> str:
+        """إنشاء تذكرة جديدة"""
+        try:
+            with self.lock, self._transaction():
+                ticket_id = self._next_id('TKT')
+                seq = self._scalar("SELECT COALESCE(MAX(seq), 0) + 1 FROM tickets")
+                ticket_data['id'] = ticket_id
+                ticket_data['created_at'] = datetime.now().isoformat()
+                ticket_data['status'] = 'open'
+                ticket_data['version'] = 1
+                
+                self.conn.execute(
+                    "INSERT INTO tickets (id, channel_id, status, closed, seq, data) VALUES (?, ?, ?, 0, ?, ?)",
+                    (ticket_id, ticket_data.get('channel_id'), 'open', seq, _dumps(ticket_data))
+                )
+            log.info("✅ Created ticket: %s", ticket_id)
+            return ticket_id
+        except Exception as e:
+            log.error("❌ Error creating ticket: %s", e)
+            return "ERROR"
+    
+    def _get_ticket(self, ticket_id: str) -> Optional[dict]:
+        """الحصول على تذكرة بواسطة ID"""
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT data FROM tickets WHERE id = ? AND closed = 0", (ticket_id,)
+                ).fetchone()
+            return json.loads(row['data']) if row else None
+        except Exception as e:
+            log.error("❌ Error getting ticket: %s", e)
+            return None
+    
+    def _get_ticket_by_channel(self, channel_id: int) -> Optional[dict]:
+        """الحصول على التذكرة المفتوحة لقناة معينة"""
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT data FROM tickets WHERE channel_id = ? AND closed = 0", (channel_id,)
+                ).fetchone()
+            return json.loads(row['data']) if row else None
+        except Exception as e:
+            log.error("❌ Error getting ticket by channel: %s", e)
+            return None
+    
+    def _update_ticket(self, ticket_id: str, updates: dict, expected_version: int = None) -> bool:
+        """تحديث بيانات تذكرة"""
+        try:
+            with self.lock, self._transaction():
+                row = self.conn.execute(
+                    "SELECT data FROM tickets WHERE id = ? AND closed = 0", (ticket_id,)
+                ).fetchone()
+                if not row:
+                    return False
+                ticket = json.loads(row['data'])
+                if self._version_conflict(ticket_id, ticket, expected_version):
+                    return False
+                version = ticket.get('version', 0) + 1
+                ticket.update(updates)
+                ticket['version'] = version
+                self.conn.execute(
+                    "UPDATE tickets SET channel_id = ?, status = ?, data = ? WHERE id = ?",
+                    (ticket.get('channel_id'), ticket.get('status'), _dumps(ticket), ticket_id)
+                )
+            log.info("✅ Updated ticket: %s", ticket_id)
+            return True
+        except Exception as e:
+            log.error("❌ Error updating ticket: %s", e)
+            return False
+    
+    def _close_ticket(self, ticket_id: str, close_data: dict) -> bool:
+        """إغلاق تذكرة"""
+        try:
+            with self.lock, self._transaction():
+                row = self.conn.execute(
+                    "SELECT data FROM tickets WHERE id = ? AND closed = 0", (ticket_id,)
+                ).fetchone()
+                if not row:
+                    return False
+                ticket = json.loads(row['data'])
+                ticket.update(close_data)
+                ticket['closed_at'] = datetime.now().isoformat()
+                seq = self._scalar("SELECT COALESCE(MAX(seq), 0) + 1 FROM tickets")
+                self.conn.execute(
+                    "UPDATE tickets SET status = ?, closed = 1, seq = ?, data = ? WHERE id = ?",
+                    (ticket.get('status'), seq, _dumps(ticket), ticket_id)
+                )
+            log.info("✅ Closed ticket: %s", ticket_id)
+            return True
+        except Exception as e:
+            log.error("❌ Error closing ticket: %s", e)
+            return False
+    
+    def _get_closed_ticket(self, ticket_id: str) -> Optional[dict]:
+        """تذكرة مقفولة"""
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT data FROM tickets WHERE id = ? AND closed = 1", (ticket_id,)
+                ).fetchone()
+            return json.loads(row['data']) if row else None
+        except Exception as e:
+            log.error("❌ Error reading archived ticket: %s", e)
+            return None
+    
+    def _get_closed_tickets_by_user(self, user_id: int) -> List[dict]:
+        """كل التذاكر المقفولة لمستخدم"""
+        try:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT data FROM tickets WHERE json_extract(data, '$.user_id') = ? AND closed = 1 ORDER BY seq",
+                    (user_id,)
+                ).fetchall()
+            return [json.loads(r['data']) for r in rows]
+        except Exception as e:
+            log.error("❌ Error reading archived tickets: %s", e)
+            return []
+    
+    def _count_closed_tickets(self) -> int:
+        with self.lock:
+            return self._scalar("SELECT COUNT(*) FROM tickets WHERE closed = 1")
+    
+    # ============ Stats Functions ============
+    def _add_sale(self, sale_data: dict):
+        """إضافة عملية بيع للإحصائيات"""
+        try:
+            seller = sale_data.get('seller', 'Unknown')
+            sale_record = {
+                **sale_data,
+                'date': datetime.now().isoformat()
+            }
+            with self.lock:
+                with self._transaction():
+                    self.conn.execute(
+                        "INSERT INTO sales (date, seller, rank, price, data) VALUES (?, ?, ?, ?, ?)",
+                        (sale_record['date'], seller, sale_data.get('rank', 'Unknown'),
+                         sale_data.get('price', 0), _dumps(sale_record))
+                    )
+                    for kind, key in (('sales', ''), ('day', sale_record['date'][:10]),
+                                      ('seller', seller or 'Unknown'), ('rank', sale_data.get('rank') or 'Unknown')):
+                        self._aggregate(kind, key, sale_data.get('price', 0))
+                self._roll('sales', sale_record)
+            log.info("✅ Added sale: %s ج from %s", sale_data.get('price', 0), seller)
+        except Exception as e:
+            log.error("❌ Error adding sale: %s", e)
+    
+    def _add_purchase(self, purchase_data: dict) -> str:
+        """إضافة عملية شراء حسابات"""
+        try:
+            with self.lock:
+                with self._transaction():
+                    purchase_id = self._next_id('PUR')
+                    purchase_record = {
+                        'id': purchase_id,
+                        **purchase_data,
+                        'date': datetime.now().isoformat()
+                    }
+                    self.conn.execute(
+                        "INSERT INTO purchases (id, date, cost, quantity, data) VALUES (?, ?, ?, ?, ?)",
+                        (purchase_id, purchase_record['date'], purchase_data.get('cost', 0),
+                         purchase_data.get('quantity', 0), _dumps(purchase_record))
+                    )
+                    self._aggregate('purchases', '', purchase_data.get('cost', 0), purchase_data.get('quantity', 0))
+                # بعد الـ transaction: لو اترجعت مبنوصلش هنا (وفي batch: _commit_batch)
+                self._roll('purchases', purchase_record)
+            log.info("✅ Added purchase: %s - %s ج", purchase_id, purchase_data.get('cost', 0))
+            return purchase_id
+        except Exception as e:
+            log.error("❌ Error adding purchase: %s", e)
+            return "ERROR"
+    
+    def _group_stats(self, kind: str, conn=None) -> dict:
+        rows = (conn or self.conn).execute("SELECT key, count, amount FROM aggregates WHERE kind = ?", (kind,))
+        return {r['key']: {'sales': r['count'], 'revenue': _amount(r['amount'])} for r in rows}
+    
+    def _totals(self, conn) -> dict:
+        """total_* من صفوف aggregates ('sales' و 'purchases')"""
+        rows = {r['kind']: r for r in conn.execute(
+            "SELECT kind, count, amount, quantity FROM aggregates WHERE kind IN ('sales', 'purchases') AND key = ''")}
+        sales, purchases = rows.get('sales'), rows.get('purchases')
+        return {
+            "total_sales": sales['count'] if sales else 0,
+            "total_revenue": _amount(sales['amount']) if sales else 0,
+            "total_purchase_cost": _amount(purchases['amount']) if purchases else 0,
+            "total_purchased": purchases['quantity'] if purchases else 0,
+            "total_purchases": purchases['count'] if purchases else 0
+        }
+    
+    def _build_stats(self, history: bool = False, conn=None) -> dict:
+        conn = conn or self.conn
+        recent = [json.loads(r['data']) for r in conn.execute(
+            "SELECT data FROM purchases ORDER BY seq DESC LIMIT ?", (RECENT_PURCHASES,))]
+        stats = {
+            **self._totals(conn),
+            "recent_purchases": recent[::-1],
+            "daily_stats": self._group_stats('day', conn),
+            "seller_stats": self._group_stats('seller', conn),
+            "rank_stats": self._group_stats('rank', conn)
+        }
+        if history:
+            stats["accounts_sold"] = [json.loads(r['data']) for r in conn.execute("SELECT data FROM sales ORDER BY seq")]
+            stats["purchases"] = [json.loads(r['data']) for r in conn.execute("SELECT data FROM purchases ORDER BY seq")]
+        return stats
+    
+    def _get_stats(self, history: bool = False) -> dict:
+        """الحصول على الإحصائيات (العدادات بس، إلا لو history=True)"""
+        try:
+            with self.lock:
+                return self._build_stats(history)
+        except Exception as e:
+            log.error("❌ Error getting stats: %s", e)
+            stats = default_stats()
+            if history:
+                stats.update(accounts_sold=[], purchases=[])
+            return stats
+    
+    def _stats_lock(self):
+        return self.lock
+    
+    def _stats_summary(self) -> dict:
+        """نفس _build_stats بس للـ embed: صف لكل إجمالي + أعلى TOP_STATS + عدد الحسابات من الـ indexes"""
+        try:
+            with self.lock:
+                summary = empty_summary()
+                summary.update(self._totals(self.conn))
+                today = self.conn.execute(
+                    "SELECT count, amount FROM aggregates WHERE kind = 'day' AND key = ?",
+                    (datetime.now().strftime('%Y-%m-%d'),)
+                ).fetchone()
+                if today:
+                    summary['today'] = {'sales': today['count'], 'revenue': _amount(today['amount'])}
+                summary['recent_purchases'] = [json.loads(r['data']) for r in self.conn.execute(
+                    "SELECT data FROM purchases ORDER BY seq DESC LIMIT ?", (RECENT_PURCHASES,))][::-1]
+                for kind, top_key in (('seller', 'top_sellers'), ('rank', 'top_ranks')):
+                    summary[top_key] = [(r['key'], {'sales': r['count'], 'revenue': _amount(r['amount'])}) for r in self.conn.execute(
+                        # نفس ترتيب top_names في نسخة JSON (التعادل بالإيرادات وبعدين الاسم)
+                        "SELECT key, count, amount FROM aggregates WHERE kind = ? ORDER BY count DESC, amount DESC, key LIMIT ?",
+                        (kind, TOP_STATS))]
+                counts = {r['status']: r['n'] for r in self.conn.execute(
+                    "SELECT COALESCE(status, 'not_finished') AS status, COUNT(*) AS n FROM accounts GROUP BY 1")}
+                summary['accounts'] = {'total': sum(counts.values()), **counts}
+            return summary
+        except Exception as e:
+            log.error("❌ Error getting stats summary: %s", e)
+            return empty_summary()
+    
+    def _get_history(self, kind: str, start=None, end=None, limit: int = None) -> List[dict]:
+        """سجلات المبيعات/المشتريات في المدى [start, end) بالـ index على date"""
+        try:
+            start = start.isoformat() if isinstance(start, datetime) else start
+            end = end.isoformat() if isinstance(end, datetime) else end
+            table = {'sales': 'sales', 'purchases': 'purchases'}[kind]
+            sql = f"SELECT data FROM {table} WHERE date >= ? AND date < ? ORDER BY seq DESC"
+            params = [start or '', end or '\uffff']
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+            with self.lock:
+                rows = self.conn.execute(sql, params).fetchall()
+            return [json.loads(r['data']) for r in reversed(rows)]
+        except Exception as e:
+            log.error("❌ Error reading %s: %s", kind, e)
+            return []
+    
+    def _build_config(self, conn=None) -> dict:
+        return {r['key']: json.loads(r['value']) for r in (conn or self.conn).execute("SELECT key, value FROM config")}
+    
+    def _snapshot(self, names) -> ReadSnapshot:
+        """كل المستندات من read transaction واحدة على connection القراءة (نفس نسخة WAL)"""
+        with self.read_lock:
+            conn = self.reader
+            conn.execute("BEGIN")
+            try:
+                views = {}
+                for name in names:
+                    if name == 'stats':
+                        views[name] = self._build_stats(conn=conn)
+                    elif name == 'accounts':
+                        column = f"json_remove(data, {HEADER_PATHS}) AS data" if LOW_MEMORY else "data"
+                        rows = conn.execute(f"SELECT id, {column} FROM accounts ORDER BY rowid")
+                        views[name] = {r['id']: json.loads(r['data']) for r in rows}
+                    elif name == 'tickets':
+                        rows = conn.execute("SELECT id, data FROM tickets WHERE closed = 0 ORDER BY seq")
+                        views[name] = {r['id']: json.loads(r['data']) for r in rows}
+                    elif name == 'config':
+                        views[name] = self._build_config(conn)
+                    else:
+                        raise KeyError(name)
+            finally:
+                conn.execute("COMMIT")
+        return ReadSnapshot(views)
+    
+    def _get_config(self) -> dict:
+        """الحصول على الإعدادات"""
+        try:
+            with self.lock:
+                return self._build_config()
+        except Exception as e:
+            log.error("❌ Error getting config: %s", e)
+            return {}
+    
+    def _save_config(self, config: dict):
+        """حفظ الإعدادات"""
+        try:
+            with self.lock, self._transaction():
+                self._import_config(config)
+            log.info("✅ Saved config")
+        except Exception as e:
+            log.error("❌ Error saving config: %s", e)
+
+class _Transaction:
+    """BEGIN IMMEDIATE / COMMIT، أو SAVEPOINT لو فيه transaction مفتوحة (batch)"""
+    def __init__(self, database: SQLiteDatabase):
+        self.conn = database.conn
+        self.nested = False
+    
+    def __enter__(self):
+        self.nested = self.conn.in_transaction
+        self.conn.execute("SAVEPOINT batch_item" if self.nested else "BEGIN IMMEDIATE")
+        return self.conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.nested:
+            if exc_type is not None:
+                self.conn.execute("ROLLBACK TO batch_item")
+            self.conn.execute("RELEASE batch_item")
+        elif exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+if __name__ == "__main__":
+    # python database_sqlite.py import  → إعادة استيراد data/*.json
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        logger.setup()
+        SQLiteDatabase().import_json()
+    else:
+        print("Usage: python database_sqlite.py import")
@@ -0,0 +1,95 @@
+"""قراءة ملف حسابات (CSV أو JSONL أو JSON) لـ /import_accounts
+
+CSV: صف أول فيه أسماء الأعمدة: account_info, current_level, opened_by, notes و rank (اختياريين)
+JSONL: object لكل سطر بنفس المفاتيح
+JSON: list من objects بنفس المفاتيح (الأغلاط بتتعد بـ "item N" بدل "line N")
+
+الملف كله بيتراجع الأول؛ لو فيه أي سطر غلط مفيش حاجة بتتضاف.
+"""
+import csv
+import io
+import json
+from typing import List, Tuple
+
+MAX_IMPORT_ROWS = 5000
+MAX_IMPORT_BYTES = 5 * 1024 * 1024
+# نفس حدود AccountInfoModal
+MAX_INFO_LENGTH = 1000
+
+def _rows(filename: str, text: str):
+    """(مكان السجل "line N" / "item N"، dict أو الغلط) لكل سجل في الملف"""
+    name = filename.lower()
+    if name.endswith(('.jsonl', '.ndjson')):
+        for number, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield f"line {number}", e
+                    continue
+                yield f"line {number}", row if isinstance(row, dict) else ValueError("not an object")
+    elif name.endswith('.json'):
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield f"line {e.lineno}", e
+            return
+        if not isinstance(rows, list):
+            yield "file", ValueError("expected a JSON list of objects")
+            return
+        for number, row in enumerate(rows, 1):
+            yield f"item {number}", row if isinstance(row, dict) else ValueError("not an object")
+    else:
+        # السطر 1 هو أسماء الأعمدة
+        for number, row in enumerate(csv.DictReader(io.StringIO(text)), 2):
+            yield f"line {number}", {key.strip(): value for key, value in row.items() if key}
+
+def _validate(row: dict) -> Tuple[dict, str]:
+    """(الحساب، رسالة الغلط أو "")"""
+    info = str(row.get('account_info') or '').strip()
+    if not info:
+        return None, "account_info is empty"
+    if len(info) > MAX_INFO_LENGTH:
+        return None, f"account_info is longer than {MAX_INFO_LENGTH} characters"
+    try:
+        level = int(str(row.get('current_level', '')).strip())
+    except ValueError:
+        return None, f"current_level must be a number, got {row.get('current_level')!r}"
+    if level < 0:
+        return None, "current_level can't be negative"
+    opened_by = str(row.get('opened_by') or '').strip()
+    if not opened_by:
+        return None, "opened_by is empty"
+    
+    return {
+        'account_info': info,
+        'current_level': level,
+        'opened_by': opened_by,
+        'notes': str(row.get('notes') or '').strip(),
+        'rank': str(row.get('rank') or '').strip(),
+        'status': 'finished' if level >= 15 else 'not_finished'
+    }, ""
+
+def parse_accounts(filename: str, raw: bytes) -> Tuple[List[dict], List[str]]:
+    """محتوى الملف → (الحسابات، الأغلاط "line N: ..." / "item N: ...")؛ الحسابات فاضية لو فيه أي غلط"""
+    try:
+        text = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return [], ["file is not UTF-8 text"]
+    
+    accounts, errors = [], []
+    for where, row in _rows(filename, text):
+        if isinstance(row, Exception):
+            errors.append(f"{where}: {row}")
+            continue
+        account, error = _validate(row)
+        if error:
+            errors.append(f"{where}: {error}")
+        else:
+            accounts.append(account)
+        if len(accounts) + len(errors) > MAX_IMPORT_ROWS:
+            return [], [f"more than {MAX_IMPORT_ROWS} rows"]
+    
+    if not accounts and not errors:
+        errors.append("no accounts found")
+    return ([] if errors else accounts), errors
@@ -0,0 +1,93 @@
+"""Logging بمستويات وformatting متأخر
+
+LOG_LEVEL: DEBUG | INFO | WARNING | ERROR (الافتراضي INFO)
+LOG_FORMAT: text | json (سطر JSON لكل رسالة)
+
+الرسائل بتتكتب بـ %-args عشان الـ string ميتبنيش لو المستوى مقفول:
+    log.info("✅ Added account: %s", account_id)
+والقيم المكلفة (حجم، مدة) بتتبعت كـ fields ملفوفة في lazy، فمبتتحسبش غير وقت الطباعة:
+    log.debug("💾 Saved %s", name, extra=fields(bytes=lazy(len, text)))
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+ROOT = 'marvel'
+
+class lazy:
+    """قيمة بتتحسب أول مرة تتطبع بس"""
+    __slots__ = ('func', 'args', '_value', '_done')
+    
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+        self._done = False
+    
+    def value(self):
+        if not self._done:
+            self._value = self.func(*self.args)
+            self._done = True
+        return self._value
+    
+    def __str__(self):
+        return str(self.value())
+    
+    def __format__(self, spec):
+        return format(self.value(), spec)
+
+def elapsed_ms(started: float) -> float:
+    """المدة من started (time.perf_counter) بالـ ms؛ بتتستخدم كـ lazy(elapsed_ms, started)"""
+    return round((time.perf_counter() - started) * 1000, 2)
+
+def fields(**values) -> dict:
+    """extra للـ logger: حقول key=value جنب الرسالة"""
+    return {'fields': values}
+
+def _resolved(record) -> dict:
+    values = getattr(record, 'fields', None) or {}
+    return {key: value.value() if isinstance(value, lazy) else value for key, value in values.items()}
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = super().format(record)
+        extra = _resolved(record)
+        if extra:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in extra.items())
+        return line
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            **_resolved(record)
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT}.{name}")
+
+def setup(level: str = None, fmt: str = None):
+    """تجهيز الـ handler مرة واحدة (من نقطة التشغيل: البوت أو الـ CLI)
+    
+    من غير setup المستوى بيفضل WARNING، فالـ debug/info مبيتحسبوش أصلاً.
+    """
+    root = logging.getLogger(ROOT)
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if (fmt or LOG_FORMAT) == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter('%(asctime)s %(levelname)-7s %(name)s: %(message)s', '%H:%M:%S'))
+    root.addHandler(handler)
+    root.setLevel(level or LOG_LEVEL)
+    root.propagate = False
@@ -2,19 +2,27 @@ import discord
 from discord.ext import commands, tasks
 from discord import app_commands, ui
 import asyncio
-import os
+import hashlib
 import json
-import aiofiles
-from datetime import datetime
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
 from typing import Optional, List
 from dotenv import load_dotenv
 
 load_dotenv()
 
+import logger
+logger.setup()
+log = logger.get_logger('bot')
+
 # ============ CONFIG ============
 TOKEN = os.getenv('DISCORD_TOKEN')
 GUILD_ID = int(os.getenv('GUILD_ID', 0))
 ADMIN_ROLE_ID = int(os.getenv('ADMIN_ROLE_ID', 0))
+# رسالة الإحصائيات بتتحدث مرة واحدة بالكتير في الفترة دي بعد أي عملية (ثواني)
+STATS_DEBOUNCE_SECONDS = float(os.getenv('STATS_DEBOUNCE_SECONDS', 5))
 
 COLORS = {
     "success": 0x00FF00,
@@ -44,214 +52,38 @@ RANK_EMOJIS = {
 }
 
 # ============ DATABASE ============
-DATA_DIR = "data"
-
-def ensure_data_dir():
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
+from database import db
+from snapshots import create_snapshot, SNAPSHOT_EVERY_MINUTES
+from importer import parse_accounts, MAX_IMPORT_BYTES
+from views.account_views import AccountListView
 
-class Database:
-    def __init__(self):
-        ensure_data_dir()
-        self.accounts_file = f"{DATA_DIR}/accounts.json"
-        self.tickets_file = f"{DATA_DIR}/tickets.json"
-        self.stats_file = f"{DATA_DIR}/stats.json"
-        self.config_file = f"{DATA_DIR}/config.json"
-        self._init_files()
-    
-    def _init_files(self):
-        defaults = {
-            self.accounts_file: {"accounts": [], "backup": []},
-            self.tickets_file: {"tickets": [], "closed_tickets": []},
-            self.stats_file: {
-                "total_sales": 0,
-                "total_revenue": 0,
-                "total_purchase_cost": 0,
-                "accounts_sold": [],
-                "purchases": [],
-                "daily_stats": {},
-                "seller_stats": {},
-                "rank_stats": {}
-            },
-            self.config_file: {"stats_channel_id": None, "stats_message_id": None}
-        }
-        for path, data in defaults.items():
-            if not os.path.exists(path):
-                with open(path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-    
-    async def load_json(self, path):
-        try:
-            async with aiofiles.open(path, 'r', encoding='utf-8') as f:
-                return json.loads(await f.read())
-        except:
-            return {}
-    
-    async def save_json(self, path, data):
-        async with aiofiles.open(path, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(data, ensure_ascii=False, indent=2))
-    
-    async def add_account(self, account_data):
-        data = await self.load_json(self.accounts_file)
-        if 'accounts' not in data: data['accounts'] = []
-        if 'backup' not in data: data['backup'] = []
-        
-        account_id = f"ACC-{len(data['accounts']) + 1:04d}"
-        account_data['id'] = account_id
-        account_data['created_at'] = datetime.now().isoformat()
-        account_data['status'] = account_data.get('status', 'not_finished')
-        
-        data['accounts'].append(account_data)
-        data['backup'].append(account_data.copy())
-        await self.save_json(self.accounts_file, data)
-        return account_id
-    
-    async def get_account(self, account_id):
-        data = await self.load_json(self.accounts_file)
-        for acc in data.get('accounts', []):
-            if acc.get('id') == account_id:
-                return acc
-        return None
-    
-    async def update_account(self, account_id, updates):
-        data = await self.load_json(self.accounts_file)
-        for i, acc in enumerate(data.get('accounts', [])):
-            if acc.get('id') == account_id:
-                data['accounts'][i].update(updates)
-                await self.save_json(self.accounts_file, data)
-                return True
-        return False
-    
-    async def delete_account(self, account_id):
-        data = await self.load_json(self.accounts_file)
-        accounts = data.get('accounts', [])
-        for i, acc in enumerate(accounts):
-            if acc.get('id') == account_id:
-                del accounts[i]
-                data['accounts'] = accounts
-                await self.save_json(self.accounts_file, data)
-                return True
-        return False
-    
-    async def get_all_accounts(self, status=None):
-        data = await self.load_json(self.accounts_file)
-        accounts = data.get('accounts', [])
-        if status:
-            return [a for a in accounts if a.get('status') == status]
-        return accounts
-    
-    async def create_ticket(self, ticket_data):
-        data = await self.load_json(self.tickets_file)
-        if 'tickets' not in data: data['tickets'] = []
-        if 'closed_tickets' not in data: data['closed_tickets'] = []
-        
-        ticket_id = f"TKT-{len(data['tickets']) + len(data['closed_tickets']) + 1:04d}"
-        ticket_data['id'] = ticket_id
-        ticket_data['created_at'] = datetime.now().isoformat()
-        ticket_data['status'] = 'open'
-        
-        data['tickets'].append(ticket_data)
-        await self.save_json(self.tickets_file, data)
-        return ticket_id
-    
-    async def get_ticket(self, ticket_id):
-        data = await self.load_json(self.tickets_file)
-        for t in data.get('tickets', []):
-            if t.get('id') == ticket_id:
-                return t
-        return None
-    
-    async def update_ticket(self, ticket_id, updates):
-        data = await self.load_json(self.tickets_file)
-        for i, t in enumerate(data.get('tickets', [])):
-            if t.get('id') == ticket_id:
-                data['tickets'][i].update(updates)
-                await self.save_json(self.tickets_file, data)
-                return True
-        return False
-    
-    async def add_sale(self, sale_data):
-        data = await self.load_json(self.stats_file)
-        data['total_sales'] = data.get('total_sales', 0) + 1
-        data['total_revenue'] = data.get('total_revenue', 0) + sale_data.get('price', 0)
-        
-        if 'accounts_sold' not in data: data['accounts_sold'] = []
-        data['accounts_sold'].append({**sale_data, 'date': datetime.now().isoformat()})
-        
-        today = datetime.now().strftime('%Y-%m-%d')
-        if 'daily_stats' not in data: data['daily_stats'] = {}
-        if today not in data['daily_stats']:
-            data['daily_stats'][today] = {'sales': 0, 'revenue': 0}
-        data['daily_stats'][today]['sales'] += 1
-        data['daily_stats'][today]['revenue'] += sale_data.get('price', 0)
-        
-        seller = sale_data.get('seller', 'Unknown')
-        if 'seller_stats' not in data: data['seller_stats'] = {}
-        if seller not in data['seller_stats']:
-            data['seller_stats'][seller] = {'sales': 0, 'revenue': 0}
-        data['seller_stats'][seller]['sales'] += 1
-        data['seller_stats'][seller]['revenue'] += sale_data.get('price', 0)
-        
-        rank = sale_data.get('rank', 'Unknown')
-        if 'rank_stats' not in data: data['rank_stats'] = {}
-        if rank not in data['rank_stats']:
-            data['rank_stats'][rank] = {'sales': 0, 'revenue': 0}
-        data['rank_stats'][rank]['sales'] += 1
-        data['rank_stats'][rank]['revenue'] += sale_data.get('price', 0)
-        
-        await self.save_json(self.stats_file, data)
-    
-    async def add_purchase(self, purchase_data):
-        """إضافة عملية شراء حسابات"""
-        data = await self.load_json(self.stats_file)
-        
-        if 'purchases' not in data: data['purchases'] = []
-        if 'total_purchase_cost' not in data: data['total_purchase_cost'] = 0
-        
-        purchase_id = f"PUR-{len(data['purchases']) + 1:04d}"
-        purchase_record = {
-            'id': purchase_id,
-            **purchase_data,
-            'date': datetime.now().isoformat()
-        }
-        
-        data['purchases'].append(purchase_record)
-        data['total_purchase_cost'] = data.get('total_purchase_cost', 0) + purchase_data.get('cost', 0)
-        
-        await self.save_json(self.stats_file, data)
-        return purchase_id
-    
-    async def get_stats(self):
-        data = await self.load_json(self.stats_file)
-        return {
-            "total_sales": data.get("total_sales", 0),
-            "total_revenue": data.get("total_revenue", 0),
-            "total_purchase_cost": data.get("total_purchase_cost", 0),
-            "accounts_sold": data.get("accounts_sold", []),
-            "purchases": data.get("purchases", []),
-            "daily_stats": data.get("daily_stats", {}),
-            "seller_stats": data.get("seller_stats", {}),
-            "rank_stats": data.get("rank_stats", {})
-        }
-    
-    async def get_config(self):
-        return await self.load_json(self.config_file)
-    
-    async def save_config(self, config):
-        await self.save_json(self.config_file, config)
+# ============ BACKGROUND TASKS ============
+# asyncio بيمسك الـ tasks بـ weak references بس: من غير الـ set ده ممكن تتمسح في النص
+background_tasks = set()
 
-db = Database()
+def run_in_background(coro, what: str) -> asyncio.Task:
+    """تشغيل coroutine من غير ما حد يستناها، مع log لو وقعت"""
+    task = asyncio.get_running_loop().create_task(coro)
+    background_tasks.add(task)
+    
+    def finished(task: asyncio.Task):
+        background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("❌ Error %s: %s", what, task.exception(), exc_info=task.exception())
+    
+    task.add_done_callback(finished)
+    return task
 
 # ============ STATS FUNCTIONS ============
 async def create_stats_embed():
-    stats = await db.get_stats()
-    accounts = await db.get_all_accounts()
+    # كل الأرقام متحسبة وقت الكتابة: العرض مبيعدش حسابات ولا يرتب بائعين
+    stats = await db.stats_summary()
+    counts = stats['accounts']
     
-    finished = len([a for a in accounts if a.get('status') == 'finished'])
-    not_finished = len([a for a in accounts if a.get('status') == 'not_finished'])
+    finished = counts.get('finished', 0)
+    not_finished = counts.get('not_finished', 0)
     
-    today = datetime.now().strftime('%Y-%m-%d')
-    daily = stats.get('daily_stats', {}).get(today, {'sales': 0, 'revenue': 0})
+    daily = stats['today']
     
     # Calculate net profit
     total_revenue = stats.get('total_revenue', 0)
@@ -259,7 +91,7 @@ async def create_stats_embed():
     net_profit = total_revenue - total_purchase_cost
     
     # Count purchased accounts
-    total_purchased = sum([p.get('quantity', 0) for p in stats.get('purchases', [])])
+    total_purchased = stats.get('total_purchased', 0)
     
     e = discord.Embed(
         title="📊 إحصائيات النظام",
@@ -285,7 +117,7 @@ async def create_stats_embed():
     e.add_field(
         name="🎮 الحسابات",
         value=f"```yaml\n"
-              f"الحالي: {len(accounts)}\n"
+              f"الحالي: {counts['total']}\n"
               f"مكتمل ✅: {finished}\n"
               f"جاري ⏳: {not_finished}\n"
               f"مشترى 🛒: {total_purchased}\n"
@@ -304,25 +136,23 @@ async def create_stats_embed():
     )
     
     # Top sellers
-    seller_stats = stats.get('seller_stats', {})
-    if seller_stats:
-        top_sellers = sorted(seller_stats.items(), key=lambda x: x[1]['sales'], reverse=True)[:5]
+    top_sellers = stats['top_sellers']
+    if top_sellers:
         sellers_text = "\n".join([f"{i+1}. {s[0]}: {s[1]['sales']} ({s[1]['revenue']:,.0f} ج)" for i, s in enumerate(top_sellers)])
     else:
         sellers_text = "لا يوجد"
     e.add_field(name="🏆 أفضل البائعين", value=f"```\n{sellers_text}\n```", inline=True)
     
     # Top ranks
-    rank_stats = stats.get('rank_stats', {})
-    if rank_stats:
-        top_ranks = sorted(rank_stats.items(), key=lambda x: x[1]['sales'], reverse=True)[:5]
+    top_ranks = stats['top_ranks']
+    if top_ranks:
         ranks_text = "\n".join([f"{i+1}. {r[0]}: {r[1]['sales']}" for i, r in enumerate(top_ranks)])
     else:
         ranks_text = "لا يوجد"
     e.add_field(name="📊 أكثر الرانكات", value=f"```\n{ranks_text}\n```", inline=True)
     
     # Last purchases
-    purchases = stats.get('purchases', [])[-3:][::-1]
+    purchases = stats.get('recent_purchases', [])[-3:][::-1]
     if purchases:
         purchase_text = "\n".join([f"• {p.get('quantity', 0)} حساب - {p.get('cost', 0):,.0f} ج" for p in purchases])
     else:
@@ -344,23 +174,49 @@ async def create_stats_embed():
     
     return e
 
-async def update_stats_message(guild):
+# guild.id → (PartialMessage لرسالة الإحصائيات، بصمة آخر embed اتبعتلها)
+stats_messages = {}
+
+def embed_fingerprint(embed: discord.Embed) -> str:
+    """بصمة محتوى الـ embed من غير الـ timestamp: نفس البصمة = نفس الأرقام المعروضة"""
+    data = embed.to_dict()
+    data.pop('timestamp', None)
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+def remember_stats_message(guild, message, embed: discord.Embed):
+    """تسجيل إن الرسالة دي اتعدلت بالـ embed ده (عشان التحديث الجاي يعرف إن مفيش جديد)"""
+    cached = stats_messages.get(guild.id)
+    if cached is not None and cached[0].id == message.id:
+        stats_messages[guild.id] = (cached[0], embed_fingerprint(embed))
+
+async def update_stats_message(guild, force: bool = False):
+    """تحديث رسالة الإحصائيات؛ لو الأرقام زي آخر مرة مفيش request لديسكورد إلا لو force"""
     try:
         config = await db.get_config()
         channel_id = config.get('stats_channel_id')
         message_id = config.get('stats_message_id')
+        embed = await create_stats_embed()
+        fingerprint = embed_fingerprint(embed)
         
         if channel_id and message_id:
-            channel = guild.get_channel(channel_id)
-            if channel:
+            cached = stats_messages.get(guild.id)
+            if cached and cached[0].id == message_id:
+                message = cached[0]
+                if not force and cached[1] == fingerprint:
+                    log.debug("📊 Stats unchanged in %s, skipped edit", guild.name)
+                    return True
+            else:
+                channel = guild.get_channel(channel_id)
+                # PartialMessage: التعديل مباشرة من غير fetch_message الأول
+                message = channel.get_partial_message(message_id) if channel else None
+            if message:
                 try:
-                    message = await channel.fetch_message(message_id)
-                    embed = await create_stats_embed()
                     await message.edit(embed=embed, view=StatsView())
-                    print(f"📊 Stats updated at {datetime.now().strftime('%H:%M:%S')}")
+                    stats_messages[guild.id] = (message, fingerprint)
+                    log.debug("📊 Stats updated in %s", guild.name)
                     return True
                 except discord.NotFound:
-                    pass
+                    stats_messages.pop(guild.id, None)
         
         channel = discord.utils.get(guild.text_channels, name="📊│احصائيات")
         if channel:
@@ -368,8 +224,8 @@ async def update_stats_message(guild):
                 if msg.author == guild.me:
                     await msg.delete()
             
-            embed = await create_stats_embed()
             new_msg = await channel.send(embed=embed, view=StatsView())
+            stats_messages[guild.id] = (channel.get_partial_message(new_msg.id), fingerprint)
             
             await db.save_config({
                 'stats_channel_id': channel.id,
@@ -377,9 +233,29 @@ async def update_stats_message(guild):
             })
             return True
     except Exception as e:
-        print(f"❌ Stats update error: {e}")
+        log.error("❌ Stats update error: %s", e)
     return False
 
+# guild.id → task التحديث المستني (واحد بس لكل سيرفر)
+stats_refreshes = {}
+
+def schedule_stats_refresh(guild):
+    """تحديث رسالة الإحصائيات بعد STATS_DEBOUNCE_SECONDS برة الـ interaction
+    
+    كل الطلبات اللي بتيجي لحد ما التحديث يبدأ بتتجمع في render + edit واحد.
+    """
+    if guild is None:
+        return
+    task = stats_refreshes.get(guild.id)
+    if task is None or task.done():
+        stats_refreshes[guild.id] = asyncio.create_task(refresh_stats_later(guild))
+
+async def refresh_stats_later(guild):
+    await asyncio.sleep(STATS_DEBOUNCE_SECONDS)
+    # أي كتابة من هنا ورايح بتعمل task جديد (التحديث ده ممكن ميكونش شافها)
+    stats_refreshes.pop(guild.id, None)
+    await update_stats_message(guild)
+
 # ============ MODALS ============
 
 class AddPurchaseModal(ui.Modal, title="🛒 إضافة عملية شراء"):
@@ -439,7 +315,7 @@ class AddPurchaseModal(ui.Modal, title="🛒 إضافة عملية شراء"):
         embed.timestamp = discord.utils.utcnow()
         
         await interaction.response.send_message(embed=embed)
-        await update_stats_message(interaction.guild)
+        schedule_stats_refresh(interaction.guild)
 
 class ProfitCalculatorModal(ui.Modal, title="💰 حساب وتقسيم الأرباح"):
     num_people = ui.TextInput(
@@ -532,6 +408,7 @@ class StatsView(ui.View):
         await interaction.response.defer()
         embed = await create_stats_embed()
         await interaction.message.edit(embed=embed, view=self)
+        remember_stats_message(interaction.guild, interaction.message, embed)
         await interaction.followup.send("✅ تم التحديث!", ephemeral=True)
     
     @ui.button(label="🛒", style=discord.ButtonStyle.secondary, custom_id="add_purchase_btn")
@@ -732,7 +609,7 @@ class SoldModal(ui.Modal, title="💰 معلومات البيع"):
         embed.add_field(name="🎮 الرانك", value=self.rank, inline=True)
         
         await interaction.response.send_message(embed=embed, view=WaitingMoneyView())
-        await update_stats_message(interaction.guild)
+        schedule_stats_refresh(interaction.guild)
 
 class WaitingMoneyView(ui.View):
     def __init__(self):
@@ -764,6 +641,98 @@ class FinalView(ui.View):
         await interaction.channel.delete()
 
 # --- Account Views (نفس الكود السابق) ---
+def account_backup_embed(account_id: str, account: dict) -> discord.Embed:
+    be = discord.Embed(title=f"💾 Backup - {account_id}", color=COLORS['purple'])
+    be.add_field(name="📋 المعلومات", value=f"```{account['account_info']}```", inline=False)
+    be.add_field(name="📊 اللفل", value=str(account['current_level']), inline=True)
+    be.add_field(name="👤 فاتحه", value=account['opened_by'], inline=True)
+    be.timestamp = discord.utils.utcnow()
+    return be
+
+def account_embed(account_id: str, account: dict, added_by: str):
+    """embed الحساب في قناة level-15 → (embed, is_done)"""
+    is_done = account['current_level'] >= 15
+    color, prefix = (COLORS['success'], "✅") if is_done else (COLORS['warning'], "⏳")
+    
+    embed = discord.Embed(title=f"{prefix} حساب - {account_id}", color=color)
+    embed.add_field(name="🆔 ID", value=f"`{account_id}`", inline=False)
+    embed.add_field(name="📋 المعلومات", value=f"```{account['account_info'][:500]}```", inline=False)
+    embed.add_field(name="📊 اللفل", value=f"`{account['current_level']}`", inline=True)
+    embed.add_field(name="👤 فاتحه", value=account['opened_by'], inline=True)
+    embed.add_field(name="➕ أضافه", value=added_by, inline=True)
+    if account.get('rank'):
+        embed.add_field(name="🎮 الرانك", value=account['rank'], inline=True)
+    if account.get('notes'):
+        embed.add_field(name="📝 ملاحظات", value=account['notes'], inline=False)
+    embed.timestamp = discord.utils.utcnow()
+    return embed, is_done
+
+class ChannelSender:
+    """إرسال رسايل كتير لقناة واحدة على قد الـ rate limit بتاعها
+    
+    Discord بيسمح بحوالي 5 رسايل كل 5 ثواني للقناة، فبنستنى دورنا بدل ما نخبط في 429؛
+    ولو جه 429 برضه بنستنى retry_after ونعيد.
+    """
+    SEND_RETRIES = 5
+    
+    def __init__(self, channel, per_window: int = 5, window: float = 5.0):
+        self.channel = channel
+        self.window = window
+        self.sent_at = deque(maxlen=per_window)
+    
+    async def _wait_turn(self):
+        if len(self.sent_at) == self.sent_at.maxlen:
+            wait = self.sent_at[0] + self.window - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        self.sent_at.append(time.monotonic())
+    
+    async def send(self, **kwargs) -> bool:
+        for attempt in range(self.SEND_RETRIES):
+            await self._wait_turn()
+            try:
+                await self.channel.send(**kwargs)
+                return True
+            except discord.RateLimited as e:
+                retry_after = e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    log.error("❌ Error sending to #%s: %s", self.channel.name, e)
+                    return False
+                retry_after = self.window
+            log.warning("⏳ Rate limited on #%s, retrying in %.1fs", self.channel.name, retry_after)
+            await asyncio.sleep(retry_after)
+        return False
+
+async def post_imported_accounts(guild, accounts: List[dict], added_by: str) -> int:
+    """embeds الحسابات المستوردة في قنواتها → عدد اللي اتبعت
+    
+    كل حساب في رسالة لوحده (الأزرار بتقرا الـ ID من أول embed)، والـ backups 10 embeds في الرسالة.
+    القنوات بتتبعت بالتوازي وكل قناة على قد الـ rate limit بتاعها.
+    """
+    by_channel = {"✅│level-15-done": [], "⏳│level-15-not-finish": []}
+    for account in accounts:
+        embed, is_done = account_embed(account['id'], account, added_by)
+        by_channel["✅│level-15-done" if is_done else "⏳│level-15-not-finish"].append(
+            {'embed': embed, 'view': AccountControlView(account['id'], is_done)}
+        )
+    backups = [account_backup_embed(a['id'], a) for a in accounts]
+    by_channel["🔒│backup-accounts"] = [{'embeds': backups[i:i + 10]} for i in range(0, len(backups), 10)]
+    
+    async def drain(name, messages):
+        channel = discord.utils.get(guild.channels, name=name)
+        if not channel or not messages:
+            return 0
+        sender = ChannelSender(channel)
+        sent = 0
+        for message in messages:
+            sent += await sender.send(**message)
+        return sent
+    
+    sent = await asyncio.gather(*(drain(name, messages) for name, messages in by_channel.items()))
+    log.info("📨 Posted %s import messages", sum(sent))
+    return sum(sent)
+
 class AccountInfoModal(ui.Modal, title="📝 إضافة حساب"):
     account_info = ui.TextInput(label="معلومات الحساب", placeholder="الإيميل\nالباسورد\nأي معلومات...", style=discord.TextStyle.paragraph, required=True, max_length=1000)
     current_level = ui.TextInput(label="اللفل الحالي", placeholder="مثال: 10", required=True)
@@ -777,7 +746,7 @@ class AccountInfoModal(ui.Modal, title="📝 إضافة حساب"):
             await interaction.response.send_message("❌ اللفل لازم رقم!", ephemeral=True)
             return
         
-        account_id = await db.add_account({
+        account = {
             'account_info': self.account_info.value,
             'current_level': level,
             'opened_by': self.opened_by.value,
@@ -785,37 +754,15 @@ class AccountInfoModal(ui.Modal, title="📝 إضافة حساب"):
             'added_by': interaction.user.id,
             'added_by_name': interaction.user.name,
             'status': 'finished' if level >= 15 else 'not_finished'
-        })
+        }
+        account_id = await db.add_account(account)
         
         backup_ch = discord.utils.get(interaction.guild.channels, name="🔒│backup-accounts")
         if backup_ch:
-            be = discord.Embed(title=f"💾 Backup - {account_id}", color=COLORS['purple'])
-            be.add_field(name="📋 المعلومات", value=f"```{self.account_info.value}```", inline=False)
-            be.add_field(name="📊 اللفل", value=str(level), inline=True)
-            be.add_field(name="👤 فاتحه", value=self.opened_by.value, inline=True)
-            be.timestamp = discord.utils.utcnow()
-            await backup_ch.send(embed=be)
+            await backup_ch.send(embed=account_backup_embed(account_id, account))
         
-        if level >= 15:
-            target = discord.utils.get(interaction.guild.channels, name="✅│level-15-done")
-            color = COLORS['success']
-            prefix = "✅"
-            is_done = True
-        else:
-            target = discord.utils.get(interaction.guild.channels, name="⏳│level-15-not-finish")
-            color = COLORS['warning']
-            prefix = "⏳"
-            is_done = False
-        
-        embed = discord.Embed(title=f"{prefix} حساب - {account_id}", color=color)
-        embed.add_field(name="🆔 ID", value=f"`{account_id}`", inline=False)
-        embed.add_field(name="📋 المعلومات", value=f"```{self.account_info.value[:500]}```", inline=False)
-        embed.add_field(name="📊 اللفل", value=f"`{level}`", inline=True)
-        embed.add_field(name="👤 فاتحه", value=self.opened_by.value, inline=True)
-        embed.add_field(name="➕ أضافه", value=interaction.user.mention, inline=True)
-        if self.notes.value:
-            embed.add_field(name="📝 ملاحظات", value=self.notes.value, inline=False)
-        embed.timestamp = discord.utils.utcnow()
+        embed, is_done = account_embed(account_id, account, interaction.user.mention)
+        target = discord.utils.get(interaction.guild.channels, name="✅│level-15-done" if is_done else "⏳│level-15-not-finish")
         
         if target:
             await target.send(embed=embed, view=AccountControlView(account_id, is_done))
@@ -823,7 +770,7 @@ class AccountInfoModal(ui.Modal, title="📝 إضافة حساب"):
         else:
             await interaction.response.send_message("❌ القناة مش موجودة! استخدم `/setup_all`", ephemeral=True)
         
-        await update_stats_message(interaction.guild)
+        schedule_stats_refresh(interaction.guild)
 
 class AccountControlView(ui.View):
     def __init__(self, account_id="", is_done=False):
@@ -875,7 +822,7 @@ class AccountControlView(ui.View):
             await done_ch.send(embed=embed, view=AccountControlView(acc_id, True))
             await interaction.response.send_message("✅ تم النقل!", ephemeral=True)
             await interaction.message.delete()
-            await update_stats_message(interaction.guild)
+            schedule_stats_refresh(interaction.guild)
         else:
             await interaction.response.send_message("❌ القناة مش موجودة!", ephemeral=True)
     
@@ -910,7 +857,7 @@ class AccountControlView(ui.View):
             await db.delete_account(acc_id)
             await interaction.response.send_message("✅ تم الحذف!", ephemeral=True)
             await interaction.message.delete()
-            await update_stats_message(interaction.guild)
+            schedule_stats_refresh(interaction.guild)
         else:
             await interaction.response.send_message("❌ Error!", ephemeral=True)
 
@@ -919,6 +866,8 @@ class EditAccountModal(ui.Modal, title="📝 تعديل الحساب"):
         super().__init__()
         self.account_id = account_id
         self.message = message
+        # النسخة اللي الفورم اتملا منها: لو حد عدّل الحساب قبل الـ submit منكتبش فوق تعديله
+        self.version = account_data.get('version', 0)
         self.account_info.default = account_data.get('account_info', '')
         self.current_level.default = str(account_data.get('current_level', ''))
         self.opened_by.default = account_data.get('opened_by', '')
@@ -936,12 +885,15 @@ class EditAccountModal(ui.Modal, title="📝 تعديل الحساب"):
             await interaction.response.send_message("❌ اللفل لازم رقم!", ephemeral=True)
             return
         
-        await db.update_account(self.account_id, {
+        updated = await db.update_account(self.account_id, {
             'account_info': self.account_info.value,
             'current_level': level,
             'opened_by': self.opened_by.value,
             'notes': self.notes.value
-        })
+        }, expected_version=self.version)
+        if not updated:
+            await interaction.response.send_message("⚠️ الحساب اتعدل أو اتحذف من حد تاني، افتح التعديل تاني!", ephemeral=True)
+            return
         
         await interaction.response.send_message("✅ تم التحديث!", ephemeral=True)
 
@@ -984,7 +936,71 @@ class DoneAccountModal(ui.Modal, title="📝 إضافة حساب مكتمل"):
         embed.timestamp = discord.utils.utcnow()
         
         await interaction.response.send_message(embed=embed, view=AccountControlView(account_id, True))
-        await update_stats_message(interaction.guild)
+        schedule_stats_refresh(interaction.guild)
+
+# ============ SEARCH ============
+SEARCH_PAGE = 5
+
+def is_admin(member) -> bool:
+    """عنده ADMIN_ROLE_ID في السيرفر (discord.User في الـ DM مالوش guild ولا roles → False)"""
+    guild = getattr(member, 'guild', None)
+    if guild is None:
+        return False
+    admin_role = guild.get_role(ADMIN_ROLE_ID)
+    return admin_role is not None and admin_role in member.roles
+
+async def create_search_embed(query: str, kinds, sensitive: bool, page: int):
+    """صفحة نتايج → (embed, عدد الصفحات)"""
+    total, results = await db.search(query, kinds, sensitive, page * SEARCH_PAGE, SEARCH_PAGE)
+    pages = max(1, -(-total // SEARCH_PAGE))
+    
+    embed = discord.Embed(title=f"🔎 البحث: {query}"[:256], color=COLORS['info'])
+    if not results:
+        embed.description = "📭 مفيش نتايج!"
+    for kind, record, score in results:
+        if kind == 'account':
+            name = f"💳 {record['id']} | Level {record.get('current_level', '?')} | {record.get('status', '?')}"
+            lines = [f"👤 فاتحه: {record.get('opened_by', '?')}"]
+        else:
+            name = f"🎫 {record['id']} | {record.get('rank', '?')} | {record.get('status', '?')}"
+            lines = [f"👤 {record.get('user_name', '?')}"]
+            if record.get('buyer'):
+                lines.append(f"🛒 المشتري: {record['buyer']}")
+        if record.get('notes'):
+            lines.append(f"📝 {record['notes'][:200]}")
+        if sensitive and record.get('account_info'):
+            lines.append(f"```{record['account_info'][:500]}```")
+        embed.add_field(name=name[:256], value="\n".join(lines)[:1024], inline=False)
+    embed.set_footer(text=f"صفحة {page + 1}/{pages} • {total} نتيجة")
+    return embed, pages
+
+class SearchResultsView(ui.View):
+    def __init__(self, query: str, kinds, sensitive: bool, pages: int):
+        super().__init__(timeout=300)
+        self.query = query
+        self.kinds = kinds
+        self.sensitive = sensitive
+        self.pages = pages
+        self.page = 0
+        self.update_buttons()
+    
+    def update_buttons(self):
+        self.previous.disabled = self.page <= 0
+        self.next.disabled = self.page >= self.pages - 1
+    
+    async def show(self, interaction: discord.Interaction, page: int):
+        self.page = page
+        embed, self.pages = await create_search_embed(self.query, self.kinds, self.sensitive, page)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @ui.button(label="◀️", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: ui.Button):
+        await self.show(interaction, self.page - 1)
+    
+    @ui.button(label="▶️", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: ui.Button):
+        await self.show(interaction, self.page + 1)
 
 # ============ BOT ============
 class MarvelBot(commands.Bot):
@@ -1012,18 +1028,21 @@ class MarvelBot(commands.Bot):
             synced = await self.tree.sync(guild=guild)
         else:
             synced = await self.tree.sync()
-        print(f"✅ Synced {len(synced)} commands")
+        log.info("✅ Synced %s commands", len(synced))
         
         self.auto_update_stats.start()
+        if SNAPSHOT_EVERY_MINUTES > 0:
+            self.auto_snapshot.start()
+        run_in_background(db.prune_backups(), "pruning account backups")
     
     async def on_ready(self):
-        print(f"{'='*50}")
-        print(f"🤖 BOT READY: {self.user.name}")
-        print(f"🆔 ID: {self.user.id}")
-        print(f"📊 Servers: {len(self.guilds)}")
-        print(f"📝 Commands: {len(self.tree.get_commands())}")
-        print(f"🔄 Auto-update: Every 3 minutes")
-        print(f"{'='*50}")
+        log.info("=" * 50)
+        log.info("🤖 BOT READY: %s", self.user.name)
+        log.info("🆔 ID: %s", self.user.id)
+        log.info("📊 Servers: %s", len(self.guilds))
+        log.info("📝 Commands: %s", len(self.tree.get_commands()))
+        log.info("🔄 Auto-update: Every 3 minutes")
+        log.info("=" * 50)
         
         await self.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name="Marvel Accounts 🎮"))
         
@@ -1038,6 +1057,15 @@ class MarvelBot(commands.Bot):
     @auto_update_stats.before_loop
     async def before_auto_update(self):
         await self.wait_until_ready()
+    
+    @tasks.loop(minutes=max(1, SNAPSHOT_EVERY_MINUTES))
+    async def auto_snapshot(self):
+        # الـ snapshot بيتعمل في thread، وكل lock بيتمسك لنسخة ملف واحد بس
+        await asyncio.to_thread(create_snapshot, db)
+    
+    @auto_snapshot.before_loop
+    async def before_auto_snapshot(self):
+        await self.wait_until_ready()
 
 bot = MarvelBot()
 
@@ -1154,26 +1182,27 @@ async def add_purchase_cmd(interaction: discord.Interaction, quantity: int, cost
     embed.add_field(name="🏪 المصدر", value=source, inline=True)
     
     await interaction.response.send_message(embed=embed)
-    await update_stats_message(interaction.guild)
+    schedule_stats_refresh(interaction.guild)
 
 @bot.tree.command(name="list_purchases", description="عرض قائمة المشتريات")
 @app_commands.default_permissions(administrator=True)
 async def list_purchases(interaction: discord.Interaction):
     stats = await db.get_stats()
-    purchases = stats.get('purchases', [])
+    # آخر 10 بس → بيفتح آخر segment أو اتنين مش السجل كله
+    purchases = await db.get_purchases(limit=10)
     
     if not purchases:
         await interaction.response.send_message("📭 لا توجد مشتريات!", ephemeral=True)
         return
     
-    embed = discord.Embed(title=f"🛒 قائمة المشتريات ({len(purchases)})", color=COLORS['info'])
+    embed = discord.Embed(title=f"🛒 قائمة المشتريات ({stats.get('total_purchases', 0)})", color=COLORS['info'])
     
-    total_quantity = sum([p.get('quantity', 0) for p in purchases])
-    total_cost = sum([p.get('cost', 0) for p in purchases])
+    total_quantity = stats.get('total_purchased', 0)
+    total_cost = stats.get('total_purchase_cost', 0)
     
     embed.description = f"```yaml\n📦 إجمالي الحسابات: {total_quantity}\n💰 إجمالي التكلفة: {total_cost:,.0f} ج\n```"
     
-    for p in purchases[-10:]:
+    for p in purchases:
         embed.add_field(
             name=f"🆔 {p.get('id', 'N/A')}",
             value=f"📦 {p.get('quantity', 0)} حساب\n💵 {p.get('cost', 0):,.0f} ج\n🏪 {p.get('source', 'N/A')}",
@@ -1258,10 +1287,14 @@ async def reset_stats(interaction: discord.Interaction):
 @bot.tree.command(name="confirm_reset", description="تأكيد إعادة التعيين")
 @app_commands.default_permissions(administrator=True)
 async def confirm_reset(interaction: discord.Interaction):
+    # الـ lists الفاضية بتفضي سجل المبيعات والمشتريات كمان
     default_stats = {
         "total_sales": 0,
         "total_revenue": 0,
         "total_purchase_cost": 0,
+        "total_purchased": 0,
+        "total_purchases": 0,
+        "recent_purchases": [],
         "accounts_sold": [],
         "purchases": [],
         "daily_stats": {},
@@ -1278,7 +1311,7 @@ async def confirm_reset(interaction: discord.Interaction):
     )
     
     await interaction.response.send_message(embed=embed)
-    await update_stats_message(interaction.guild)
+    schedule_stats_refresh(interaction.guild)
 
 @bot.tree.command(name="clean_channels", description="حذف القنوات")
 @app_commands.default_permissions(administrator=True)
@@ -1302,11 +1335,84 @@ async def stats(interaction: discord.Interaction):
     embed = await create_stats_embed()
     await interaction.response.send_message(embed=embed, view=StatsView(), ephemeral=True)
 
+# أقصى عدد خانات (ساعات/أيام/...) بتتعرض في /stats_range
+RANGE_LINES = 48
+RANGE_LABELS = {'hour': '%m-%d %H:00', 'day': '%Y-%m-%d', 'week': 'W %Y-%m-%d', 'month': '%Y-%m'}
+
+def format_change(current, previous) -> str:
+    """التغيير عن الفترة اللي قبلها بالنسبة"""
+    if not previous:
+        return "جديد" if current else "—"
+    # abs عشان صافي ربح سالب قبلها ميقلبش الإشارة
+    return f"{(current - previous) / abs(previous) * 100:+.0f}%"
+
+@bot.tree.command(name="stats_range", description="إحصائيات فترة ومقارنتها بالفترة اللي قبلها")
+@app_commands.rename(from_date="from", to_date="to")
+@app_commands.describe(from_date="من يوم YYYY-MM-DD (افتراضي: آخر 7 أيام)", to_date="لحد يوم YYYY-MM-DD (ومعاه)",
+                       unit="التقسيم (افتراضي: على قد الفترة)")
+@app_commands.choices(unit=[
+    app_commands.Choice(name="ساعة", value="hour"),
+    app_commands.Choice(name="يوم", value="day"),
+    app_commands.Choice(name="أسبوع", value="week"),
+    app_commands.Choice(name="شهر", value="month")
+])
+async def stats_range(interaction: discord.Interaction, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                      unit: Optional[app_commands.Choice[str]] = None):
+    try:
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        end = (datetime.strptime(to_date, '%Y-%m-%d') if to_date else today) + timedelta(days=1)
+        start = datetime.strptime(from_date, '%Y-%m-%d') if from_date else end - timedelta(days=7)
+    except ValueError:
+        await interaction.response.send_message("❌ التاريخ لازم يكون كده: 2026-10-18", ephemeral=True)
+        return
+    if start >= end:
+        await interaction.response.send_message("❌ أول الفترة لازم يكون قبل آخرها!", ephemeral=True)
+        return
+    
+    # أول مرة بتبني الـ rollups من السجل
+    await interaction.response.defer(ephemeral=True)
+    report = await db.stats_range(start, end, unit.value if unit else None)
+    total, previous = report['total'], report['previous']
+    days = (end - start).days
+    
+    lines = [f"{moment.strftime(RANGE_LABELS[report['unit']])}: {b['sales']} | {b['revenue']:,.0f} ج"
+             for moment, b in report['buckets'] if b['sales'] or b['purchase_cost']]
+    if len(lines) > RANGE_LINES:
+        lines = lines[-RANGE_LINES:]
+        lines.insert(0, "...")
+    e = discord.Embed(
+        title=f"📈 {start:%Y-%m-%d} → {end - timedelta(days=1):%Y-%m-%d}",
+        description="```\n" + ("\n".join(lines) or "لا يوجد") + "\n```",
+        color=COLORS['purple']
+    )
+    net = total['revenue'] - total['purchase_cost']
+    e.add_field(
+        name="💰 الفترة",
+        value=f"```yaml\n"
+              f"المبيعات: {total['sales']}\n"
+              f"الإيرادات: {total['revenue']:,.0f} ج\n"
+              f"التكاليف: {total['purchase_cost']:,.0f} ج\n"
+              f"صافي الربح: {net:,.0f} ج\n"
+              f"```",
+        inline=True
+    )
+    e.add_field(
+        name=f"🔁 مقارنة بالـ {days} يوم اللي قبلها",
+        value=f"```yaml\n"
+              f"المبيعات: {format_change(total['sales'], previous['sales'])}\n"
+              f"الإيرادات: {format_change(total['revenue'], previous['revenue'])}\n"
+              f"التكاليف: {format_change(total['purchase_cost'], previous['purchase_cost'])}\n"
+              f"صافي الربح: {format_change(net, previous['revenue'] - previous['purchase_cost'])}\n"
+              f"```",
+        inline=True
+    )
+    await interaction.followup.send(embed=e, ephemeral=True)
+
 @bot.tree.command(name="update_stats", description="تحديث الإحصائيات")
 @app_commands.default_permissions(administrator=True)
 async def update_stats_cmd(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
-    success = await update_stats_message(interaction.guild)
+    success = await update_stats_message(interaction.guild, force=True)
     if success:
         await interaction.followup.send("✅ تم التحديث!")
     else:
@@ -1316,19 +1422,96 @@ async def update_stats_cmd(interaction: discord.Interaction):
 async def add_account(interaction: discord.Interaction):
     await interaction.response.send_modal(AccountInfoModal())
 
+@bot.tree.command(name="import_accounts", description="استيراد حسابات من ملف CSV أو JSONL أو JSON")
+@app_commands.describe(file="أعمدة: account_info, current_level, opened_by, notes, rank")
+@app_commands.default_permissions(administrator=True)
+async def import_accounts(interaction: discord.Interaction, file: discord.Attachment):
+    await interaction.response.defer(ephemeral=True)
+    if file.size > MAX_IMPORT_BYTES:
+        await interaction.followup.send(f"❌ الملف أكبر من {MAX_IMPORT_BYTES // 1024 // 1024}MB!", ephemeral=True)
+        return
+    
+    # الملف كله بيتراجع الأول: أي سطر غلط = مفيش حاجة بتتضاف
+    accounts, errors = parse_accounts(file.filename, await file.read())
+    if errors:
+        shown = "\n".join(errors[:15]) + (f"\n... و{len(errors) - 15} كمان" if len(errors) > 15 else "")
+        await interaction.followup.send(f"❌ الملف فيه أخطاء، مفيش حاجة اتضافت:\n```{shown}```", ephemeral=True)
+        return
+    
+    for account in accounts:
+        account['added_by'] = interaction.user.id
+        account['added_by_name'] = interaction.user.name
+    started = time.perf_counter()
+    account_ids = await db.add_accounts(accounts)
+    if not account_ids:
+        await interaction.followup.send("❌ فشل الاستيراد، مفيش حاجة اتضافت!", ephemeral=True)
+        return
+    
+    await interaction.followup.send(
+        f"✅ تم استيراد {len(account_ids)} حساب في {time.perf_counter() - started:.2f} ثانية "
+        f"({account_ids[0]} → {account_ids[-1]})\n📨 الـ embeds بتتبعت في القنوات في الخلفية...",
+        ephemeral=True
+    )
+    schedule_stats_refresh(interaction.guild)
+    
+    # مئات الرسايل بتاخد دقايق: بتتبعت في الخلفية والأمر يخلص على طول
+    run_in_background(post_imported_accounts(interaction.guild, accounts, interaction.user.mention),
+                      "posting imported accounts")
+
 @bot.tree.command(name="list_accounts", description="قائمة الحسابات")
-async def list_accounts(interaction: discord.Interaction):
-    accounts = await db.get_all_accounts()
-    if not accounts:
+@app_commands.describe(status="الحالة", min_level="أقل لفل", max_level="أعلى لفل", rank="الرانك", opened_by="فاتحه")
+@app_commands.choices(status=[
+    app_commands.Choice(name="✅ خلص", value="finished"),
+    app_commands.Choice(name="⏳ مخلصش", value="not_finished")
+])
+async def list_accounts(interaction: discord.Interaction, status: Optional[app_commands.Choice[str]] = None,
+                        min_level: Optional[int] = None, max_level: Optional[int] = None,
+                        rank: Optional[str] = None, opened_by: Optional[str] = None):
+    filters = {'status': status.value if status else None, 'min_level': min_level,
+               'max_level': max_level, 'rank': rank, 'opened_by': opened_by}
+    view = AccountListView(filters)
+    page = await db.list_accounts(**filters)
+    if not page['accounts']:
         await interaction.response.send_message("📭 لا توجد حسابات!", ephemeral=True)
         return
     
-    e = discord.Embed(title=f"📋 الحسابات ({len(accounts)})", color=COLORS['info'])
-    for a in accounts[:15]:
-        e.add_field(name=a['id'], value=f"Level: {a.get('current_level', '?')} | {a.get('status', '?')}", inline=True)
+    await interaction.response.send_message(embed=view.load(page), view=view, ephemeral=True)
+
+@bot.tree.command(name="accounts_near_done", description="الحسابات القريبة من لفل 15")
+@app_commands.describe(min_level="من لفل", max_level="لحد لفل")
+async def accounts_near_done(interaction: discord.Interaction, min_level: int = 12, max_level: int = 14):
+    if min_level > max_level:
+        await interaction.response.send_message("❌ أقل لفل لازم يكون أصغر من أعلى لفل!", ephemeral=True)
+        return
+    
+    # من index اللفل: O(log n + k) مش كل الحسابات
+    total, accounts = await db.accounts_in_levels(min_level, max_level, limit=24)
+    if not total:
+        await interaction.response.send_message(f"📭 مفيش حسابات بين لفل {min_level} و{max_level}!", ephemeral=True)
+        return
     
+    e = discord.Embed(title=f"⏳ الحسابات من لفل {min_level} لـ {max_level} ({total})", color=COLORS['warning'])
+    for a in accounts:
+        e.add_field(name=a['id'], value=f"📊 Level {a['current_level']} | 👤 {a.get('opened_by') or '?'}", inline=True)
+    if total > len(accounts):
+        e.set_footer(text=f"أعلى {len(accounts)} بس • استخدم /list_accounts بالفلاتر للباقي")
     await interaction.response.send_message(embed=e, ephemeral=True)
 
+@bot.tree.command(name="search", description="بحث في الحسابات والتذاكر")
+@app_commands.describe(query="جزء من الإيميل، الملاحظات، اسم المشتري، الرانك...", kind="الحسابات أو التذاكر بس")
+@app_commands.choices(kind=[
+    app_commands.Choice(name="الحسابات", value="account"),
+    app_commands.Choice(name="التذاكر", value="ticket")
+])
+async def search_cmd(interaction: discord.Interaction, query: str, kind: Optional[app_commands.Choice[str]] = None):
+    # أول بحث بيبني الـ index
+    await interaction.response.defer(ephemeral=True)
+    kinds = (kind.value,) if kind else None
+    # بيانات الدخول (account_info) بتتبحث وتتعرض للأدمن بس
+    sensitive = is_admin(interaction.user)
+    embed, pages = await create_search_embed(query, kinds, sensitive, 0)
+    await interaction.followup.send(embed=embed, view=SearchResultsView(query, kinds, sensitive, pages), ephemeral=True)
+
 @bot.tree.command(name="list_ranks", description="الرانكات")
 async def list_ranks(interaction: discord.Interaction):
     e = discord.Embed(title="📋 الرانكات", color=COLORS['info'])
@@ -1365,11 +1548,11 @@ try:
     
     def keep_alive():
         Thread(target=run, daemon=True).start()
-        print("✅ Keep-alive started")
+        log.info("✅ Keep-alive started")
     
     keep_alive()
 except:
-    print("⚠️ Flask not available")
+    log.warning("⚠️ Flask not available")
 @bot.tree.command(name="verify_data", description="التحقق من حفظ البيانات")
 @app_commands.default_permissions(administrator=True)
 async def verify_data(interaction: discord.Interaction):
@@ -1388,13 +1571,13 @@ async def verify_data(interaction: discord.Interaction):
     ]:
         if os.path.exists(file_path):
             size = os.path.getsize(file_path)
-            data = db._read_file(file_path)
+            data = await db.load_json(file_path)
             items = 0
             
             if file_name == "Accounts":
                 items = len(data.get('accounts', []))
             elif file_name == "Tickets":
-                items = len(data.get('tickets', [])) + len(data.get('closed_tickets', []))
+                items = len(data.get('tickets', [])) + await db.count_closed_tickets()
             elif file_name == "Stats":
                 items = data.get('total_sales', 0)
             
@@ -1411,8 +1594,9 @@ async def verify_data(interaction: discord.Interaction):
             )
     
     # Get stats
-    stats = await db.get_stats()
-    accounts = await db.get_all_accounts()
+    snapshot = await db.snapshot('stats', 'accounts')
+    stats = snapshot['stats']
+    accounts = snapshot['accounts']
     
     embed.add_field(
         name="📊 Summary",
@@ -1420,7 +1604,19 @@ async def verify_data(interaction: discord.Interaction):
               f"Accounts: {len(accounts)}\n"
               f"Sales: {stats.get('total_sales', 0)}\n"
               f"Revenue: {stats.get('total_revenue', 0)} ج\n"
-              f"Purchases: {len(stats.get('purchases', []))}\n"
+              f"Purchases: {stats.get('total_purchases', 0)}\n"
+              f"```",
+        inline=False
+    )
+    
+    # Cache stats
+    cache = db.cache_info()
+    embed.add_field(
+        name="⚡ Cache",
+        value=f"```yaml\n"
+              f"Hits: {cache['hits']}\n"
+              f"Misses: {cache['misses']}\n"
+              f"Hit rate: {cache['hit_rate']:.1%}\n"
               f"```",
         inline=False
     )
@@ -1436,8 +1632,8 @@ async def force_save(interaction: discord.Interaction):
         # Force read and write all files
         for file_path in [db.accounts_file, db.tickets_file, db.stats_file, db.config_file]:
             if os.path.exists(file_path):
-                data = db._read_file(file_path)
-                db._write_file(file_path, data)
+                data = await db.load_json(file_path)
+                await db.save_json(file_path, data)
         
         await interaction.followup.send("✅ تم حفظ جميع البيانات بنجاح!")
     except Exception as e:
@@ -0,0 +1,109 @@
+"""إجماليات المبيعات والمشتريات بالساعة مع مجاميع تراكمية (prefix sums)
+
+كل ساعة من أول سجل لحد آخر سجل ليها خانة، و_prefix[metric][i] = مجموع الـ metric
+في الساعات قبل الساعة i. مجموع أي فترة [من، لـ) = فرق خانتين، يعني O(1) لكل metric
+مهما كانت الفترة طويلة؛ واليوم/الأسبوع/الشهر مجرد حدود مختلفة على نفس الـ prefix.
+
+البيعة العادية بتقع في آخر ساعة (أو بعدها) فبتزود آخر خانة بس؛ سجل أقدم
+(ساعة الجهاز رجعت لورا مثلاً) بيزود كل الخانات اللي بعده.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+METRICS = ('sales', 'revenue', 'purchase_cost')
+_EPOCH = datetime(2000, 1, 1)
+
+def hour_number(moment: datetime) -> int:
+    """رقم الساعة من _EPOCH (الدقايق بتتشال)"""
+    return int((moment - _EPOCH).total_seconds() // 3600)
+
+def bucket_start(moment: datetime, unit: str) -> datetime:
+    """بداية الساعة/اليوم/الأسبوع (الاتنين)/الشهر اللي فيه moment"""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if unit == 'hour':
+        return moment
+    moment = moment.replace(hour=0)
+    if unit == 'day':
+        return moment
+    if unit == 'week':
+        return moment - timedelta(days=moment.weekday())
+    return moment.replace(day=1)
+
+def next_bucket(start: datetime, unit: str) -> datetime:
+    if unit == 'hour':
+        return start + timedelta(hours=1)
+    if unit == 'day':
+        return start + timedelta(days=1)
+    if unit == 'week':
+        return start + timedelta(days=7)
+    return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+
+def pick_unit(start: datetime, end: datetime) -> str:
+    """وحدة مناسبة لطول الفترة (عشان عدد الخانات يفضل معقول في الـ embed)"""
+    span = end - start
+    if span <= timedelta(days=2):
+        return 'hour'
+    if span <= timedelta(days=31):
+        return 'day'
+    if span <= timedelta(weeks=26):
+        return 'week'
+    return 'month'
+
+class Rollups:
+    def __init__(self):
+        # رقم أول ساعة فيها خانة (None = مفيش سجلات)
+        self._first = None
+        self._prefix: Dict[str, List[float]] = {metric: [0] for metric in METRICS}
+    
+    def __len__(self) -> int:
+        return len(self._prefix['sales']) - 1
+    
+    def add(self, kind: str, record: dict):
+        """kind = 'sales' أو 'purchases' (سجل زي اللي في get_sales / get_purchases)"""
+        try:
+            moment = datetime.fromisoformat(record.get('date', ''))
+        except (TypeError, ValueError):
+            return
+        if kind == 'sales':
+            values = {'sales': 1, 'revenue': record.get('price', 0) or 0}
+        else:
+            values = {'purchase_cost': record.get('cost', 0) or 0}
+        
+        hour = hour_number(moment.replace(tzinfo=None))
+        if self._first is None:
+            self._first = hour
+        elif hour < self._first:
+            for metric, prefix in self._prefix.items():
+                self._prefix[metric] = [0] * (self._first - hour) + prefix
+            self._first = hour
+        
+        slot = hour - self._first + 1
+        for metric, prefix in self._prefix.items():
+            if len(prefix) <= slot:
+                prefix.extend([prefix[-1]] * (slot + 1 - len(prefix)))
+            value = values.get(metric)
+            if value:
+                for i in range(slot, len(prefix)):
+                    prefix[i] += value
+    
+    def _before(self, prefix: List[float], hour: int) -> float:
+        """مجموع كل الساعات قبل hour"""
+        if self._first is None or hour <= self._first:
+            return 0
+        return prefix[min(hour - self._first, len(prefix) - 1)]
+    
+    def total(self, start: datetime, end: datetime) -> Dict[str, float]:
+        """إجمالي كل metric في [start, end) بالساعات الكاملة"""
+        first, last = hour_number(start), hour_number(end)
+        return {metric: self._before(prefix, last) - self._before(prefix, first)
+                for metric, prefix in self._prefix.items()}
+    
+    def buckets(self, start: datetime, end: datetime, unit: str) -> List[Tuple[datetime, Dict[str, float]]]:
+        """[(بداية الخانة، الإجماليات)] لكل ساعة/يوم/أسبوع/شهر في [start, end)"""
+        result = []
+        moment = bucket_start(start, unit)
+        while moment < end:
+            following = next_bucket(moment, unit)
+            result.append((moment, self.total(max(moment, start), min(following, end))))
+            moment = following
+        return result
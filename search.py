@@ -0,0 +1,182 @@
+"""Index بحث نصي للحسابات والتذاكر (في الذاكرة، بيتحدث مع كل كتابة)
+
+كل كلمة في الحقول (lowercase، مقسومة على أي حاجة مش حرف/رقم) بتشاور على المستندات
+اللي فيها + الحقول اللي ظهرت فيها (bits). كلمة البحث بتطابق أي كلمة بتبدأ بيها:
+"ahmed" بتلاقي ahmed.ali99@gmail.com، و"ali9" كمان.
+
+أكتر من كلمة = لازم كلهم (AND). الحقول الحساسة (SENSITIVE) مبتدخلش في البحث
+غير لو sensitive=True، فمحدش يقدر يعرف إن إيميل معين موجود من غير ما يكون أدمن.
+"""
+import bisect
+import re
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+# (kind, field) → (bit, الوزن في الترتيب، حساس؟)
+FIELDS = {
+    ('account', 'account_info'): (1 << 0, 2, True),
+    ('account', 'notes'): (1 << 1, 1, False),
+    ('account', 'opened_by'): (1 << 2, 3, False),
+    ('ticket', 'account_info'): (1 << 3, 2, True),
+    ('ticket', 'notes'): (1 << 4, 1, False),
+    ('ticket', 'user_name'): (1 << 5, 3, False),
+    ('ticket', 'buyer'): (1 << 6, 3, False),
+    ('ticket', 'rank'): (1 << 7, 2, False),
+}
+SENSITIVE_MASK = sum(bit for bit, _, sensitive in FIELDS.values() if sensitive)
+ALL_MASK = sum(bit for bit, _, _ in FIELDS.values())
+# bits → وزن أهم حقل فيهم (جدول عشان منحسبش max لكل posting)
+BEST_WEIGHT = [max((weight for bit, weight, _ in FIELDS.values() if bits & bit), default=0)
+               for bits in range(ALL_MASK + 1)]
+# الكلمة كاملة بتاخد ضعف البداية بس
+EXACT_BONUS = 2
+
+MIN_QUERY = 2
+# ترتيب كلمات البحث (الأندر الأول) بيبص على postings أول كام كلمة بتبدأ بيها بس
+ESTIMATE_TOKENS = 32
+# آخر كام بحث مترتبين (الصفحات التانية من نفس البحث من غير ما يتحسب تاني)
+CACHED_QUERIES = 32
+_WORD = re.compile(r'\w+')
+
+def tokenize(text) -> List[str]:
+    return _WORD.findall(str(text).casefold()) if text else []
+
+class SearchIndex:
+    def __init__(self):
+        # كلمة → {doc: bits}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # كل الكلمات مترتبة عشان البحث بالبداية (bisect)
+        self._vocab: List[str] = []
+        # doc → (kind, id) و(kind, id) → doc؛ الـ doc رقم بيزيد فالأحدث أكبر
+        self._keys: Dict[int, Tuple[str, str]] = {}
+        self._docs: Dict[Tuple[str, str], int] = {}
+        self._terms: Dict[int, Dict[str, int]] = {}
+        # آخر version اتعمله index: قراءة قديمة وصلت متأخر متكتبش فوق الأحدث
+        self._versions: Dict[int, int] = {}
+        self._next_doc = 0
+        # (الكلمات، mask) → [(doc, score)] مترتبة؛ أي put/remove بيفضيه
+        self._cache = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._docs)
+    
+    def put(self, kind: str, record: dict):
+        """إضافة/تحديث سجل (اللي اتغير بس بيتلمس في الـ postings)"""
+        key = (kind, record.get('id'))
+        doc = self._docs.get(key)
+        version = record.get('version', 0)
+        if doc is not None and version < self._versions[doc]:
+            return
+        if doc is None:
+            doc = self._docs[key] = self._next_doc
+            self._keys[doc] = key
+            self._next_doc += 1
+        
+        terms = {}
+        for (field_kind, field), (bit, _, _) in FIELDS.items():
+            if field_kind == kind:
+                for token in tokenize(record.get(field)):
+                    terms[token] = terms.get(token, 0) | bit
+        
+        old = self._terms.get(doc, {})
+        for token in old.keys() - terms.keys():
+            self._unpost(token, doc)
+        for token, bits in terms.items():
+            if old.get(token) != bits:
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    bisect.insort(self._vocab, token)
+                postings[doc] = bits
+        self._terms[doc] = terms
+        self._versions[doc] = version
+        self._cache.clear()
+    
+    def remove(self, kind: str, record_id: str):
+        doc = self._docs.pop((kind, record_id), None)
+        if doc is None:
+            return
+        for token in self._terms.pop(doc):
+            self._unpost(token, doc)
+        del self._keys[doc]
+        del self._versions[doc]
+        self._cache.clear()
+    
+    def _unpost(self, token: str, doc: int):
+        postings = self._postings[token]
+        del postings[doc]
+        if not postings:
+            del self._postings[token]
+            del self._vocab[bisect.bisect_left(self._vocab, token)]
+    
+    def _range(self, word: str) -> Tuple[int, int]:
+        """[start, end) في _vocab للكلمات اللي بتبدأ بـ word"""
+        start = bisect.bisect_left(self._vocab, word)
+        return start, bisect.bisect_left(self._vocab, word + '\U0010ffff', start)
+    
+    def _estimate(self, start: int, end: int) -> int:
+        """عدد تقريبي للمستندات: أول ESTIMATE_TOKENS كلمة بالظبط والباقي 1 لكل كلمة"""
+        head = min(end, start + ESTIMATE_TOKENS)
+        return sum(len(self._postings[token]) for token in self._vocab[start:head]) + end - head
+    
+    def _matches(self, word: str, tokens: List[str], mask: int) -> Dict[int, int]:
+        """doc → score للمستندات اللي فيها كلمة من tokens في حقل من mask"""
+        scores = {}
+        for token in tokens:
+            bonus = EXACT_BONUS if token == word else 1
+            for doc, bits in self._postings[token].items():
+                score = bonus * BEST_WEIGHT[bits & mask]
+                if score > scores.get(doc, 0):
+                    scores[doc] = score
+        return scores
+    
+    def _rescore(self, word: str, candidates, mask: int) -> Dict[int, int]:
+        """زي _matches بس جوه candidates: من كلمات كل مستند بدل postings كل البدايات"""
+        scores = {}
+        for doc in candidates:
+            best = 0
+            for token, bits in self._terms[doc].items():
+                if token.startswith(word):
+                    score = (EXACT_BONUS if token == word else 1) * BEST_WEIGHT[bits & mask]
+                    if score > best:
+                        best = score
+            if best:
+                scores[doc] = best
+        return scores
+    
+    def search(self, query: str, kinds=None, sensitive: bool = False,
+               offset: int = 0, limit: int = 10) -> Tuple[int, List[Tuple[str, str, int]]]:
+        """→ (عدد النتايج كله، [(kind, id, score)] للصفحة) مترتبة بالأعلى score ثم الأحدث
+        
+        أندر كلمة بس بتتجاب من الـ postings، والباقي بيتدور عليه في نتايجها؛
+        فالتكلفة على قد أندر كلمة مش على قد الـ index.
+        """
+        words = [word for word in tokenize(query) if len(word) >= MIN_QUERY]
+        if not words:
+            return 0, []
+        mask = ALL_MASK if sensitive else ALL_MASK & ~SENSITIVE_MASK
+        if kinds:
+            mask &= sum(bit for (kind, _), (bit, _, _) in FIELDS.items() if kind in kinds)
+        
+        key = (tuple(words), mask)
+        ranked = self._cache.get(key)
+        if ranked is None:
+            ranked = self._cache[key] = self._rank(words, mask)
+            if len(self._cache) > CACHED_QUERIES:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return len(ranked), [(*self._keys[doc], score) for doc, score in ranked[offset:offset + limit]]
+    
+    def _rank(self, words: List[str], mask: int) -> List[Tuple[int, int]]:
+        ranges = sorted((self._estimate(*self._range(word)), word) for word in words)
+        rarest = ranges[0][1]
+        start, end = self._range(rarest)
+        scores = self._matches(rarest, self._vocab[start:end], mask)
+        for _, word in ranges[1:]:
+            if not scores:
+                break
+            matched = self._rescore(word, scores, mask)
+            scores = {doc: scores[doc] + score for doc, score in matched.items()}
+        
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
@@ -0,0 +1,69 @@
+import json
+import os
+
+from logger import get_logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# DB_FORMAT: auto (orjson لو متسطب وإلا json) | json | json-pretty | orjson | msgpack
+# القراءة بتعرف الصيغة من أول byte، فتغيير الصيغة مش محتاج تحويل للملفات
+FORMAT = os.getenv('DB_FORMAT', 'auto').lower()
+
+log = get_logger('serializers')
+
+def available_formats() -> list:
+    formats = ['json', 'json-pretty']
+    if orjson is not None:
+        formats.append('orjson')
+    if msgpack is not None:
+        formats.append('msgpack')
+    return formats
+
+def resolve(name: str = None) -> str:
+    """اسم الصيغة الفعلي (auto أو صيغة مش متسطبة → json)"""
+    name = (name or FORMAT).lower()
+    if name == 'auto':
+        return 'orjson' if orjson is not None else 'json'
+    if name not in available_formats():
+        log.warning("⚠️ Format %s not available, using json", name)
+        return 'json'
+    return name
+
+def dumps(data, fmt: str = None) -> bytes:
+    """تحويل مستند لـ bytes بالصيغة المختارة"""
+    fmt = resolve(fmt)
+    if fmt == 'orjson':
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    if fmt == 'msgpack':
+        return msgpack.packb(data, use_bin_type=True)
+    if fmt == 'json-pretty':
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def loads(raw: bytes):
+    """قراءة مستند بأي صيغة: JSON بيبدأ بـ { أو [ (بعد المسافات)، غير كده msgpack"""
+    head = raw.lstrip()[:1]
+    if head in (b'{', b'[') or not head:
+        if not head:
+            return {}
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+    if msgpack is None:
+        raise ValueError("File looks like msgpack but msgpack is not installed")
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+def dumps_line(data) -> str:
+    """سطر JSON واحد (للـ journal والـ logs اللي لازم تفضل نص سطر بسطر)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+def loads_line(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
@@ -0,0 +1,305 @@
+"""Snapshots تزايدية مضغوطة لمجلد البيانات + استرجاع لوقت معين
+
+python snapshots.py create
+python snapshots.py list
+python snapshots.py restore --at "2026-10-18 12:00" [--target data]
+
+كل snapshot = manifest صغير (SNAPSHOT_DIR/<وقت>.json) بيشاور على blobs مضغوطة
+بالـ sha256 بتاعها (SNAPSHOT_DIR/blobs/). الملف اللي متغيرش بياخد نفس الـ blob،
+والملف الـ append-only اللي كبر بيتخزن منه الجزء الجديد بس.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import logger
+from database import DATA_DIR
+
+log = logger.get_logger('snapshots')
+
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+# كل قد ايه snapshot في الخلفية (0 = مقفول)
+SNAPSHOT_EVERY_MINUTES = int(os.getenv('SNAPSHOT_EVERY_MINUTES', 60))
+# Rotation: كل الـ snapshots آخر KEEP_HOURS ساعة، وبعدها آخر واحد في اليوم لمدة KEEP_DAYS
+SNAPSHOT_KEEP_HOURS = int(os.getenv('SNAPSHOT_KEEP_HOURS', 24))
+SNAPSHOT_KEEP_DAYS = int(os.getenv('SNAPSHOT_KEEP_DAYS', 14))
+
+# آخر كام byte من الجزء القديم بنتأكد إنهم متغيروش قبل ما نعتبر الملف اتزود عليه بس
+TAIL_CHECK = 4096
+# بعد العدد ده من الأجزاء الملف بيتخزن كامل من جديد
+MAX_PIECES = 64
+TIME_FORMAT = '%Y-%m-%dT%H-%M-%S-%f'
+
+_running = threading.Lock()
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{path}.tmp", path)
+
+def _blob_path(snapshot_dir: str, digest: str) -> str:
+    return f"{snapshot_dir}/blobs/{digest[:2]}/{digest}.gz"
+
+def _store_blob(snapshot_dir: str, data: bytes) -> str:
+    digest = _sha(data)
+    path = _blob_path(snapshot_dir, digest)
+    if not os.path.exists(path):
+        _write_atomic(path, gzip.compress(data))
+    return digest
+
+def _read_blob(snapshot_dir: str, digest: str) -> bytes:
+    with open(_blob_path(snapshot_dir, digest), 'rb') as f:
+        data = gzip.decompress(f.read())
+    if _sha(data) != digest:
+        raise ValueError(f"Corrupt snapshot blob: {digest}")
+    return data
+
+def list_snapshots(snapshot_dir: str = SNAPSHOT_DIR) -> list:
+    """[(created_at, manifest_path)] من الأقدم للأحدث"""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(snapshot_dir):
+        if name.endswith('.json'):
+            try:
+                created = datetime.strptime(name[:-len('.json')], TIME_FORMAT)
+            except ValueError:
+                continue
+            snapshots.append((created, os.path.join(snapshot_dir, name)))
+    return sorted(snapshots)
+
+def _load_manifest(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _relative(path: str) -> str:
+    rel = os.path.relpath(path, DATA_DIR)
+    # ملف بره مجلد البيانات (SQLITE_PATH مثلاً) بيتسجل بمساره الكامل وبيرجع مكانه
+    return os.path.abspath(path) if rel == '..' or rel.startswith('..' + os.sep) else rel
+
+def _whole(snapshot_dir: str, data: bytes, inode: int = None) -> dict:
+    return {
+        'size': len(data),
+        'pieces': [_store_blob(snapshot_dir, data)] if data else [],
+        'inode': inode,
+        'tail': _sha(data[-TAIL_CHECK:])
+    }
+
+def _capture_append(snapshot_dir: str, path: str, lock, previous: Optional[dict]) -> Optional[dict]:
+    """ملف append-only: الحجم تحت الـ lock، والقراءة (الجزء الجديد بس لو ينفع) بره"""
+    with lock:
+        if not os.path.exists(path):
+            return None
+        f = open(path, 'rb')
+        st = os.fstat(f.fileno())
+    
+    with f:
+        size = st.st_size
+        if (previous and previous.get('inode') == st.st_ino and previous['size'] <= size
+                and len(previous['pieces']) < MAX_PIECES):
+            start = max(0, previous['size'] - TAIL_CHECK)
+            f.seek(start)
+            if _sha(f.read(previous['size'] - start)) == previous['tail']:
+                if size == previous['size']:
+                    return previous
+                f.seek(previous['size'])
+                added = f.read(size - previous['size'])
+                f.seek(max(0, size - TAIL_CHECK))
+                return {
+                    'size': previous['size'] + len(added),
+                    'pieces': previous['pieces'] + [_store_blob(snapshot_dir, added)],
+                    'inode': st.st_ino,
+                    'tail': _sha(f.read(size - max(0, size - TAIL_CHECK)))
+                }
+        f.seek(0)
+        return _whole(snapshot_dir, f.read(size), st.st_ino)
+
+def _capture_sqlite(snapshot_dir: str, path: str) -> Optional[dict]:
+    """نسخة متسقة من القاعدة بالـ backup API من connection منفصلة"""
+    if not os.path.exists(path):
+        return None
+    temp = f"{snapshot_dir}/sqlite.tmp"
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(temp)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    with open(temp, 'rb') as f:
+        data = f.read()
+    os.remove(temp)
+    return _whole(snapshot_dir, data)
+
+def create_snapshot(database, snapshot_dir: str = SNAPSHOT_DIR) -> Optional[str]:
+    """snapshot جديد → مسار الـ manifest (None لو فيه snapshot شغال)
+    
+    أطول وقت بيتمسك فيه lock هو نسخ مستند واحد مع الـ journal بتاعه.
+    """
+    if not _running.acquire(blocking=False):
+        return None
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        snapshots = list_snapshots(snapshot_dir)
+        previous = _load_manifest(snapshots[-1][1])['files'] if snapshots else {}
+        files = {}
+        
+        for paths, lock, mode in database.snapshot_plan():
+            if mode == 'doc':
+                with lock:
+                    contents = {}
+                    for path in paths:
+                        if os.path.exists(path):
+                            with open(path, 'rb') as f:
+                                contents[path] = f.read()
+                for path, data in contents.items():
+                    files[_relative(path)] = _whole(snapshot_dir, data)
+            elif mode == 'append':
+                rel = _relative(paths[0])
+                entry = _capture_append(snapshot_dir, paths[0], lock, previous.get(rel))
+                if entry is not None:
+                    files[rel] = entry
+            elif mode == 'immutable':
+                rel = _relative(paths[0])
+                if rel in previous:
+                    files[rel] = previous[rel]
+                elif os.path.exists(paths[0]):
+                    with open(paths[0], 'rb') as f:
+                        files[rel] = _whole(snapshot_dir, f.read())
+            elif mode == 'sqlite':
+                entry = _capture_sqlite(snapshot_dir, paths[0])
+                if entry is not None:
+                    files[_relative(paths[0])] = entry
+        
+        created = datetime.now()
+        manifest_path = f"{snapshot_dir}/{created.strftime(TIME_FORMAT)}.json"
+        manifest = {'created_at': created.isoformat(), 'files': files}
+        _write_atomic(manifest_path, json.dumps(manifest, separators=(',', ':')).encode('utf-8'))
+        
+        total = sum(entry['size'] for entry in files.values())
+        log.info("📸 Snapshot %s: %s files, %s bytes", os.path.basename(manifest_path), len(files), total)
+        rotate_snapshots(snapshot_dir, created)
+        return manifest_path
+    except Exception as e:
+        log.error("❌ Error creating snapshot: %s", e)
+        return None
+    finally:
+        _running.release()
+
+def rotate_snapshots(snapshot_dir: str = SNAPSHOT_DIR, now: datetime = None):
+    """شيل الـ snapshots القديمة والـ blobs اللي مبقاش حد بيشاور عليها"""
+    now = now or datetime.now()
+    snapshots = list_snapshots(snapshot_dir)
+    if not snapshots:
+        return
+    
+    keep = {snapshots[-1][1]}
+    newest_per_day = {}
+    for created, path in snapshots:
+        age = now - created
+        if age <= timedelta(hours=SNAPSHOT_KEEP_HOURS):
+            keep.add(path)
+        elif age <= timedelta(days=SNAPSHOT_KEEP_DAYS):
+            newest_per_day[created.date()] = path
+    keep |= set(newest_per_day.values())
+    
+    removed = [path for _, path in snapshots if path not in keep]
+    for path in removed:
+        os.remove(path)
+    if not removed:
+        return
+    
+    used = set()
+    for path in keep:
+        for entry in _load_manifest(path)['files'].values():
+            used.update(entry['pieces'])
+    blobs = f"{snapshot_dir}/blobs"
+    # snapshots كل ملفاتها فاضية مبتعملش blobs
+    folders = os.listdir(blobs) if os.path.isdir(blobs) else []
+    for folder in folders:
+        for name in os.listdir(os.path.join(blobs, folder)):
+            if name[:-len('.gz')] not in used:
+                os.remove(os.path.join(blobs, folder, name))
+    log.info("🧹 Rotated %s old snapshots", len(removed))
+
+def restore_snapshot(at: datetime, target: str = DATA_DIR, snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    """بناء مجلد البيانات زي ما كان وقت at (آخر snapshot قبله)
+    
+    لازم البوت يكون واقف. المجلد الحالي بيتنقل لـ <target>.before-restore-<وقت>،
+    والملفات اللي كانت بره مجلد البيانات (مسارها كامل في الـ manifest) بترجع لنفس
+    المسار ونسختها الحالية (ومعاها -wal / -shm) بتتنقل لـ <الملف>.before-restore-<وقت>.
+    """
+    candidates = [(created, path) for created, path in list_snapshots(snapshot_dir) if created <= at]
+    if not candidates:
+        raise ValueError(f"No snapshot at or before {at.isoformat()}")
+    created, manifest_path = candidates[-1]
+    manifest = _load_manifest(manifest_path)
+    
+    staging = f"{target}.restore-tmp"
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    outside = [rel for rel in manifest['files'] if os.path.isabs(rel)]
+    for rel, entry in manifest['files'].items():
+        dest = f"{rel}.restore-tmp" if os.path.isabs(rel) else os.path.join(staging, rel)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, 'wb') as f:
+            for digest in entry['pieces']:
+                f.write(_read_blob(snapshot_dir, digest))
+            if f.tell() != entry['size']:
+                raise ValueError(f"Size mismatch restoring {rel}")
+    
+    stamp = datetime.now().strftime(TIME_FORMAT)
+    for path in outside:
+        # WAL قديم جنب القاعدة المسترجعة كان هيتطبق عليها أول ما تتفتح
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.replace(path + suffix, f"{path}{suffix}.before-restore-{stamp}")
+        os.replace(f"{path}.restore-tmp", path)
+    if os.path.exists(target):
+        os.replace(target, f"{target}.before-restore-{stamp}")
+    os.makedirs(staging, exist_ok=True)
+    os.replace(staging, target)
+    log.info("✅ Restored %s files from snapshot %s", len(manifest['files']), created.isoformat())
+    return manifest_path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("create", help="take a snapshot now")
+    sub.add_parser("list", help="list snapshots")
+    restore = sub.add_parser("restore", help="rebuild the data dir as of a timestamp (bot must be stopped)")
+    restore.add_argument("--at", required=True, help="ISO timestamp, e.g. '2026-10-18 12:00'")
+    restore.add_argument("--target", default=DATA_DIR)
+    args = parser.parse_args()
+    logger.setup()
+    
+    if args.command == "create":
+        from database import db
+        create_snapshot(db)
+    elif args.command == "list":
+        for created, path in list_snapshots():
+            files = _load_manifest(path)['files']
+            print(f"{created.isoformat()}  {len(files)} files  {sum(e['size'] for e in files.values())} bytes")
+    elif args.command == "restore":
+        try:
+            restore_snapshot(datetime.fromisoformat(args.at), args.target)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
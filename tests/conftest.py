@@ -0,0 +1,44 @@
+"""Fixtures مشتركة: كل test بيشتغل في مجلد مؤقت فيه data/ فاضي، على الـ backend الاتنين
+
+DATA_DIR في database.py نسبي ('data')، فالـ test بيعمل chdir لمجلد مؤقت ويفتح
+instance جديد هناك. database بيعمل db أول ما يتعمله import، فبنعمل chdir لمجلد
+مؤقت قبلها عشان ميلمسش data/ بتاعة الريبو.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DB_BACKEND', 'json')
+os.chdir(tempfile.mkdtemp(prefix='bot-tests-'))
+
+import database  # noqa: E402
+from database_sqlite import SQLiteDatabase  # noqa: E402
+
+BACKENDS = ('json', 'sqlite')
+
+def open_db(backend: str):
+    """instance جديد على data/ في المجلد الحالي (نفس اللي بيحصل لما البوت يقوم)"""
+    if backend == 'sqlite':
+        return SQLiteDatabase(f"{database.DATA_DIR}/marvel.db")
+    return database.Database()
+
+def run(coro):
+    return asyncio.run(coro)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, workdir):
+    return request.param
+
+@pytest.fixture
+def db(backend):
+    return open_db(backend)
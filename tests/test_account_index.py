@@ -0,0 +1,108 @@
+"""صفحات الـ cursor وحدود accounts_in_levels (الـ index لوحده وعلى الـ backend الاتنين)"""
+import pytest
+
+from account_index import AccountIndex, decode_cursor, encode_cursor
+from conftest import run
+
+def make_accounts(count: int) -> list:
+    return [{'account_info': f'a{i}', 'current_level': i % 20, 'opened_by': 'Zed' if i % 3 == 0 else 'Op',
+             'rank': 'Gold' if i % 2 else '', 'status': 'finished' if i % 20 >= 15 else 'not_finished'}
+            for i in range(count)]
+
+def walk(index: AccountIndex, limit: int, **filters) -> list:
+    """كل الصفحات لقدام بالـ cursors → [[ids]]"""
+    pages, cursor = [], None
+    while True:
+        rows, cursor, _ = index.page(cursor=cursor, limit=limit, **filters)
+        pages.append([row['id'] for row in rows])
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    key = (42, 'ACC-0042')
+    assert decode_cursor(encode_cursor('after', key)) == ('after', key)
+    # ID فيه ":" بيرجع زي ما هو
+    assert decode_cursor(encode_cursor('before', (0, 'old:1'))) == ('before', (0, 'old:1'))
+    for bad in ('garbage', encode_cursor('sideways', (1, 'x'))):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+def test_pages_forward_and_back():
+    index = AccountIndex()
+    for i, account in enumerate(make_accounts(47), 1):
+        index.put('account', {**account, 'id': f'ACC-{i:04d}'})
+    
+    pages = walk(index, 10)
+    assert [len(page) for page in pages] == [10, 10, 10, 10, 7]
+    assert sum(pages, []) == [f'ACC-{i:04d}' for i in range(1, 48)]
+    
+    # كل صفحة بالـ prev بتاعها ترجع اللي قبلها بالظبط
+    cursor = None
+    for previous, current in zip(pages, pages[1:]):
+        rows, next_cursor, prev_cursor = index.page(cursor=cursor, limit=10)
+        assert [r['id'] for r in rows] == previous
+        rows, _, back = index.page(cursor=next_cursor, limit=10)
+        assert [r['id'] for r in rows] == current
+        assert [r['id'] for r in index.page(cursor=back, limit=10)[0]] == previous
+        cursor = next_cursor
+
+def test_filtered_pages_skip_non_matching():
+    index = AccountIndex()
+    for i, account in enumerate(make_accounts(60), 1):
+        index.put('account', {**account, 'id': f'ACC-{i:04d}'})
+    found = sum(walk(index, 4, status='finished', opened_by='zed'), [])
+    assert found and all(index._rows[(int(i[4:]), i)]['opened_by'] == 'Zed' for i in found)
+    assert found == sorted(found)
+
+def test_ids_without_numbers_do_not_collide():
+    index = AccountIndex()
+    for account_id in ('legacy', 'old', 'ACC-0001', 'X-1'):
+        index.put('account', {'id': account_id, 'current_level': 5, 'status': 'finished', 'version': 1})
+    assert index.counts() == {'total': 4, 'finished': 4}
+    assert sorted(sum(walk(index, 1), [])) == ['ACC-0001', 'X-1', 'legacy', 'old']
+    index.remove('account', 'old')
+    assert sorted(sum(walk(index, 10), [])) == ['ACC-0001', 'X-1', 'legacy']
+
+def test_level_range_bounds():
+    index = AccountIndex()
+    for i, level, status in [(1, 11, 'not_finished'), (2, 12, 'not_finished'), (3, 14, 'finished'),
+                             (4, 15, 'finished'), (5, 12, 'finished'), (6, None, 'not_finished')]:
+        index.put('account', {'id': f'ACC-{i:04d}', 'current_level': level, 'status': status})
+    
+    total, rows = index.level_range(12, 14)
+    assert total == 3
+    # الأعلى لفل الأول، وجوه نفس اللفل الأحدث الأول
+    assert [r['id'] for r in rows] == ['ACC-0003', 'ACC-0005', 'ACC-0002']
+    assert index.level_range(12, 14, limit=1) == (3, rows[:1])
+    assert index.level_range(12, 12, status='finished')[0] == 1
+    assert index.level_range(15, 15)[0] == 1
+    assert index.level_range(16, 30) == (0, [])
+    assert index.level_range(14, 12) == (0, [])
+    # تغيير اللفل أو الحالة بينقل الحساب في ليستات اللفل
+    index.put('account', {'id': 'ACC-0002', 'current_level': 15, 'status': 'finished', 'version': 1})
+    assert index.level_range(12, 14, status='not_finished') == (0, [])
+    assert index.level_range(15, 15, status='finished')[0] == 2
+
+def test_list_accounts_and_levels_through_the_database(db):
+    async def check():
+        ids = await db.add_accounts(make_accounts(47))
+        seen, page = [], await db.list_accounts(limit=10)
+        while True:
+            seen += [a['id'] for a in page['accounts']]
+            if not page['next']:
+                break
+            page = await db.list_accounts(cursor=page['next'], limit=10)
+        assert seen == ids
+        
+        back = await db.list_accounts(cursor=page['prev'], limit=10)
+        assert [a['id'] for a in back['accounts']] == ids[30:40]
+        assert (await db.list_accounts(cursor='garbage'))['accounts'] == []
+        
+        total, rows = await db.accounts_in_levels(12, 14)
+        assert total == sum(1 for i in range(47) if 12 <= i % 20 <= 14)
+        assert all(12 <= r['current_level'] <= 14 for r in rows)
+        await db.update_account(ids[12], {'current_level': 15, 'status': 'finished'})
+        await db.delete_account(ids[13])
+        assert (await db.accounts_in_levels(12, 14))[0] == total - 2
+        assert (await db.accounts_in_levels(15, 15, status='finished'))[0] == 3
+    run(check())
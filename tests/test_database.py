@@ -0,0 +1,244 @@
+"""الـ journal والـ compaction والترقية من الملفات القديمة، على الـ backend الاتنين"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import database
+import database_sqlite
+from conftest import open_db, run
+
+def write_legacy(data_dir: str):
+    """ملفات بالشكل الأصلي (lists) زي ما البوت كان بيكتبها قبل الـ journal"""
+    os.makedirs(data_dir, exist_ok=True)
+    accounts = [
+        {'id': 'ACC-0001', 'account_info': 'one@x.com', 'current_level': 15, 'opened_by': 'Op', 'status': 'finished'},
+        {'id': 'ACC-0002', 'account_info': 'two@x.com', 'current_level': 7, 'opened_by': 'Op', 'status': 'not_finished'},
+    ]
+    # ACC-0003 اتحذف من accounts بس لسه في الـ backup: الـ ID ميتكررش
+    backup = accounts + [{'id': 'ACC-0003', 'account_info': 'gone@x.com', 'current_level': 3, 'opened_by': 'Op'}]
+    sales = [
+        {'buyer': 'b1', 'price': 100, 'seller': 'Sam', 'rank': 'Gold', 'date': '2026-09-01T10:00:00'},
+        {'buyer': 'b2', 'price': 250, 'seller': 'Sam', 'rank': 'Gold', 'date': '2026-10-02T11:00:00'},
+    ]
+    purchases = [{'id': 'PUR-0004', 'cost': 300, 'quantity': 3, 'date': '2026-09-15T09:00:00'}]
+    files = {
+        'accounts.json': {'accounts': accounts, 'backup': backup},
+        'tickets.json': {
+            'tickets': [{'id': 'TKT-0001', 'channel_id': 111, 'user_id': 5, 'status': 'open'}],
+            'closed_tickets': [{'id': 'TKT-0002', 'channel_id': 222, 'user_id': 5, 'status': 'closed'}]
+        },
+        'stats.json': {
+            'total_sales': 2, 'total_revenue': 350, 'total_purchase_cost': 300,
+            'accounts_sold': sales, 'purchases': purchases,
+            'daily_stats': {'2026-09-01': {'sales': 1, 'revenue': 100}, '2026-10-02': {'sales': 1, 'revenue': 250}},
+            'seller_stats': {'Sam': {'sales': 2, 'revenue': 350}},
+            'rank_stats': {'Gold': {'sales': 2, 'revenue': 350}}
+        },
+        'config.json': {'stats_channel_id': 9, 'stats_message_id': None}
+    }
+    for name, data in files.items():
+        with open(os.path.join(data_dir, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+def test_upgrade_from_legacy_list_files(backend, workdir):
+    write_legacy(database.DATA_DIR)
+    
+    async def check():
+        db = open_db(backend)
+        assert (await db.get_account('ACC-0002'))['current_level'] == 7
+        assert len(await db.get_all_accounts()) == 2
+        assert await db.add_account({'account_info': 'new', 'current_level': 1, 'opened_by': 'Op'}) == 'ACC-0004'
+        
+        assert (await db.get_ticket_by_channel(111))['id'] == 'TKT-0001'
+        assert (await db.get_closed_ticket('TKT-0002'))['channel_id'] == 222
+        assert await db.create_ticket({'channel_id': 333, 'user_id': 6}) == 'TKT-0003'
+        
+        stats = await db.get_stats()
+        assert (stats['total_sales'], stats['total_revenue'], stats['total_purchase_cost']) == (2, 350, 300)
+        assert [s['buyer'] for s in await db.get_sales()] == ['b1', 'b2']
+        assert await db.add_purchase({'cost': 10, 'quantity': 1}) == 'PUR-0005'
+        assert (await db.get_config())['stats_channel_id'] == 9
+        
+        # بعد restart البيانات المترقية نفسها بتتقري (من غير ما تترقى تاني)
+        db = open_db(backend)
+        assert [a['id'] for a in await db.get_all_accounts()] == ['ACC-0001', 'ACC-0002', 'ACC-0004']
+        assert (await db.get_stats())['total_sales'] == 2
+    run(check())
+
+def test_sqlite_import_leaves_source_dir_untouched(workdir):
+    write_legacy('legacy')
+    before = {name: open(os.path.join('legacy', name), 'rb').read() for name in os.listdir('legacy')}
+    
+    async def check():
+        db = open_db('sqlite')
+        counts = db.import_json('legacy')
+        assert (counts['accounts'], counts['sales'], counts['purchases']) == (2, 2, 1)
+        assert [a['id'] for a in await db.get_all_accounts()] == ['ACC-0001', 'ACC-0002']
+        assert (await db.get_config())['stats_channel_id'] == 9
+    run(check())
+    # الترقية حصلت في نسخة مؤقتة: ملفات المصدر زي ما هي ومفيش ملفات جديدة جنبها
+    assert {name: open(os.path.join('legacy', name), 'rb').read() for name in os.listdir('legacy')} == before
+    assert sorted(os.listdir(workdir)) == ['data', 'legacy']
+
+def test_journal_replay_after_truncated_last_line(workdir):
+    async def check():
+        db = open_db('json')
+        ids = [await db.add_account({'account_info': f'a{i}', 'current_level': i, 'opened_by': 'Op'}) for i in range(3)]
+        journal = f"{db.accounts_file}.journal"
+        good_size = os.path.getsize(journal)
+        # كتابة اتقطعت في النص: سطر من غير \n في الآخر
+        with open(journal, 'ab') as f:
+            f.write(b'{"seq":99,"ops":[{"op":"set","path":["accounts","ACC-0099"]')
+        
+        db = open_db('json')
+        assert [a['id'] for a in await db.get_all_accounts()] == ids
+        assert os.path.getsize(journal) == good_size
+        # الإضافة الجاية متتلزقش في البقايا وبتفضل بعد restart تاني
+        new_id = await db.add_account({'account_info': 'after', 'current_level': 1, 'opened_by': 'Op'})
+        db = open_db('json')
+        assert (await db.get_account(new_id))['account_info'] == 'after'
+        assert len(await db.get_all_accounts()) == 4
+    run(check())
+
+def test_compaction_then_restart(workdir):
+    async def check():
+        db = open_db('json')
+        ids = [await db.add_account({'account_info': f'a{i}', 'current_level': i, 'opened_by': 'Op'}) for i in range(5)]
+        await db.update_account(ids[0], {'current_level': 15, 'status': 'finished'})
+        await db.delete_account(ids[1])
+        await db.add_sale({'buyer': 'b', 'price': 100, 'seller': 'Sam', 'rank': 'Gold'})
+        
+        db.compact()
+        assert not os.path.exists(f"{db.accounts_file}.journal")
+        assert not os.path.exists(f"{db.accounts_file}.journal.old")
+        # كتابة بعد الـ compaction بتروح journal جديد فوق الـ snapshot
+        await db.update_account(ids[2], {'notes': 'after compact'})
+        
+        db = open_db('json')
+        accounts = {a['id']: a for a in await db.get_all_accounts()}
+        assert sorted(accounts) == sorted(set(ids) - {ids[1]})
+        assert accounts[ids[0]]['current_level'] == 15
+        assert accounts[ids[2]]['notes'] == 'after compact'
+        assert (await db.get_stats())['total_sales'] == 1
+        assert await db.add_account({'account_info': 'next', 'current_level': 1, 'opened_by': 'Op'}) == 'ACC-0006'
+    run(check())
+
+def test_restart_keeps_writes(backend, workdir):
+    async def check():
+        db = open_db(backend)
+        account_id = await db.add_account({'account_info': 'a', 'current_level': 2, 'opened_by': 'Op'})
+        ticket_id = await db.create_ticket({'channel_id': 42, 'user_id': 1, 'rank': 'Gold'})
+        await db.add_sale({'buyer': 'b', 'price': 120, 'seller': 'Sam', 'rank': 'Gold'})
+        await db.add_purchase({'cost': 80, 'quantity': 2})
+        db.compact()
+        await db.update_account(account_id, {'current_level': 3})
+        await db.close_ticket(ticket_id, {'final_status': 'completed'})
+        
+        db = open_db(backend)
+        assert (await db.get_account(account_id))['current_level'] == 3
+        assert await db.get_ticket(ticket_id) is None
+        assert (await db.get_closed_ticket(ticket_id))['final_status'] == 'completed'
+        stats = await db.get_stats()
+        assert (stats['total_sales'], stats['total_revenue'], stats['total_purchase_cost']) == (1, 120, 80)
+    run(check())
+
+def test_getters_return_private_copies(db):
+    async def check():
+        account_id = await db.add_account({'account_info': 'a', 'current_level': 2, 'opened_by': 'Op'})
+        await db.create_ticket({'channel_id': 42, 'user_id': 1})
+        (await db.get_account(account_id))['current_level'] = 99
+        (await db.get_ticket_by_channel(42))['status'] = 'hacked'
+        (await db.get_all_accounts())[0]['opened_by'] = 'Someone'
+        
+        account = await db.get_account(account_id)
+        assert (account['current_level'], account['opened_by']) == (2, 'Op')
+        assert (await db.get_ticket_by_channel(42))['status'] == 'open'
+    run(check())
+
+def test_amounts_match_between_backends(db):
+    async def check():
+        await db.add_sale({'buyer': 'b', 'price': 100, 'seller': 'Sam', 'rank': 'Gold'})
+        await db.add_sale({'buyer': 'c', 'price': 50, 'seller': 'Sam', 'rank': 'Gold'})
+        await db.add_purchase({'cost': 300, 'quantity': 2})
+        stats = await db.get_stats()
+        summary = await db.stats_summary()
+        for value in (stats['total_revenue'], stats['total_purchase_cost'],
+                      stats['seller_stats']['Sam']['revenue'], summary['today']['revenue']):
+            assert type(value) is int
+        assert stats['total_revenue'] == 150
+    run(check())
+
+def test_stats_summary_ties_and_account_counts(db):
+    async def check():
+        for seller, price in (('Amr', 100), ('Ziad', 200), ('Bassem', 200), ('Omar', 10), ('Omar', 10)):
+            await db.add_sale({'buyer': 'b', 'price': price, 'seller': seller, 'rank': 'Gold'})
+        account_id = await db.add_account({'account_info': 'a', 'current_level': 2, 'opened_by': 'Op'})
+        await db.add_account({'account_info': 'b', 'current_level': 15, 'opened_by': 'Op', 'status': 'finished'})
+        await db.update_account(account_id, {'status': 'finished'})
+        
+        summary = await db.stats_summary()
+        # التعادل في المبيعات بالإيرادات وبعدين الاسم، نفس الترتيب على الـ backend الاتنين
+        assert [name for name, _ in summary['top_sellers']] == ['Omar', 'Bassem', 'Ziad', 'Amr']
+        assert summary['accounts'] == {'total': 2, 'finished': 2}
+    run(check())
+
+def test_sold_ticket_is_searchable_by_buyer(db):
+    # SellModal في views/ticket_views.py بيكتب المشتري على التذكرة
+    async def check():
+        ticket_id = await db.create_ticket({'channel_id': 7, 'user_id': 1, 'user_name': 'client', 'rank': 'Gold'})
+        await db.update_ticket(ticket_id, {'status': 'sold', 'buyer': 'Mahmoud', 'price': 100})
+        total, results = await db.search('mahmoud', ('ticket',), False)
+        assert total == 1
+        kind, record, _ = results[0]
+        assert (record['id'], record['status'], record['buyer']) == (ticket_id, 'sold', 'Mahmoud')
+    run(check())
+
+def test_account_info_is_searched_only_when_sensitive(db):
+    async def check():
+        account_id = await db.add_account({'account_info': 'secret@mail.com', 'current_level': 3, 'opened_by': 'Op'})
+        assert (await db.search('secret', None, False))[0] == 0
+        total, results = await db.search('secret', None, True)
+        assert total == 1 and results[0][1]['id'] == account_id
+        # باقي الحقول بتتبحث للكل
+        assert (await db.search('Op', ('account',), False))[0] == 1
+    run(check())
+
+def test_prune_keeps_recent_backups_of_deleted_accounts(backend, workdir, monkeypatch):
+    monkeypatch.setattr(database, 'BACKUP_RETENTION_DAYS', 30)
+    monkeypatch.setattr(database_sqlite, 'BACKUP_RETENTION_DAYS', 30)
+    
+    async def check():
+        db = open_db(backend)
+        kept, deleted = [await db.add_account({'account_info': name, 'current_level': 1, 'opened_by': 'Op'})
+                         for name in ('kept', 'deleted')]
+        await db.delete_account(deleted)
+        # الحساب اتعمل من زمان بس النسخة اتاخدت دلوقتي: متتمسحش
+        assert await db.prune_backups() == 0
+        
+        later = datetime.now() + timedelta(days=31)
+        monkeypatch.setattr(database, 'datetime', type('Later', (datetime,), {'now': classmethod(lambda cls: later)}))
+        monkeypatch.setattr(database_sqlite, 'datetime', type('Later', (datetime,), {'now': classmethod(lambda cls: later)}))
+        # إنشاء instance جديد مبيمسحش حاجة: الـ prune بيشتغل من البوت بس
+        db = open_db(backend)
+        assert len([a async for a in db.get_backup_accounts()]) == 2
+        assert await db.prune_backups() == 1
+        backups = [a['id'] async for a in db.get_backup_accounts()]
+        assert backups == [kept]
+    run(check())
+
+def test_force_save_keeps_backup_times(backend, workdir, monkeypatch):
+    monkeypatch.setattr(database, 'BACKUP_RETENTION_DAYS', 30)
+    monkeypatch.setattr(database_sqlite, 'BACKUP_RETENTION_DAYS', 30)
+    
+    async def check():
+        db = open_db(backend)
+        deleted = await db.add_account({'account_info': 'deleted', 'current_level': 1, 'opened_by': 'Op'})
+        await db.delete_account(deleted)
+        
+        later = datetime.now() + timedelta(days=31)
+        monkeypatch.setattr(database, 'datetime', type('Later', (datetime,), {'now': classmethod(lambda cls: later)}))
+        monkeypatch.setattr(database_sqlite, 'datetime', type('Later', (datetime,), {'now': classmethod(lambda cls: later)}))
+        # نفس اللي /force_save بيعمله: الـ backup بيترجع بأوقاته الأصلية مش بوقت الحفظ
+        await db.save_json(db.accounts_file, await db.load_json(db.accounts_file))
+        assert await db.prune_backups() == 1
+    run(check())
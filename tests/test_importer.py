@@ -0,0 +1,46 @@
+"""parse_accounts: الملف كله بيترفض لو فيه أي سطر غلط"""
+import json
+
+import pytest
+
+from importer import MAX_IMPORT_ROWS, parse_accounts
+
+GOOD = {'account_info': 'mail@x.com', 'current_level': 12, 'opened_by': 'Op'}
+
+def jsonl(*rows) -> bytes:
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+def test_accepts_csv_jsonl_and_json():
+    csv = b"account_info,current_level,opened_by,rank\nmail@x.com,16,Op,Gold\n"
+    accounts, errors = parse_accounts('a.csv', csv)
+    assert errors == []
+    assert accounts == [{'account_info': 'mail@x.com', 'current_level': 16, 'opened_by': 'Op',
+                         'notes': '', 'rank': 'Gold', 'status': 'finished'}]
+    assert parse_accounts('a.jsonl', jsonl(GOOD, GOOD))[0][1]['status'] == 'not_finished'
+    assert len(parse_accounts('a.json', json.dumps([GOOD, GOOD, GOOD]).encode())[0]) == 3
+
+@pytest.mark.parametrize('row, error', [
+    ({**GOOD, 'account_info': '  '}, "account_info is empty"),
+    ({**GOOD, 'account_info': 'x' * 1001}, "account_info is longer than 1000 characters"),
+    ({**GOOD, 'current_level': 'ten'}, "current_level must be a number, got 'ten'"),
+    ({**GOOD, 'current_level': -1}, "current_level can't be negative"),
+    ({**GOOD, 'opened_by': ''}, "opened_by is empty"),
+])
+def test_rejects_invalid_rows(row, error):
+    accounts, errors = parse_accounts('a.jsonl', jsonl(GOOD, row))
+    assert accounts == []
+    assert errors == [f"line 2: {error}"]
+
+def test_rejects_malformed_files():
+    assert parse_accounts('a.jsonl', b'{"account_info": \n[1]')[1][0].startswith("line 1: ")
+    assert parse_accounts('a.jsonl', b'[1]')[1] == ["line 1: not an object"]
+    assert parse_accounts('a.json', jsonl(GOOD, GOOD))[1][0].startswith("line 2: ")
+    assert parse_accounts('a.json', json.dumps(GOOD).encode())[1] == ["file: expected a JSON list of objects"]
+    assert parse_accounts('a.json', json.dumps([GOOD, 'x']).encode())[1] == ["item 2: not an object"]
+    assert parse_accounts('a.csv', b'\xff\xfe')[1] == ["file is not UTF-8 text"]
+    assert parse_accounts('a.csv', b"account_info,current_level,opened_by\n")[1] == ["no accounts found"]
+    assert parse_accounts('a.json', b"[]")[1] == ["no accounts found"]
+
+def test_rejects_too_many_rows():
+    accounts, errors = parse_accounts('a.jsonl', jsonl(*[GOOD] * (MAX_IMPORT_ROWS + 1)))
+    assert (accounts, errors) == ([], [f"more than {MAX_IMPORT_ROWS} rows"])
@@ -0,0 +1,76 @@
+"""مجاميع الساعات: فترات من الـ prefix sums وسجلات أقدم من أول ساعة"""
+from datetime import datetime, timedelta
+
+from conftest import run
+from rollups import Rollups, bucket_start, next_bucket, pick_unit
+
+T0 = datetime(2026, 10, 1, 10, 30)
+
+def sale(moment: datetime, price) -> dict:
+    return {'date': moment.isoformat(), 'price': price}
+
+def test_totals_over_ranges():
+    rollups = Rollups()
+    for hours, price in [(0, 100), (0, 50), (2, 30), (5, 20)]:
+        rollups.add('sales', sale(T0 + timedelta(hours=hours), price))
+    rollups.add('purchases', {'date': (T0 + timedelta(hours=1)).isoformat(), 'cost': 70})
+    
+    start = T0.replace(minute=0)
+    assert rollups.total(start, start + timedelta(hours=6)) == {'sales': 4, 'revenue': 200, 'purchase_cost': 70}
+    assert rollups.total(start, start + timedelta(hours=1)) == {'sales': 2, 'revenue': 150, 'purchase_cost': 0}
+    assert rollups.total(start + timedelta(hours=1), start + timedelta(hours=3))['revenue'] == 30
+    # فترات بره السجلات (قبل أول ساعة وبعد آخر ساعة)
+    assert rollups.total(start - timedelta(days=3), start)['sales'] == 0
+    assert rollups.total(start + timedelta(hours=6), start + timedelta(days=3))['sales'] == 0
+    assert rollups.total(start - timedelta(days=1), start + timedelta(days=1))['sales'] == 4
+
+def test_prepending_older_hours_shifts_the_prefix():
+    rollups = Rollups()
+    rollups.add('sales', sale(T0, 100))
+    rollups.add('sales', sale(T0 + timedelta(hours=3), 10))
+    # ساعة الجهاز رجعت لورا: سجل قبل أول ساعة بيوم
+    rollups.add('sales', sale(T0 - timedelta(days=1), 40))
+    rollups.add('sales', sale(T0 - timedelta(hours=1), 5))
+    
+    start = T0.replace(minute=0)
+    assert len(rollups) == 24 + 4
+    assert rollups.total(start - timedelta(days=1), start)['revenue'] == 45
+    assert rollups.total(start, start + timedelta(hours=4))['revenue'] == 110
+    assert rollups.total(start - timedelta(days=2), start + timedelta(days=1)) == {'sales': 4, 'revenue': 155,
+                                                                                   'purchase_cost': 0}
+
+def test_records_without_a_date_are_skipped():
+    rollups = Rollups()
+    rollups.add('sales', {'price': 100})
+    rollups.add('sales', {'date': 'yesterday', 'price': 100})
+    assert len(rollups) == 0
+    assert rollups.total(T0 - timedelta(days=1), T0)['sales'] == 0
+
+def test_buckets_cover_the_range():
+    rollups = Rollups()
+    for day in range(10):
+        rollups.add('sales', sale(T0 + timedelta(days=day), day))
+    start, end = datetime(2026, 10, 1), datetime(2026, 10, 11)
+    buckets = rollups.buckets(start, end, 'day')
+    assert [moment.day for moment, _ in buckets] == list(range(1, 11))
+    assert [totals['revenue'] for _, totals in buckets] == list(range(10))
+    assert sum(totals['sales'] for _, totals in rollups.buckets(start, end, 'week')) == 10
+
+def test_bucket_helpers():
+    assert bucket_start(T0, 'week') == datetime(2026, 9, 28)
+    assert bucket_start(T0, 'month') == datetime(2026, 10, 1)
+    assert next_bucket(datetime(2026, 12, 1), 'month') == datetime(2027, 1, 1)
+    assert pick_unit(T0, T0 + timedelta(days=1)) == 'hour'
+    assert pick_unit(T0, T0 + timedelta(days=90)) == 'week'
+
+def test_stats_range_matches_the_sales_log(db):
+    async def check():
+        now = datetime.now()
+        for price in (100, 40):
+            await db.add_sale({'buyer': 'b', 'price': price, 'seller': 'Sam', 'rank': 'Gold'})
+        await db.add_purchase({'cost': 30, 'quantity': 1})
+        report = await db.stats_range(now - timedelta(days=1), now + timedelta(hours=2))
+        assert report['total'] == {'sales': 2, 'revenue': 140, 'purchase_cost': 30}
+        assert report['previous']['sales'] == 0
+        assert sum(b['sales'] for _, b in report['buckets']) == 2
+    run(check())
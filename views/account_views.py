@@ -225,6 +225,8 @@ class EditAccountModal(ui.Modal, title="📝 تعديل الحساب"):
         super().__init__()
         self.account_id = account_id
         self.message = message
+        # النسخة اللي الفورم اتملا منها: لو حد عدّل الحساب قبل الـ submit منكتبش فوق تعديله
+        self.version = account_data.get('version', 0)
         self.account_info.default = account_data.get('account_info', '')
         self.current_level.default = str(account_data.get('current_level', ''))
         self.opened_by.default = account_data.get('opened_by', '')
@@ -260,14 +262,17 @@ class EditAccountModal(ui.Modal, title="📝 تعديل الحساب"):
             await interaction.response.send_message("❌ اللفل لازم يكون رقم!", ephemeral=True)
             return
         
-        await db.update_account(self.account_id, {
+        updated = await db.update_account(self.account_id, {
             'account_info': self.account_info.value,
             'current_level': level,
             'opened_by': self.opened_by.value,
             'notes': self.notes.value,
             'edited_by': interaction.user.id,
             'edited_by_name': interaction.user.name
-        })
+        }, expected_version=self.version)
+        if not updated:
+            await interaction.response.send_message("⚠️ الحساب اتعدل أو اتحذف من حد تاني، افتح التعديل تاني!", ephemeral=True)
+            return
         
         await interaction.response.send_message("✅ تم تحديث الحساب!", ephemeral=True)
         
@@ -402,4 +407,46 @@ class DoneAccountModal(ui.Modal, title="📝 إضافة حساب مكتمل (Lev
         embed.timestamp = discord.utils.utcnow()
         
         # إنشاء View بدون زرار النقل (لأنه في Done)
-        await interaction.response.send_message(embed=embed, view=AccountControlView(account_id, is_done=True))
\ No newline at end of file
+        await interaction.response.send_message(embed=embed, view=AccountControlView(account_id, is_done=True))
+
+class AccountListView(ui.View):
+    """صفحات /list_accounts: كل زرار بيجيب الصفحة من الـ cursor (مش بيحمل كل الحسابات)"""
+    def __init__(self, filters: dict):
+        super().__init__(timeout=300)
+        self.filters = filters
+        self.page_number = 1
+        self.next_cursor = None
+        self.prev_cursor = None
+    
+    def load(self, page: dict) -> discord.Embed:
+        self.next_cursor = page['next']
+        self.prev_cursor = page['prev']
+        self.previous.disabled = self.prev_cursor is None
+        self.next.disabled = self.next_cursor is None
+        
+        shown = [f"{key}={value}" for key, value in self.filters.items() if value is not None]
+        e = discord.Embed(title="📋 الحسابات", color=COLORS['info'])
+        if shown:
+            e.description = f"🔍 {' | '.join(shown)}"
+        for a in page['accounts']:
+            value = f"Level: {a.get('current_level', '?')} | {a.get('status', '?')}\n👤 {a.get('opened_by') or '?'}"
+            if a.get('rank'):
+                value += f" | 🎮 {a['rank']}"
+            e.add_field(name=a['id'], value=value, inline=True)
+        if not page['accounts']:
+            e.add_field(name="📭", value="مفيش حسابات في الصفحة دي", inline=False)
+        e.set_footer(text=f"صفحة {self.page_number}")
+        return e
+    
+    async def show(self, interaction: discord.Interaction, cursor: str, step: int):
+        page = await db.list_accounts(**self.filters, cursor=cursor)
+        self.page_number += step
+        await interaction.response.edit_message(embed=self.load(page), view=self)
+    
+    @ui.button(label="◀️", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: ui.Button):
+        await self.show(interaction, self.prev_cursor, -1)
+    
+    @ui.button(label="▶️", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: ui.Button):
+        await self.show(interaction, self.next_cursor, 1)
@@ -253,15 +253,10 @@ class TicketControlView(ui.View):
     
     @ui.button(label="✅ تم البيع", style=discord.ButtonStyle.success, custom_id="sold_button")
     async def sold_button(self, interaction: discord.Interaction, button: ui.Button):
-        tickets_data = await db.load_json(db.tickets_file)
-        ticket_id = None
-        for ticket in tickets_data.get('tickets', []):
-            if ticket.get('channel_id') == interaction.channel.id:
-                ticket_id = ticket.get('id')
-                break
+        ticket = await db.get_ticket_by_channel(interaction.channel.id)
         
-        if ticket_id:
-            await interaction.response.send_modal(SoldInfoModal(ticket_id))
+        if ticket:
+            await interaction.response.send_modal(SoldInfoModal(ticket['id']))
         else:
             await interaction.response.send_message("❌ لم يتم العثور على التذكرة!", ephemeral=True)
     
@@ -313,14 +308,10 @@ class WaitingMoneyView(ui.View):
         
         await interaction.channel.edit(category=done_category)
         
-        tickets_data = await db.load_json(db.tickets_file)
-        ticket_id = None
-        for ticket in tickets_data.get('tickets', []):
-            if ticket.get('channel_id') == interaction.channel.id:
-                ticket_id = ticket.get('id')
-                break
+        ticket = await db.get_ticket_by_channel(interaction.channel.id)
         
-        if ticket_id:
+        if ticket:
+            ticket_id = ticket['id']
             await db.update_ticket(ticket_id, {
                 'status': 'completed',
                 'money_received_by': interaction.user.id